@@ -0,0 +1,109 @@
+from dataclasses import dataclass
+from typing import Any, Sequence
+
+import numpy as np
+
+
+def confusion_matrix(
+    expected: Sequence[Any], actual: Sequence[Any]
+) -> tuple[np.ndarray, list[Any]]:
+    """
+    Count each pair of expected and actual label, encoding the labels as
+    integers once.
+
+    Returns:
+        The confusion matrix, with a row for each expected label and a column
+        for each actual label, and the labels in the sorted order of its rows
+        and columns
+    """
+    labels, codes = np.unique(np.asarray([*expected, *actual]), return_inverse=True)
+    n_labels = len(labels)
+    matrix = np.bincount(
+        codes[: len(expected)] * n_labels + codes[len(expected) :],
+        minlength=n_labels * n_labels,
+    ).reshape(n_labels, n_labels)
+    return matrix, labels.tolist()
+
+
+@dataclass(frozen=True)
+class LabelCounts:
+    """
+    The counts of each label of a classification that every metric derives
+    from. Metrics are derived as sklearn derives them with zero_division set
+    to NaN, so they match precision_score, recall_score and fbeta_score
+    exactly.
+    """
+
+    samples: int
+    true_positives: np.ndarray
+    predicted: np.ndarray
+    expected: np.ndarray
+
+    @classmethod
+    def from_confusion_matrix(cls, matrix: np.ndarray) -> "LabelCounts":
+        return cls(
+            samples=int(matrix.sum()),
+            true_positives=np.diagonal(matrix).copy(),
+            predicted=matrix.sum(axis=0),
+            expected=matrix.sum(axis=1),
+        )
+
+    @classmethod
+    def from_indicators(cls, expected: np.ndarray, actual: np.ndarray) -> "LabelCounts":
+        """From boolean arrays with a row for each sample and a column for each
+        label, where samples can have any number of labels"""
+        return cls(
+            samples=len(expected),
+            true_positives=(expected & actual).sum(axis=0),
+            predicted=actual.sum(axis=0),
+            expected=expected.sum(axis=0),
+        )
+
+    @property
+    def false_positives(self) -> np.ndarray:
+        return self.predicted - self.true_positives
+
+    @property
+    def false_negatives(self) -> np.ndarray:
+        return self.expected - self.true_positives
+
+    @property
+    def true_negatives(self) -> np.ndarray:
+        return (
+            self.samples
+            - self.true_positives
+            - self.false_positives
+            - self.false_negatives
+        )
+
+    def precision(self) -> np.ndarray:
+        return _divide(self.true_positives, self.predicted)
+
+    def recall(self) -> np.ndarray:
+        return _divide(self.true_positives, self.expected)
+
+    def fbeta(self, beta: float) -> np.ndarray:
+        beta2 = beta**2
+        return _divide(
+            (1 + beta2) * self.true_positives, beta2 * self.expected + self.predicted
+        )
+
+    def weighted_average(self, scores: np.ndarray) -> float:
+        """The average of scores of each label weighted by how many samples
+        expect it, ignoring NaN scores"""
+        scored = ~np.isnan(scores)
+        if not scored.any():
+            return np.nan
+        if not self.expected[scored].any():
+            return float(np.average(scores[scored]))
+        return float(np.average(scores[scored], weights=self.expected[scored]))
+
+
+def _divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """Divide, with NaN where the denominator is zero"""
+    undefined = denominator == 0
+    result = np.asarray(numerator, dtype=np.float64) / np.where(
+        undefined, 1, denominator
+    )
+    result[undefined] = np.nan
+    return result
@@ -1,20 +1,93 @@
+from importlib import import_module
+from typing import NamedTuple, Optional
+
 import click
+from click.utils import make_default_short_help
 from dotenv import load_dotenv
 
-from . import jailbreak_guardrails
-from . import output_guardrails
-from . import question_router
-from . import rag_answers
-
 load_dotenv()
 
 
-@click.group()
-def main():
-    """Command line interface to run evaluations of GOV.UK chat"""
+class LazySubcommand(NamedTuple):
+    # the module and attribute of the command, as "module:attribute"
+    import_path: str
+    # the command's help, listed without importing it
+    help: str
+
+
+class LazyGroup(click.Group):
+    """A group that imports each subcommand's module only when the subcommand
+    is run, so neither listing the subcommands nor running one imports the
+    dependencies of the others"""
+
+    def __init__(self, *args, lazy_subcommands: dict[str, LazySubcommand], **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_subcommands = lazy_subcommands
 
+    def list_commands(self, ctx: click.Context) -> list[str]:
+        return sorted([*super().list_commands(ctx), *self.lazy_subcommands])
 
-main.add_command(jailbreak_guardrails.main)
-main.add_command(output_guardrails.main)
-main.add_command(question_router.main)
-main.add_command(rag_answers.main)
+    def get_command(self, ctx: click.Context, cmd_name: str) -> Optional[click.Command]:
+        if cmd_name not in self.lazy_subcommands:
+            return super().get_command(ctx, cmd_name)
+
+        module_name, attribute = self.lazy_subcommands[cmd_name].import_path.split(":")
+        command = getattr(import_module(module_name), attribute)
+        if not isinstance(command, click.Command):
+            raise ValueError(f"{module_name}:{attribute} is not a click command")
+        return command
+
+    def format_commands(
+        self, ctx: click.Context, formatter: click.HelpFormatter
+    ) -> None:
+        helps = {name: lazy.help for name, lazy in self.lazy_subcommands.items()}
+        for name in super().list_commands(ctx):
+            command = super().get_command(ctx, name)
+            if command is not None and not command.hidden:
+                helps[name] = command.help or ""
+        if not helps:
+            return
+
+        limit = formatter.width - 6 - max(map(len, helps))
+        with formatter.section("Commands"):
+            formatter.write_dl(
+                [
+                    (name, make_default_short_help(helps[name], limit))
+                    for name in sorted(helps)
+                ]
+            )
+
+
+@click.group(
+    cls=LazyGroup,
+    lazy_subcommands={
+        "compare": LazySubcommand(
+            "govuk_chat_evaluation.compare:main",
+            "Compare evaluation runs with the first of RESULTS_DIRS, each a "
+            "results/<task>/<timestamp> directory",
+        ),
+        "jailbreak_guardrails": LazySubcommand(
+            "govuk_chat_evaluation.jailbreak_guardrails:main",
+            "Run jailbreak guardrails evaluation",
+        ),
+        "output_guardrails": LazySubcommand(
+            "govuk_chat_evaluation.output_guardrails:main",
+            "Run output guardrails evaluation",
+        ),
+        "question_router": LazySubcommand(
+            "govuk_chat_evaluation.question_router:main",
+            "Run question router evaluation",
+        ),
+        "rag_answers": LazySubcommand(
+            "govuk_chat_evaluation.rag_answers:main",
+            "Run RAG answers evaluation",
+        ),
+        "rag_answers_mock_judge": LazySubcommand(
+            "govuk_chat_evaluation.rag_answers:mock_judge_server",
+            "Run a local OpenAI compatible judge server, for offline benchmarking "
+            "of RAG answers evaluation with a metric base_url pointing at it",
+        ),
+    },
+)
+def main():
+    """Command line interface to run evaluations of GOV.UK chat"""
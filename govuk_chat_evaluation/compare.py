@@ -0,0 +1,297 @@
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, cast
+
+import click
+import numpy as np
+import pandas as pd
+from scipy.stats import binomtest, ttest_rel
+from tabulate import tabulate
+
+from .output import initialise_output
+import logging
+
+SUMMARY_FILENAME = "comparison_summary.csv"
+FLIPPED_ROWS_FILENAME = "flipped_rows.csv"
+
+# rows are joined on the question and which occurrence of the question it is,
+# so datasets that repeat a question still join one to one
+KEY_COLUMNS = ["question", "occurrence"]
+
+
+@dataclass
+class RunRows:
+    """
+    The per-row results of an evaluation run, indexed by question key.
+
+    The metric columns are boolean for metrics a row passes or fails, which
+    are compared with McNemar's test, and float for scores, which are compared
+    with a paired t-test. Any other columns give detail on flipped rows.
+    """
+
+    rows: pd.DataFrame
+    metrics: list[str]
+
+
+def _keyed(questions: pd.Series, columns: dict[str, Any]) -> pd.DataFrame:
+    rows = pd.DataFrame(columns)
+    rows.index = pd.MultiIndex.from_arrays(
+        [questions, questions.groupby(questions).cumcount()], names=KEY_COLUMNS
+    )
+    return rows
+
+
+def _classification_rows(
+    results_dir: Path, expected: str, actual: str, *extra: str
+) -> RunRows:
+    results = pd.read_csv(
+        results_dir / "results.csv",
+        usecols=pd.Index(["question", expected, actual, *extra]),
+        dtype={"question": str, expected: str, actual: str},
+        keep_default_na=False,
+    )
+    scores = {
+        column: pd.to_numeric(results[column], errors="coerce") for column in extra
+    }
+    return RunRows(
+        rows=_keyed(
+            cast(pd.Series, results["question"]),
+            {
+                "correct": results[expected] == results[actual],
+                **scores,
+                expected: results[expected],
+                actual: results[actual],
+            },
+        ),
+        metrics=["correct", *scores],
+    )
+
+
+def question_router_rows(results_dir: Path) -> RunRows:
+    return _classification_rows(
+        results_dir, "expected_outcome", "actual_outcome", "confidence_score"
+    )
+
+
+def jailbreak_guardrails_rows(results_dir: Path) -> RunRows:
+    return _classification_rows(results_dir, "expected_outcome", "actual_outcome")
+
+
+def output_guardrails_rows(results_dir: Path) -> RunRows:
+    return _classification_rows(results_dir, "expected_triggered", "actual_triggered")
+
+
+def rag_answers_rows(results_dir: Path) -> RunRows:
+    results = pd.read_csv(
+        results_dir / "results_per_input.csv", header=[0, 1], index_col=0
+    )
+    means = results["mean"]
+    return RunRows(
+        rows=_keyed(
+            results["input"].iloc[:, 0].astype(str),
+            {metric: means[metric].astype(float) for metric in means.columns},
+        ),
+        metrics=list(means.columns),
+    )
+
+
+ROW_LOADERS: dict[str, Callable[[Path], RunRows]] = {
+    "question_router": question_router_rows,
+    "jailbreak_guardrails": jailbreak_guardrails_rows,
+    "output_guardrails": output_guardrails_rows,
+    "rag_answers": rag_answers_rows,
+}
+
+
+def comparison_task(results_dirs: list[Path]) -> str:
+    """The evaluation task of results/<task>/<timestamp> directories, which
+    must all be of the same task"""
+    tasks = {results_dir.resolve().parent.name for results_dir in results_dirs}
+    if not tasks <= ROW_LOADERS.keys():
+        raise ValueError(
+            "expected results/<task>/<timestamp> directories of a task in "
+            f"{list(ROW_LOADERS)}"
+        )
+    if len(tasks) > 1:
+        raise ValueError(f"cannot compare results of different tasks: {sorted(tasks)}")
+    return tasks.pop()
+
+
+def compare_runs(
+    baseline: RunRows,
+    candidate: RunRows,
+    min_score_change: float,
+) -> tuple[list[dict[str, Any]], pd.DataFrame]:
+    """
+    Compare the rows of a candidate run with the rows of the same questions in
+    a baseline run.
+
+    Args:
+        baseline: Rows of the run to compare against
+        candidate: Rows of the run being compared
+        min_score_change: Change in a score for a row to count as flipped
+
+    Returns:
+        A summary for each metric the runs share, with the mean of each run
+        over the rows both runs scored, the delta, the p-value of a paired
+        significance test and the number of rows that improved and regressed;
+        and the rows that flipped, with a row for each flipped metric
+    """
+    joined = baseline.rows.join(
+        candidate.rows, how="inner", lsuffix="_baseline", rsuffix="_candidate"
+    )
+    detail_columns = [
+        column for column in baseline.rows.columns if column not in baseline.metrics
+    ]
+
+    shared_metrics = [
+        metric for metric in baseline.metrics if metric in candidate.metrics
+    ]
+
+    summary = []
+    flipped = []
+    for metric in shared_metrics:
+        baseline_column, candidate_column = f"{metric}_baseline", f"{metric}_candidate"
+        pairs = joined.loc[
+            joined[baseline_column].notna() & joined[candidate_column].notna()
+        ]
+        before = pairs[baseline_column].to_numpy()
+        after = pairs[candidate_column].to_numpy()
+
+        if before.dtype == bool:
+            improved, regressed = after & ~before, before & ~after
+            test, p_value = (
+                "mcnemar",
+                _mcnemar_p_value(int(improved.sum()), int(regressed.sum())),
+            )
+        else:
+            improved = after - before >= min_score_change
+            regressed = before - after >= min_score_change
+            test, p_value = "paired_t", _paired_t_p_value(before, after)
+
+        baseline_mean, candidate_mean = (
+            (before.mean(), after.mean()) if len(pairs) else (np.nan, np.nan)
+        )
+        summary.append(
+            {
+                "metric": metric,
+                "paired_rows": len(pairs),
+                "baseline_mean": float(baseline_mean),
+                "candidate_mean": float(candidate_mean),
+                "delta": float(candidate_mean - baseline_mean),
+                "test": test,
+                "p_value": p_value,
+                "improved": int(improved.sum()),
+                "regressed": int(regressed.sum()),
+            }
+        )
+
+        changes = improved | regressed
+        changed = pairs.loc[changes]
+        flipped.append(
+            pd.DataFrame(
+                {
+                    "metric": metric,
+                    "change": np.where(improved[changes], "improved", "regressed"),
+                    "baseline": changed[baseline_column],
+                    "candidate": changed[candidate_column],
+                    **{
+                        f"{column}_{run}": changed[f"{column}_{run}"]
+                        for column in detail_columns
+                        for run in ["baseline", "candidate"]
+                    },
+                },
+                index=changed.index,
+            )
+        )
+
+    flipped_rows = (
+        pd.concat(flipped).reset_index()
+        if flipped
+        else pd.DataFrame(columns=pd.Index(KEY_COLUMNS))
+    )
+    return summary, flipped_rows
+
+
+def _mcnemar_p_value(improved: int, regressed: int) -> float:
+    """Exact McNemar's test, of whether rows are as likely to improve as to
+    regress"""
+    if not improved + regressed:
+        return 1.0
+    return float(binomtest(improved, improved + regressed).pvalue)
+
+
+def _paired_t_p_value(before: np.ndarray, after: np.ndarray) -> float:
+    if len(before) < 2:
+        return np.nan
+    if np.array_equal(before, after):
+        return 1.0
+    return float(ttest_rel(after, before).pvalue)
+
+
+def compare_and_output_results(
+    output_dir: Path, task: str, results_dirs: list[Path], min_score_change: float
+):
+    """Compare each results directory after the first with the first, writing
+    a summary of each metric and the rows that flipped to the output directory,
+    with the summary written to STDOUT"""
+    load_rows = ROW_LOADERS[task]
+
+    baseline_dir, *candidate_dirs = results_dirs
+    baseline = load_rows(baseline_dir)
+
+    summary = []
+    flipped = []
+    for candidate_dir in candidate_dirs:
+        candidate = load_rows(candidate_dir)
+        unmatched = len(candidate.rows.index.difference(baseline.rows.index))
+        if unmatched:
+            logging.warning(
+                f"{unmatched} rows of {candidate_dir} have no question in "
+                f"{baseline_dir} to compare with"
+            )
+
+        run_summary, run_flipped = compare_runs(baseline, candidate, min_score_change)
+        summary += [{"run": candidate_dir.name, **row} for row in run_summary]
+        run_flipped.insert(0, "run", candidate_dir.name)
+        flipped.append(run_flipped)
+
+    summary_df = pd.DataFrame(summary)
+    summary_df.to_csv(output_dir / SUMMARY_FILENAME, index=False)
+    pd.concat(flipped).to_csv(output_dir / FLIPPED_ROWS_FILENAME, index=False)
+
+    logging.info(f"\nCompared with {baseline_dir}")
+    logging.info(
+        tabulate(summary_df, headers="keys", showindex=False, floatfmt=".4g") + "\n"
+    )
+
+
+@click.command(name="compare")
+@click.argument(
+    "results_dirs",
+    nargs=-1,
+    required=True,
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+)
+@click.option(
+    "--min-score-change",
+    type=float,
+    default=0.5,
+    show_default=True,
+    help="Change in a score for a row to count as flipped",
+)
+def main(results_dirs: tuple[Path, ...], min_score_change: float):
+    """Compare evaluation runs with the first of RESULTS_DIRS, each a
+    results/<task>/<timestamp> directory"""
+    start_time = datetime.now()
+
+    if len(results_dirs) < 2:
+        raise click.UsageError("Give at least two results directories to compare")
+    try:
+        task = comparison_task(list(results_dirs))
+    except ValueError as error:
+        raise click.BadParameter(str(error), param_hint="RESULTS_DIRS")
+
+    output_dir = initialise_output("compare", start_time)
+    compare_and_output_results(output_dir, task, list(results_dirs), min_score_change)
@@ -54,13 +54,27 @@ def write_generated_to_output(output_dir: Path, generated: list[Model]) -> Path:
     """Write a JSONL file in the output directory that contains the JSON contents
     of each pydantic model in the generated list"""
 
-    output_path = output_dir / "generated.jsonl"
+    return write_models_to_jsonl(
+        output_dir, generated, filename="generated.jsonl", data_label="generated data"
+    )
+
+
+def write_models_to_jsonl(
+    output_dir: Path,
+    models: list[Model],
+    filename: str,
+    data_label: str,
+) -> Path:
+    """Write a JSONL file in the output directory with the given filename that
+    contains the JSON contents of each pydantic model"""
+
+    output_path = output_dir / filename
     with open(output_path, "w", encoding="utf8") as file:
-        for model in generated:
+        for model in models:
             file.write(model.model_dump_json() + "\n")
 
     relative_path = output_path.relative_to(project_root())
-    logging.info(f"Wrote generated data to {relative_path}")
+    logging.info(f"Wrote {data_label} to {relative_path}")
 
     return output_path
 
@@ -1,13 +1,12 @@
-from collections import Counter
 from functools import cached_property
 from pathlib import Path
 from typing import Any
 
 import numpy as np
 from pydantic import BaseModel
-from sklearn.metrics import precision_score, recall_score
 from tabulate import tabulate
 
+from ..classification_metrics import LabelCounts
 from ..file_system import jsonl_to_models, write_csv_results
 import logging
 
@@ -36,33 +35,29 @@ class EvaluationResult(BaseModel):
 class AggregateResults:
     def __init__(self, evaluation_results: list[EvaluationResult]):
         self.evaluation_results = evaluation_results
-        counter = Counter(result.classification for result in evaluation_results)
-        self.true_positives = counter.get("true_positive", 0)
-        self.true_negatives = counter.get("true_negative", 0)
-        self.false_positives = counter.get("false_positive", 0)
-        self.false_negatives = counter.get("false_negative", 0)
+        counts = self._label_counts
+        self.true_positives = int(counts.true_positives[0])
+        self.true_negatives = int(counts.true_negatives[0])
+        self.false_positives = int(counts.false_positives[0])
+        self.false_negatives = int(counts.false_negatives[0])
 
     @cached_property
-    def _expected_actual_lists(self) -> tuple[list[int], list[int]]:
-        pairs_list = [
-            (int(eval.expected_outcome), int(eval.actual_outcome))
-            for eval in self.evaluation_results
-        ]
-
-        expected, actual = zip(*pairs_list)
-        return list(expected), list(actual)
+    def _label_counts(self) -> LabelCounts:
+        """Counts of the positive label, that jailbreak was attempted"""
+        outcomes = np.array(
+            [
+                (eval.expected_outcome, eval.actual_outcome)
+                for eval in self.evaluation_results
+            ],
+            dtype=bool,
+        ).reshape(-1, 2)
+        return LabelCounts.from_indicators(outcomes[:, :1], outcomes[:, 1:])
 
     def precision(self) -> float:
-        return precision_score(
-            *self._expected_actual_lists,
-            zero_division=np.nan,  # type: ignore
-        )
+        return float(self._label_counts.precision()[0])
 
     def recall(self) -> float:
-        return recall_score(
-            *self._expected_actual_lists,
-            zero_division=np.nan,  # type: ignore
-        )
+        return float(self._label_counts.recall()[0])
 
     def to_dict(self) -> dict[str, Any]:
         return {
@@ -1,13 +1,12 @@
-from collections import Counter
 from functools import cached_property
 from pathlib import Path
-from typing import Any, cast
+from typing import Any
 
 import numpy as np
 from pydantic import BaseModel
-from sklearn.metrics import f1_score, precision_score, recall_score
 from tabulate import tabulate
 
+from ..classification_metrics import LabelCounts
 from ..file_system import jsonl_to_models, write_csv_results
 import logging
 
@@ -38,13 +37,6 @@ class EvaluationResult(BaseModel):
 class AggregateResults:
     def __init__(self, evaluation_results: list[EvaluationResult]):
         self.evaluation_results = evaluation_results
-        counter = Counter(
-            result.classification_triggered for result in evaluation_results
-        )
-        self.true_positive = counter.get("true_positive", 0)
-        self.true_negative = counter.get("true_negative", 0)
-        self.false_positive = counter.get("false_positive", 0)
-        self.false_negative = counter.get("false_negative", 0)
 
         guardrail_set = {
             name
@@ -54,63 +46,63 @@ class AggregateResults:
         }
         self.guardrail_names: list[str] = sorted(guardrail_set)
 
+        counts = self._triggered_label_counts
+        self.true_positive = int(counts.true_positives[0])
+        self.true_negative = int(counts.true_negatives[0])
+        self.false_positive = int(counts.false_positives[0])
+        self.false_negative = int(counts.false_negatives[0])
+
     @cached_property
-    def _expected_actual_triggered_lists(self) -> tuple[list[int], list[int]]:
-        pairs_list = [
-            (
-                int(evaluation_result.expected_triggered),
-                int(evaluation_result.actual_triggered),
-            )
-            for evaluation_result in self.evaluation_results
-        ]
-        expected, actual = zip(*pairs_list)
-        return list(expected), list(actual)
+    def _triggered_label_counts(self) -> LabelCounts:
+        """Counts of the positive label, that any guardrail was triggered"""
+        triggered = np.array(
+            [
+                (result.expected_triggered, result.actual_triggered)
+                for result in self.evaluation_results
+            ],
+            dtype=bool,
+        ).reshape(-1, 2)
+        return LabelCounts.from_indicators(triggered[:, :1], triggered[:, 1:])
 
     @cached_property
-    def _expected_actual_guardrails_vectors(
-        self,
-    ) -> tuple[list[list[int]], list[list[int]]]:
-        """Generates lists of expected and actual binary vectors for per-guardrail evaluation."""
-
-        def to_vector(d: dict[str, bool]) -> list[int]:
-            return [int(d.get(name, False)) for name in self.guardrail_names]
-
-        expected_vectors = [
-            to_vector(result.expected_guardrails) for result in self.evaluation_results
-        ]
-        actual_vectors = [
-            to_vector(result.actual_guardrails) for result in self.evaluation_results
-        ]
+    def _expected_actual_guardrails_vectors(self) -> tuple[np.ndarray, np.ndarray]:
+        """Generates arrays of expected and actual binary vectors for per-guardrail evaluation."""
+
+        def to_vectors(guardrails: list[dict[str, bool]]) -> np.ndarray:
+            return np.array(
+                [
+                    [d.get(name, False) for name in self.guardrail_names]
+                    for d in guardrails
+                ],
+                dtype=bool,
+            ).reshape(len(guardrails), len(self.guardrail_names))
+
+        expected_vectors = to_vectors(
+            [result.expected_guardrails for result in self.evaluation_results]
+        )
+        actual_vectors = to_vectors(
+            [result.actual_guardrails for result in self.evaluation_results]
+        )
         return expected_vectors, actual_vectors
 
-    def _triggered_metric(self, metric_function):
-        expected, actual = self._expected_actual_triggered_lists
-        return metric_function(expected, actual, zero_division=np.nan)  # type: ignore
-
-    def _metric_per_guardrail(self, metric_function):
-        expected_vectors, actual_vectors = self._expected_actual_guardrails_vectors
-
-        return metric_function(
-            expected_vectors,
-            actual_vectors,
-            average=None,
-            zero_division=np.nan,
-        ).tolist()  # type: ignore
+    @cached_property
+    def _guardrail_label_counts(self) -> LabelCounts:
+        return LabelCounts.from_indicators(*self._expected_actual_guardrails_vectors)
 
     def precision(self) -> float:
-        return cast(float, self._triggered_metric(precision_score))
+        return float(self._triggered_label_counts.precision()[0])
 
     def recall(self) -> float:
-        return cast(float, self._triggered_metric(recall_score))
+        return float(self._triggered_label_counts.recall()[0])
 
     def precision_per_guardrail(self) -> list[float]:
-        return self._metric_per_guardrail(precision_score)
+        return self._guardrail_label_counts.precision().tolist()
 
     def recall_per_guardrail(self) -> list[float]:
-        return self._metric_per_guardrail(recall_score)
+        return self._guardrail_label_counts.recall().tolist()
 
     def f1_per_guardrail(self) -> list[float]:
-        return self._metric_per_guardrail(f1_score)
+        return self._guardrail_label_counts.fbeta(1).tolist()
 
     def to_dict(self) -> dict[str, Any]:
         base_metrics = {
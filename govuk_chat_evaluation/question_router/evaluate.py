@@ -3,19 +3,10 @@ from pathlib import Path
 from typing import Any
 
 from pydantic import BaseModel
-from sklearn.metrics import (
-    accuracy_score,
-    precision_score,
-    recall_score,
-    f1_score,
-    fbeta_score,
-    confusion_matrix,
-)
 from tabulate import tabulate
-import matplotlib.pyplot as plt
-import seaborn as sns
 import numpy as np
 
+from ..classification_metrics import LabelCounts, confusion_matrix
 from ..file_system import jsonl_to_models, write_csv_results
 import logging
 
@@ -35,60 +26,43 @@ class AggregateResults:
         self.evaluation_results = evaluation_results
 
     @cached_property
-    def classification_labels(self) -> list[str]:
-        return sorted(
-            list(set(item for lst in self._expected_actual_lists for item in lst))
+    def _confusion_matrix(self) -> tuple[np.ndarray, list[str]]:
+        return confusion_matrix(
+            [eval.expected_outcome for eval in self.evaluation_results],
+            [eval.actual_outcome for eval in self.evaluation_results],
         )
 
     @cached_property
-    def _expected_actual_lists(self) -> tuple[list[str], list[str]]:
-        pairs_list = [
-            (eval.expected_outcome, eval.actual_outcome)
-            for eval in self.evaluation_results
-        ]
+    def _label_counts(self) -> LabelCounts:
+        return LabelCounts.from_confusion_matrix(self._confusion_matrix[0])
 
-        expected, actual = zip(*pairs_list)
-        return list(expected), list(actual)
+    @property
+    def classification_labels(self) -> list[str]:
+        return self._confusion_matrix[1]
 
     def accuracy(self) -> float:
-        return accuracy_score(
-            *self._expected_actual_lists,  # type: ignore
+        return int(self._label_counts.true_positives.sum()) / len(
+            self.evaluation_results
         )
 
     def precision(self) -> float:
-        return precision_score(
-            *self._expected_actual_lists,
-            average="weighted",
-            zero_division=np.nan,  # type: ignore
-        )
+        counts = self._label_counts
+        return counts.weighted_average(counts.precision())
 
     def recall(self) -> float:
-        return recall_score(
-            *self._expected_actual_lists,
-            average="weighted",
-            zero_division=np.nan,  # type: ignore
-        )
+        counts = self._label_counts
+        return counts.weighted_average(counts.recall())
 
     def f1_score(self) -> float:
-        return f1_score(
-            *self._expected_actual_lists,
-            average="weighted",
-            zero_division=np.nan,  # type: ignore
-        )
+        counts = self._label_counts
+        return counts.weighted_average(counts.fbeta(1))
 
     def f2_score(self) -> float:
-        return fbeta_score(
-            *self._expected_actual_lists,
-            beta=2,
-            average="weighted",
-            zero_division=np.nan,  # type: ignore
-        )
+        counts = self._label_counts
+        return counts.weighted_average(counts.fbeta(2))
 
     def confusion_matrix_data(self) -> list[list[int]]:
-        return confusion_matrix(
-            *self._expected_actual_lists,
-            labels=sorted(list(set(self.classification_labels))),  # type: ignore
-        )
+        return self._confusion_matrix[0].tolist()
 
     def miscategorised_cases(self) -> list[dict[str, Any]]:
         return [
@@ -122,9 +96,13 @@ def generate_and_output_confusion_matrix(
     confusion_matrix_data: list[list[int]],
     confusion_matrix_labels: list[str],
 ):
-    """Takes confusion matrix data (a 2D list) calculated by sklearn
-    and a list of labels (strings representing the question routing labels)
-    and outputs an confusion matrix PNG image to the output directory"""
+    """Takes confusion matrix data (a 2D list) and a list of labels
+    (strings representing the question routing labels) and outputs an
+    confusion matrix PNG image to the output directory"""
+    # imported here as they are slow to import and only used for this plot
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
     fig, ax = plt.subplots(figsize=(6, 6))
     sns.heatmap(
         confusion_matrix_data,  # type: ignore
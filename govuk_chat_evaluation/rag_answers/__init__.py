@@ -1,3 +1,3 @@
-from .cli import main
+from .cli import main, mock_judge_server
 
-__all__ = ["main"]
+__all__ = ["main", "mock_judge_server"]
@@ -0,0 +1,61 @@
+import math
+import statistics
+from collections import defaultdict
+
+from deepeval.evaluate.types import TestResult
+from deepeval.test_case import LLMTestCase
+
+from .data_models import RunMetricOutput
+from .deepeval_evaluate import stream_row_from_test_result
+
+
+def standard_error(scores: list[float]) -> float:
+    """The standard error of the mean of the scores, infinite when there are
+    too few scores to estimate it"""
+    if len(scores) < 2:
+        return math.inf
+    return statistics.stdev(scores) / math.sqrt(len(scores))
+
+
+def has_converged(outputs: list[RunMetricOutput], threshold: float) -> bool:
+    """Whether the standard error of every metric's scores for a test case is
+    within the threshold. Runs where a metric errored and has no score are
+    left out."""
+    scores_by_metric: dict[str, list[float]] = defaultdict(list)
+    for output in outputs:
+        if output.score is not None:
+            scores_by_metric[output.metric].append(output.score)
+
+    return all(
+        standard_error(scores) <= threshold for scores in scores_by_metric.values()
+    )
+
+
+class RunOutputsByCase:
+    """Collects the run metric outputs of each test case in an evaluation, to
+    decide which test cases need more runs"""
+
+    def __init__(self):
+        self._outputs: dict[str, list[RunMetricOutput]] = defaultdict(list)
+
+    def add(self, all_runs: list[list[TestResult]], first_run: int = 0) -> None:
+        """Add the results of run_deepeval_evaluation"""
+        for run_idx, run in enumerate(all_runs, start=first_run):
+            for result in run:
+                self._outputs[result.name] += [
+                    RunMetricOutput(**output)
+                    for output in stream_row_from_test_result(result, run_idx)[
+                        "run_metric_outputs"
+                    ]
+                ]
+
+    def unconverged_cases(
+        self, cases: list[LLMTestCase], threshold: float
+    ) -> list[LLMTestCase]:
+        """The test cases with a metric whose standard error is above the
+        threshold"""
+        return [
+            case
+            for case in cases
+            if not has_converged(self._outputs[str(case.name)], threshold)
+        ]
@@ -0,0 +1,156 @@
+import itertools
+from functools import cache
+
+import numpy as np
+
+BOOTSTRAP_RESAMPLES = 10_000
+CONFIDENCE_LEVEL = 0.95
+
+# runs beyond this are resampled one by one, as enumerating every resample of
+# the runs of an input grows as n_runs ** n_runs
+MAX_ENUMERATED_RUNS = 6
+
+# the number of values each chunk of resamples draws at once, to bound memory
+_CHUNK_ELEMENTS = 2**22
+
+
+def hierarchical_bootstrap_interval(
+    run_scores: np.ndarray,
+    n_resamples: int = BOOTSTRAP_RESAMPLES,
+    confidence_level: float = CONFIDENCE_LEVEL,
+    seed: int = 0,
+) -> tuple[float, float]:
+    """
+    Percentile bootstrap confidence interval for the mean of the per-input
+    mean scores, resampling the inputs and then the runs of each resampled
+    input, with replacement.
+
+    Args:
+        run_scores: A row for each input with its run scores first, padded
+            with NaN where inputs have fewer scored runs
+        n_resamples: Number of bootstrap resamples
+        confidence_level: Confidence level of the interval
+        seed: Seed of the random resampling, so the interval is reproducible
+
+    Returns:
+        The lower and upper bounds, NaN if no input has a score
+    """
+    run_counts = (~np.isnan(run_scores)).sum(axis=1)
+    run_scores, run_counts = run_scores[run_counts > 0], run_counts[run_counts > 0]
+    if not len(run_scores):
+        return np.nan, np.nan
+
+    rng = np.random.default_rng(seed)
+    resample_means = (
+        _enumerated_resample_means
+        if run_counts.max() <= MAX_ENUMERATED_RUNS
+        else _direct_resample_means
+    )(run_scores, run_counts, n_resamples, rng)
+
+    tail = (1 - confidence_level) / 2
+    lower, upper = np.quantile(resample_means, [tail, 1 - tail])
+    return float(lower), float(upper)
+
+
+def _enumerated_resample_means(
+    run_scores: np.ndarray,
+    run_counts: np.ndarray,
+    n_resamples: int,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """Resample with the mean of every distinct resample of the runs of each
+    input precomputed, so each resampled input is a single lookup"""
+    n_inputs = len(run_scores)
+    distinct_counts = np.unique(run_counts).tolist()
+    n_compositions = max(len(_run_resamples(count)[0]) for count in distinct_counts)
+
+    # the mean of each input for each composition of a resample of its runs
+    composition_means = np.zeros((n_inputs, n_compositions))
+    # maps each equally likely sequence of resampled runs to its composition
+    sequence_compositions = []
+    n_sequences = np.zeros(max(distinct_counts) + 1, dtype=np.int64)
+    sequence_offsets = np.zeros(max(distinct_counts) + 1, dtype=np.int64)
+    for count in distinct_counts:
+        compositions, compositions_of_sequences = _run_resamples(count)
+        inputs = run_counts == count
+        composition_means[inputs, : len(compositions)] = (
+            run_scores[inputs, :count] @ compositions.T / count
+        )
+        sequence_offsets[count] = sum(map(len, sequence_compositions))
+        n_sequences[count] = len(compositions_of_sequences)
+        sequence_compositions.append(compositions_of_sequences)
+    composition_of_sequence = np.concatenate(sequence_compositions)
+    flat_means = composition_means.ravel()
+
+    resample_means = np.empty(n_resamples)
+    chunk_size = max(1, _CHUNK_ELEMENTS // n_inputs)
+    for start in range(0, n_resamples, chunk_size):
+        size = min(chunk_size, n_resamples - start)
+        index = rng.integers(0, n_inputs, size=(size, n_inputs))
+        if n_compositions > 1:
+            if len(distinct_counts) == 1:
+                sequences = rng.integers(0, len(composition_of_sequence), index.shape)
+            else:
+                counts = run_counts[index]
+                sequences = _uniform_integers(rng, n_sequences[counts])
+                sequences += sequence_offsets[counts]
+            index *= n_compositions
+            index += composition_of_sequence[sequences]
+        resample_means[start : start + size] = flat_means[index].mean(axis=1)
+
+    return resample_means
+
+
+def _direct_resample_means(
+    run_scores: np.ndarray,
+    run_counts: np.ndarray,
+    n_resamples: int,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """Resample the runs of each resampled input one by one"""
+    n_inputs, max_runs = run_scores.shape
+    flat_scores = np.nan_to_num(run_scores).ravel()
+    run_positions = np.arange(max_runs)
+
+    resample_means = np.empty(n_resamples)
+    chunk_size = max(1, _CHUNK_ELEMENTS // (n_inputs * max_runs))
+    for start in range(0, n_resamples, chunk_size):
+        size = min(chunk_size, n_resamples - start)
+        inputs = rng.integers(0, n_inputs, size=(size, n_inputs))
+        counts = run_counts[inputs][..., None]
+        runs = _uniform_integers(
+            rng, np.broadcast_to(counts, (size, n_inputs, max_runs))
+        )
+        scores = flat_scores[inputs[..., None] * max_runs + runs]
+        # each input resamples as many runs as it has
+        scores[run_positions >= counts] = 0
+        resample_means[start : start + size] = (
+            scores.sum(axis=2) / counts[..., 0]
+        ).mean(axis=1)
+
+    return resample_means
+
+
+def _uniform_integers(rng: np.random.Generator, highs: np.ndarray) -> np.ndarray:
+    """Draw an integer from [0, high) for each of highs. Scaling a uniform
+    float is much faster than Generator.integers with an array of highs, and
+    is biased by less than high / 2 ** 53."""
+    return (rng.random(highs.shape) * highs).astype(np.int64)
+
+
+@cache
+def _run_resamples(n_runs: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Every way of resampling n_runs runs with replacement.
+
+    Returns:
+        The distinct compositions of a resample, as the number of times each
+        run is drawn, and the composition of each of the n_runs ** n_runs
+        equally likely sequences of draws
+    """
+    sequences = np.array(list(itertools.product(range(n_runs), repeat=n_runs)))
+    draws = (sequences[..., None] == np.arange(n_runs)).sum(axis=1)
+    compositions, composition_of_sequence = np.unique(
+        draws, axis=0, return_inverse=True
+    )
+    return compositions, composition_of_sequence.ravel()
@@ -0,0 +1,174 @@
+import logging
+import math
+import statistics
+from collections import defaultdict
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+from deepeval.metrics import BaseMetric
+
+from .data_models import JudgeCascadeConfig, MetricConfig
+from .results_table import ResultsTable
+
+CASCADE_FILENAME = "judge_cascade.csv"
+ESCALATIONS_STREAM_FILENAME = "escalated_run_metric_outputs.jsonl"
+
+
+def needs_escalation(
+    results: ResultsTable,
+    metric_name: str,
+    threshold: float,
+    cascade: JudgeCascadeConfig,
+) -> np.ndarray:
+    """Whether the runs of a metric for each test case are uncertain enough to
+    be judged again by the cascade judge. Runs that errored are left out."""
+    n_cases = len(results.name)
+    is_metric = results.metric == metric_name
+    scored = is_metric & ~np.isnan(results.score)
+
+    counts = np.bincount(results.case_index[scored], minlength=n_cases)
+    totals = np.bincount(
+        results.case_index[scored], weights=results.score[scored], minlength=n_cases
+    )
+    means = np.divide(totals, counts, out=np.full(n_cases, np.nan), where=counts > 0)
+    uncertain = np.abs(means - threshold) <= cascade.threshold_margin
+
+    if cascade.escalate_on_disagreement:
+        passed = np.array([success is True for success in results.success], bool)
+        failed = np.array([success is False for success in results.success], bool)
+        uncertain |= (
+            np.bincount(results.case_index[is_metric & passed], minlength=n_cases) > 0
+        ) & (np.bincount(results.case_index[is_metric & failed], minlength=n_cases) > 0)
+
+    return uncertain & (counts > 0)
+
+
+def plan_escalations(
+    results: ResultsTable,
+    metric_configs: list[MetricConfig],
+    metrics: Sequence[BaseMetric],
+) -> dict[int, list[str]]:
+    """
+    Find the test cases each metric with a cascade should escalate.
+
+    Returns:
+        The names of the test cases to escalate, keyed by the index of the
+        metric. Metrics with nothing to escalate are left out.
+    """
+    plan: dict[int, list[str]] = {}
+
+    for index, (metric_config, metric) in enumerate(zip(metric_configs, metrics)):
+        if metric_config.cascade is None:
+            continue
+
+        names = results.name[
+            needs_escalation(
+                results,
+                metric.__name__,
+                metric_config.threshold,
+                metric_config.cascade,
+            )
+        ].tolist()
+        if names:
+            plan[index] = names
+
+    return plan
+
+
+def apply_escalations(
+    results: ResultsTable,
+    escalated_results: ResultsTable,
+    metric_configs: list[MetricConfig],
+    metrics: Sequence[BaseMetric],
+) -> tuple[ResultsTable, pd.DataFrame]:
+    """
+    Replace the outputs of the escalated metrics with those of the cascade
+    judge.
+
+    Returns:
+        The results, and a report with the verdicts of both judges for every
+        test case judged by each metric with a cascade. Test cases the metric's
+        judge didn't judge, as they were pre-screened or their judgements were
+        reused, are left out of the report and the rate of escalation.
+    """
+    output_names = results.name[results.case_index]
+    escalated_names = escalated_results.name[escalated_results.case_index]
+    scores = _mean_scores(output_names, results.metric, results.score)
+    escalated_scores = _mean_scores(
+        escalated_names, escalated_results.metric, escalated_results.score
+    )
+
+    cascades = [
+        (metric_config, metric.__name__)
+        for metric_config, metric in zip(metric_configs, metrics)
+        if metric_config.cascade is not None
+    ]
+    rows = []
+    replaced: set[tuple[str, str]] = set()
+
+    for name in results.name.tolist():
+        for metric_config, metric_name in cascades:
+            if (name, metric_name) not in scores:
+                continue
+            escalated = (name, metric_name) in escalated_scores
+            rows.append(
+                {
+                    "name": name,
+                    "metric": metric_name,
+                    "model": metric_config.llm_judge.model.value,
+                    "score": scores[(name, metric_name)],
+                    "escalated": escalated,
+                    "escalation_model": metric_config.cascade.model.value,  # type: ignore[union-attr]
+                    "escalation_score": escalated_scores.get((name, metric_name)),
+                }
+            )
+            if escalated:
+                replaced.add((name, metric_name))
+
+    results = ResultsTable.concat(
+        [
+            results.select_outputs(
+                ~_is_replaced(output_names, results.metric, replaced)
+            ),
+            escalated_results.select_outputs(
+                _is_replaced(escalated_names, escalated_results.metric, replaced)
+            ),
+        ]
+    ).select_cases(range(len(results.name)))
+
+    report = pd.DataFrame(rows)
+    if not report.empty:
+        for metric_name, escalated_rate in (
+            report.groupby("metric")["escalated"].mean().items()
+        ):
+            logging.info(
+                f"Judge cascade {metric_name}: {escalated_rate:.1%} of test cases "
+                "escalated"
+            )
+
+    return results, report
+
+
+def _mean_scores(
+    names: np.ndarray, metrics: np.ndarray, scores: np.ndarray
+) -> dict[tuple[str, str], float | None]:
+    """The mean score of each metric for each test case, None where every run
+    errored"""
+    scores_by_key: dict[tuple[str, str], list[float]] = defaultdict(list)
+    for name, metric, score in zip(names.tolist(), metrics.tolist(), scores.tolist()):
+        key_scores = scores_by_key[(name, metric)]
+        if not math.isnan(score):
+            key_scores.append(score)
+    return {
+        key: statistics.mean(key_scores) if key_scores else None
+        for key, key_scores in scores_by_key.items()
+    }
+
+
+def _is_replaced(
+    names: np.ndarray, metrics: np.ndarray, replaced: set[tuple[str, str]]
+) -> np.ndarray:
+    return np.array(
+        [key in replaced for key in zip(names.tolist(), metrics.tolist())], bool
+    )
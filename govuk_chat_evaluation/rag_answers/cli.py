@@ -1,14 +1,17 @@
 from datetime import datetime
 from pathlib import Path
-from typing import cast
+from typing import Optional, cast
 
 import click
 
 from ..config import apply_click_options_to_command, config_from_cli_args
 from ..file_system import write_config_file_for_reuse
+from .custom_deepeval.llm_judges.mock_judge_server import MockJudgeServer
+from .estimate import estimate_evaluation_table
 from .evaluate import evaluate_and_output_results
 from .generate import generate_and_write_dataset
 from .data_models import Config
+from ..logging import setup_logging
 from ..output import initialise_output
 
 
@@ -18,8 +21,29 @@ from ..output import initialise_output
     type=click.Path(exists=True, dir_okay=False, path_type=Path),
     default="config/defaults/rag_answers.yaml",
 )
+@click.option(
+    "--estimate",
+    is_flag=True,
+    default=False,
+    help="Estimate the judge API calls, tokens and cost without evaluating",
+)
+@click.option(
+    "--estimate-processes",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Processes to estimate across, only quicker than 1 for datasets of "
+    "hundreds of thousands of test cases",
+)
+@click.option(
+    "--resume",
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+    default=None,
+    help="Results directory of an interrupted evaluation to resume, judging only "
+    "what is missing or errored",
+)
 @apply_click_options_to_command(Config)
-def main(**cli_args):
+def main(estimate: bool, estimate_processes: int, resume: Optional[Path], **cli_args):
     """Run RAG answers evaluation"""
     start_time = datetime.now()
 
@@ -29,15 +53,56 @@ def main(**cli_args):
         cli_args=cli_args,
     )
 
-    output_dir = initialise_output("rag_answers", start_time)
+    if estimate:
+        if config.generate:
+            raise click.UsageError(
+                "--estimate needs a dataset of generated answers, use --no-generate"
+            )
+        click.echo(
+            estimate_evaluation_table(config.input_path, config, estimate_processes)
+        )
+        return
 
-    if config.generate:
+    if resume is not None:
+        output_dir = resume
+        setup_logging(output_dir)
+    else:
+        output_dir = initialise_output("rag_answers", start_time)
+
+    # written before evaluating, so an interrupted evaluation records its config
+    write_config_file_for_reuse(output_dir, config)
+
+    if resume is not None and (output_dir / "generated.jsonl").exists():
+        # answers generated before the interruption are evaluated again, so
+        # completed judgements still match their test cases
+        evaluate_path = output_dir / "generated.jsonl"
+    elif config.generate:
         evaluate_path = generate_and_write_dataset(
             config.input_path, cast(str, config.provider), output_dir
         )
     else:
         evaluate_path = config.input_path
 
-    evaluate_and_output_results(output_dir, evaluate_path, config)
+    evaluate_and_output_results(
+        output_dir, evaluate_path, config, resume=resume is not None
+    )
 
-    write_config_file_for_reuse(output_dir, config)
+
+@click.command(name="rag_answers_mock_judge")
+@click.option("--host", default="127.0.0.1", help="Host to listen on")
+@click.option("--port", default=8000, type=int, help="Port to listen on")
+@click.option(
+    "--latency", default=0.0, type=float, help="Seconds to delay each response"
+)
+@click.option(
+    "--latency_jitter",
+    default=0.0,
+    type=float,
+    help="Maximum random seconds added to the latency of each response",
+)
+def mock_judge_server(host: str, port: int, latency: float, latency_jitter: float):
+    """Run a local OpenAI compatible judge server, for offline benchmarking of
+    RAG answers evaluation with a metric base_url pointing at it"""
+    server = MockJudgeServer(host, port, latency, latency_jitter)
+    click.echo(f"Mock judge server listening on {server.url}")
+    server.serve_forever()
@@ -0,0 +1,144 @@
+import hashlib
+import re
+from dataclasses import dataclass
+from html.parser import HTMLParser
+
+from .custom_deepeval.llm_judges.rate_limiter import estimate_prompt_tokens
+
+HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+BLOCK_TAGS = HEADING_TAGS | {
+    "address",
+    "article",
+    "aside",
+    "blockquote",
+    "br",
+    "dd",
+    "details",
+    "div",
+    "dl",
+    "dt",
+    "figcaption",
+    "figure",
+    "footer",
+    "header",
+    "hr",
+    "li",
+    "main",
+    "nav",
+    "ol",
+    "p",
+    "pre",
+    "section",
+    "summary",
+    "table",
+    "tbody",
+    "td",
+    "tfoot",
+    "th",
+    "thead",
+    "tr",
+    "ul",
+}
+IGNORED_TAGS = {"head", "noscript", "script", "style", "template"}
+
+_WHITESPACE = re.compile(r"\s+")
+_SPACES = re.compile(r"[^\S\n]+")
+_BLANK_LINES = re.compile(r"\n\s*\n+")
+
+
+class _HtmlTextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._parts: list[str] = []
+        self._ignored_depth = 0
+        self._pre_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "pre":
+            self._pre_depth += 1
+
+        if tag in IGNORED_TAGS:
+            self._ignored_depth += 1
+        elif tag in HEADING_TAGS:
+            self._parts.append("\n\n")
+        elif tag == "li":
+            self._parts.append("\n- ")
+        elif tag in {"td", "th"}:
+            self._parts.append(" | ")
+        elif tag in BLOCK_TAGS:
+            self._parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag == "pre":
+            self._pre_depth = max(0, self._pre_depth - 1)
+
+        if tag in IGNORED_TAGS:
+            self._ignored_depth = max(0, self._ignored_depth - 1)
+        elif tag in HEADING_TAGS:
+            self._parts.append("\n")
+        # list items and table rows are ended by the next one starting
+        elif tag in BLOCK_TAGS and tag not in {"li", "td", "th", "tr"}:
+            self._parts.append("\n")
+
+    def handle_data(self, data):
+        if self._ignored_depth:
+            return
+        # line breaks in HTML text are only whitespace, except in preformatted text
+        self._parts.append(data if self._pre_depth else _WHITESPACE.sub(" ", data))
+
+    def text(self) -> str:
+        text = _SPACES.sub(" ", "".join(self._parts))
+        lines = (line.strip() for line in text.split("\n"))
+        return _BLANK_LINES.sub("\n\n", "\n".join(lines)).strip()
+
+
+def html_to_text(html: str) -> str:
+    """Convert HTML to plain text, keeping headings, paragraphs and list items
+    on their own lines and collapsing whitespace"""
+    extractor = _HtmlTextExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return extractor.text()
+
+
+@dataclass
+class ContextCompactionStats:
+    chunks: int = 0
+    unique_chunks: int = 0
+    html_tokens: int = 0
+    text_tokens: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.html_tokens - self.text_tokens
+
+    def __str__(self) -> str:
+        return (
+            f"{self.chunks} chunks ({self.unique_chunks} unique), "
+            f"~{self.tokens_saved} of ~{self.html_tokens} tokens saved per run"
+        )
+
+
+class ContextCompactor:
+    """Converts the HTML of retrieved context chunks to plain text for the
+    judges. Chunks repeat across questions, so each is converted once and the
+    text is reused for later chunks with the same content."""
+
+    def __init__(self):
+        self.stats = ContextCompactionStats()
+        self._texts: dict[str, str] = {}
+
+    def compact(self, html: str) -> str:
+        key = hashlib.sha256(html.encode()).hexdigest()
+        text = self._texts.get(key)
+
+        if text is None:
+            text = html_to_text(html)
+            self._texts[key] = text
+            self.stats.unique_chunks += 1
+
+        self.stats.chunks += 1
+        self.stats.html_tokens += estimate_prompt_tokens(html)
+        self.stats.text_tokens += estimate_prompt_tokens(text)
+
+        return text
@@ -0,0 +1,14 @@
+from .judge_gpt_model import JudgeGPTModel, JudgeTokenUsage
+from .rate_limiter import JudgeRateLimiter
+from .response_cache import JudgeCacheStats, JudgeResponseCache
+from .telemetry import JudgeCall, JudgeTelemetry
+
+__all__ = [
+    "JudgeCall",
+    "JudgeCacheStats",
+    "JudgeGPTModel",
+    "JudgeRateLimiter",
+    "JudgeResponseCache",
+    "JudgeTelemetry",
+    "JudgeTokenUsage",
+]
@@ -0,0 +1,279 @@
+import asyncio
+import json
+import weakref
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple, Union, cast
+
+from deepeval.models.llms.openai_model import (
+    GPTModel,
+    log_retry_error,
+    model_pricing,
+    retryable_exceptions,
+    structured_outputs_models,
+)
+from deepeval.models.llms.utils import trim_and_load_json
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+from openai.types.chat import ChatCompletionMessageParam
+from openai.types.completion_usage import CompletionUsage
+from pydantic import BaseModel
+from tenacity import retry, retry_if_exception_type, wait_exponential_jitter
+
+from .rate_limiter import JudgeRateLimiter
+from .response_cache import JudgeResponseCache
+from .telemetry import JudgeTelemetry, http_event_hooks
+
+
+# OpenAI bills prompt tokens served from its prompt cache at half price
+CACHED_PROMPT_TOKEN_PRICE_RATIO = 0.5
+
+
+@dataclass
+class JudgeTokenUsage:
+    prompt_tokens: int = 0
+    cached_prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+    @property
+    def prompt_cache_hit_rate(self) -> float:
+        return (
+            self.cached_prompt_tokens / self.prompt_tokens
+            if self.prompt_tokens
+            else 0.0
+        )
+
+    def __str__(self) -> str:
+        return (
+            f"{self.prompt_tokens} prompt tokens, {self.cached_prompt_tokens} from "
+            f"the prompt cache ({self.prompt_cache_hit_rate:.1%}), "
+            f"{self.completion_tokens} completion tokens"
+        )
+
+
+class JudgeGPTModel(GPTModel):
+    """A GPTModel used as an LLM judge.
+
+    Requests are served from a JudgeResponseCache when one is given, and
+    asynchronous requests that reach OpenAI wait on a JudgeRateLimiter when one
+    is given. It remains a native deepeval model, so both the deepeval metrics
+    and our custom metrics use it without changes. Responses served from the
+    cache are reported with a cost of 0.
+
+    Prompts can also be sent as chat messages, with a static system message
+    that OpenAI caches as a prompt prefix. The token usage of these requests,
+    including the prompt tokens served from that cache, is recorded in
+    token_usage and their cost accounts for the cached tokens.
+
+    The OpenAI client is created once and reused by every request, so requests
+    share a pool of up to max_connections keep-alive connections. Asynchronous
+    clients are tied to an event loop, so there is one for each event loop.
+
+    Every request that reaches OpenAI is recorded in telemetry, with its
+    latency, token usage, retries and failures."""
+
+    def __init__(
+        self,
+        *args,
+        cache: Optional[JudgeResponseCache] = None,
+        rate_limiter: Optional[JudgeRateLimiter] = None,
+        max_connections: Optional[int] = None,
+        **kwargs,
+    ):
+        # set before GPTModel's init, which loads the synchronous client
+        self.max_connections = max_connections
+        self._client: Optional[OpenAI] = None
+        self._async_clients: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, AsyncOpenAI
+        ] = weakref.WeakKeyDictionary()
+        super().__init__(*args, **kwargs)
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.token_usage = JudgeTokenUsage()
+        self.telemetry = JudgeTelemetry()
+
+    def generate(
+        self, prompt: str, schema: Optional[BaseModel] = None
+    ) -> Tuple[Union[str, Dict], float]:
+        key = self._cache_key(prompt, schema)
+        cached = self._get_cached_response(key)
+        if cached is not None:
+            return self._load_response(cached, schema), 0.0
+
+        with self.telemetry.record(str(self.model_name)):
+            output, cost = super().generate(prompt, schema=schema)
+        self._cache_response(key, output)
+        return output, cost
+
+    async def a_generate(
+        self, prompt: str, schema: Optional[BaseModel] = None
+    ) -> Tuple[Union[str, BaseModel], float]:
+        key = self._cache_key(prompt, schema)
+        cached = self._get_cached_response(key)
+        if cached is not None:
+            return self._load_response(cached, schema), 0.0
+
+        limit = self.rate_limiter.limit(prompt) if self.rate_limiter else nullcontext()
+        async with limit:
+            with self.telemetry.record(str(self.model_name)):
+                output, cost = await super().a_generate(prompt, schema=schema)
+
+        self._cache_response(key, output)
+        return output, cost
+
+    async def a_generate_messages(
+        self, messages: list[dict[str, str]], schema: Optional[type[BaseModel]] = None
+    ) -> Tuple[Union[str, BaseModel], float]:
+        """Generate a response to chat messages, which are cached and rate
+        limited as the prompt of their joined contents"""
+        prompt = "\n\n".join(message["content"] for message in messages)
+        key = self._cache_key(prompt, schema)  # type: ignore[arg-type]
+        cached = self._get_cached_response(key)
+        if cached is not None:
+            return self._load_response(cached, schema), 0.0  # type: ignore[arg-type]
+
+        limit = self.rate_limiter.limit(prompt) if self.rate_limiter else nullcontext()
+        async with limit:
+            with self.telemetry.record(str(self.model_name)):
+                output, cost = await self._a_complete_messages(messages, schema)
+
+        self._cache_response(key, output)
+        return output, cost
+
+    @retry(
+        wait=wait_exponential_jitter(initial=1, exp_base=2, jitter=2, max=10),
+        retry=retry_if_exception_type(retryable_exceptions),
+        after=log_retry_error,
+    )
+    async def _a_complete_messages(
+        self, messages: list[dict[str, str]], schema: Optional[type[BaseModel]]
+    ) -> Tuple[Union[str, BaseModel], float]:
+        client = cast(AsyncOpenAI, self.load_model(async_mode=True))
+        chat_messages = cast(list[ChatCompletionMessageParam], messages)
+
+        if schema and self.model_name in structured_outputs_models:
+            completion = await client.beta.chat.completions.parse(
+                model=str(self.model_name),
+                messages=chat_messages,
+                response_format=schema,
+                temperature=self.temperature,
+            )
+            output = cast(BaseModel, completion.choices[0].message.parsed)
+        else:
+            completion = await client.chat.completions.create(
+                model=str(self.model_name),
+                messages=chat_messages,
+                temperature=self.temperature,
+            )
+            content = completion.choices[0].message.content or ""
+            output = (
+                schema.model_validate(trim_and_load_json(content))
+                if schema
+                else content
+            )
+
+        return output, self._record_usage(completion.usage)
+
+    def _record_usage(self, usage: Optional[CompletionUsage]) -> float:
+        """Add the usage of a completion to token_usage, returning its cost"""
+        if usage is None:
+            return 0.0
+
+        details = usage.prompt_tokens_details
+        cached_tokens = (details.cached_tokens or 0) if details else 0
+
+        self.token_usage.prompt_tokens += usage.prompt_tokens
+        self.token_usage.cached_prompt_tokens += cached_tokens
+        self.token_usage.completion_tokens += usage.completion_tokens
+
+        input_price = model_pricing.get(str(self.model_name), {}).get("input", 0.0)
+        return (
+            self.calculate_cost(
+                usage.prompt_tokens - cached_tokens, usage.completion_tokens
+            )
+            + cached_tokens * input_price * CACHED_PROMPT_TOKEN_PRICE_RATIO
+        )
+
+    def load_model(self, async_mode: bool = False):
+        # GPTModel ignores base_url, which is needed to use other OpenAI
+        # compatible servers, and creates a new client for every request
+        if not async_mode:
+            if self._client is None:
+                self._client = OpenAI(
+                    api_key=self._openai_api_key,
+                    base_url=self.base_url,
+                    http_client=DefaultHttpxClient(
+                        **self._http_client_options(),
+                        event_hooks=http_event_hooks(async_mode=False),
+                    ),
+                )
+            return self._client
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return self._async_client()
+
+        if loop not in self._async_clients:
+            self._async_clients[loop] = self._async_client()
+        return self._async_clients[loop]
+
+    def _async_client(self) -> AsyncOpenAI:
+        return AsyncOpenAI(
+            api_key=self._openai_api_key,
+            base_url=self.base_url,
+            http_client=DefaultAsyncHttpxClient(
+                **self._http_client_options(),
+                event_hooks=http_event_hooks(async_mode=True),
+            ),
+        )
+
+    def _http_client_options(self) -> dict[str, Any]:
+        # the OpenAI client's default limits apply unless max_connections is set
+        if self.max_connections is None:
+            return {}
+        return {
+            "limits": httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            )
+        }
+
+    def _cache_key(self, prompt: str, schema: Optional[BaseModel]) -> Optional[str]:
+        if self.cache is None:
+            return None
+
+        # responses from another server mustn't be served as OpenAI's
+        model_name = str(self.get_model_name())
+        if self.base_url:
+            model_name = f"{model_name}@{self.base_url}"
+
+        return self.cache.key_for(
+            model_name,
+            self.temperature,
+            prompt,
+            schema,  # type: ignore[arg-type]
+        )
+
+    def _get_cached_response(self, key: Optional[str]) -> Optional[str]:
+        if self.cache is None or key is None:
+            return None
+        return self.cache.get(key)
+
+    def _cache_response(
+        self, key: Optional[str], output: Union[str, Dict, BaseModel]
+    ) -> None:
+        if self.cache is None or key is None:
+            return
+        self.cache.set(key, self._dump_response(output))
+
+    @staticmethod
+    def _dump_response(output: Union[str, Dict, BaseModel]) -> str:
+        if isinstance(output, BaseModel):
+            return json.dumps(output.model_dump(mode="json"))
+        return json.dumps(output)
+
+    @staticmethod
+    def _load_response(cached: str, schema: Optional[BaseModel]) -> Any:
+        data = json.loads(cached)
+        return schema.model_validate(data) if schema else data
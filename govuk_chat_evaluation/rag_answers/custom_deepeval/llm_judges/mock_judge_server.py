@@ -0,0 +1,205 @@
+import json
+import logging
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional, Self
+
+from .rate_limiter import estimate_prompt_tokens
+
+MOCK_TEXT = "A mock judge response"
+
+_CASE_ID = re.compile(r"^Test Case ID: (\S+)$", re.MULTILINE)
+
+
+def mock_value(schema: dict[str, Any], defs: dict[str, Any], prompt: str) -> Any:
+    """Return a value that is valid for a JSON schema.
+
+    Enums use their first value, strings are MOCK_TEXT and arrays have a
+    single item, except arrays of objects with a case_id which have an item
+    for each "Test Case ID" in the prompt, as in a batched prompt."""
+    if "$ref" in schema:
+        return mock_value(defs[schema["$ref"].split("/")[-1]], defs, prompt)
+    if "enum" in schema:
+        return schema["enum"][0]
+    if "const" in schema:
+        return schema["const"]
+    if "anyOf" in schema:
+        options = [option for option in schema["anyOf"] if option.get("type") != "null"]
+        return mock_value(options[0], defs, prompt) if options else None
+
+    schema_type = schema.get("type")
+    if isinstance(schema_type, list):
+        schema_type = next((t for t in schema_type if t != "null"), "null")
+
+    match schema_type:
+        case "object":
+            return {
+                name: mock_value(property_schema, defs, prompt)
+                for name, property_schema in schema.get("properties", {}).items()
+            }
+        case "array":
+            items = schema.get("items", {})
+            item = mock_value(items, defs, prompt)
+            if isinstance(item, dict) and "case_id" in item:
+                return [
+                    item | {"case_id": case_id} for case_id in _CASE_ID.findall(prompt)
+                ]
+            return [item]
+        case "integer":
+            return 1
+        case "number":
+            return 1.0
+        case "boolean":
+            return True
+        case "null":
+            return None
+        case _:
+            return MOCK_TEXT
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # judges make many concurrent requests, which the default backlog of 5
+    # would refuse
+    request_queue_size = 1024
+
+
+class MockJudgeServer:
+    """A local stand-in for the OpenAI chat completions API, so the judge path
+    can be run and benchmarked without network access or an API key.
+
+    Responses to structured output requests are generated from the requested
+    JSON schema with mock_value, other requests get MOCK_TEXT. Each response
+    is delayed by latency_seconds, plus up to latency_jitter_seconds. System
+    messages that have been sent before are reported as cached prompt tokens,
+    like OpenAI's prompt caching."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_seconds: float = 0.0,
+        latency_jitter_seconds: float = 0.0,
+    ):
+        self.latency_seconds = latency_seconds
+        self.latency_jitter_seconds = latency_jitter_seconds
+        self.request_count = 0
+        self._seen_system_messages: set[str] = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._httpd = _HTTPServer((host, port), self._handler_class())
+
+    @property
+    def url(self) -> str:
+        """The base URL to give an OpenAI client"""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host!s}:{port}/v1"
+
+    def start(self) -> Self:
+        """Serve requests from a background thread"""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def serve_forever(self) -> None:
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def __enter__(self) -> Self:
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def chat_completion(self, request: dict[str, Any]) -> dict[str, Any]:
+        """Return the chat completion response body for a request body"""
+        messages = request.get("messages", [])
+        prompt = "\n\n".join(str(message.get("content", "")) for message in messages)
+        response_format = request.get("response_format") or {}
+
+        if response_format.get("type") == "json_schema":
+            schema = response_format["json_schema"]["schema"]
+            content = json.dumps(mock_value(schema, schema.get("$defs", {}), prompt))
+        elif response_format.get("type") == "json_object":
+            content = json.dumps({"response": MOCK_TEXT})
+        else:
+            content = MOCK_TEXT
+
+        prompt_tokens = estimate_prompt_tokens(prompt)
+        completion_tokens = estimate_prompt_tokens(content)
+
+        with self._lock:
+            self.request_count += 1
+            cached_tokens = 0
+            for message in messages:
+                if message.get("role") != "system":
+                    continue
+                if message["content"] in self._seen_system_messages:
+                    cached_tokens += estimate_prompt_tokens(message["content"])
+                self._seen_system_messages.add(message["content"])
+
+        return {
+            "id": f"chatcmpl-mock-{self.request_count}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {
+                        "role": "assistant",
+                        "content": content,
+                        "refusal": None,
+                    },
+                    "logprobs": None,
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": cached_tokens},
+            },
+        }
+
+    def _latency(self) -> float:
+        return self.latency_seconds + random.uniform(0, self.latency_jitter_seconds)
+
+    def _handler_class(self) -> type[BaseHTTPRequestHandler]:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": "Not found"}})
+                    return
+
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                time.sleep(server._latency())
+                self._send_json(200, server.chat_completion(request))
+
+            def _send_json(self, status: int, body: dict[str, Any]):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                logging.debug(f"Mock judge server: {format % args}")
+
+        return Handler
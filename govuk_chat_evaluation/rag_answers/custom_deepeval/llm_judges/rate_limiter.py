@@ -0,0 +1,86 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+# Tokens charged for each response, as OpenAI's tokens per minute limit counts
+# completion tokens as well as prompt tokens. Judge responses are short JSON
+# verdicts, so this is a generous allowance for them.
+DEFAULT_COMPLETION_TOKENS = 500
+
+
+def estimate_prompt_tokens(prompt: str) -> int:
+    """A rough token count for a prompt, using the ~4 characters per token
+    rule of thumb for English text"""
+    return len(prompt) // 4 + 1
+
+
+class TokenBucket:
+    """An asyncio token bucket that allows up to per_minute units to be
+    consumed in any minute, refilling continuously"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = per_minute
+        self._tokens = float(per_minute)
+        self._refill_per_second = per_minute / 60
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, amount: int = 1) -> None:
+        amount = min(amount, self.capacity)
+
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+
+                await asyncio.sleep((amount - self._tokens) / self._refill_per_second)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity,
+            self._tokens + (now - self._updated_at) * self._refill_per_second,
+        )
+        self._updated_at = now
+
+
+class JudgeRateLimiter:
+    """Limits the requests made to a judge model, shared by every metric that
+    uses that model. Each limit is optional.
+
+    The tokens per minute limit is charged with the estimated prompt tokens and
+    an allowance of completion_tokens for the response, before the request is
+    made."""
+
+    def __init__(
+        self,
+        max_concurrent: Optional[int] = None,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        completion_tokens: int = DEFAULT_COMPLETION_TOKENS,
+    ):
+        self._semaphore = asyncio.Semaphore(max_concurrent) if max_concurrent else None
+        self._requests = (
+            TokenBucket(requests_per_minute) if requests_per_minute else None
+        )
+        self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.completion_tokens = completion_tokens
+
+    @asynccontextmanager
+    async def limit(self, prompt: str) -> AsyncIterator[None]:
+        """Wait until a request for the prompt is within the limits"""
+        if self._requests:
+            await self._requests.acquire()
+        if self._tokens:
+            await self._tokens.acquire(
+                estimate_prompt_tokens(prompt) + self.completion_tokens
+            )
+
+        if self._semaphore:
+            async with self._semaphore:
+                yield
+        else:
+            yield
@@ -0,0 +1,180 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterator, Optional
+
+from pydantic import BaseModel
+
+
+@dataclass
+class JudgeCacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.hits} hits, {self.misses} misses "
+            f"({self.hit_rate:.1%} hit rate), {self.evictions} evictions"
+        )
+
+
+_current_test_case: ContextVar[Optional[str]] = ContextVar(
+    "judged_test_case", default=None
+)
+
+
+@contextmanager
+def judged_test_case(name: Optional[str]) -> Iterator[None]:
+    """Key the judge requests made within the block by the test case, whose
+    name is tagged with its run"""
+    token = _current_test_case.set(name)
+    try:
+        yield
+    finally:
+        _current_test_case.reset(token)
+
+
+# seconds a write waits for another process's write to the cache to finish
+BUSY_TIMEOUT_SECONDS = 60.0
+
+
+@lru_cache
+def _schema_fingerprint(schema: type[BaseModel]) -> str:
+    return json.dumps(schema.model_json_schema(), sort_keys=True)
+
+
+class JudgeResponseCache:
+    """A SQLite backed cache of LLM judge responses, shared by every judge model
+    in an evaluation.
+
+    Entries are keyed by a hash of the judge model, temperature, prompt and
+    response schema, and by the test case being judged. Test case names are
+    tagged with their run, so repeated runs of the same test case get
+    independent judgements, including runs that are added or resumed in
+    another process. Identical requests for the same test case are given
+    distinct keys (the first, second, ... occurrence), while a re-run of the
+    whole evaluation is served from the cache.
+
+    When the cache holds more than max_entries the least recently used entries
+    are removed.
+
+    Worker processes share the cache file. SQLite allows one writer at a time,
+    so a write waits up to BUSY_TIMEOUT_SECONDS for the others to finish, and
+    the entries are counted again before evicting as the other processes add
+    to them. The stats of each instance count only its own lookups and
+    evictions."""
+
+    def __init__(self, path: Path, max_entries: int = 100_000):
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.path = path
+        self.max_entries = max_entries
+        self.stats = JudgeCacheStats()
+        self._occurrences: Counter[str] = Counter()
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path,
+            timeout=BUSY_TIMEOUT_SECONDS,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, last_used_at REAL NOT NULL)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS responses_last_used_at "
+            "ON responses (last_used_at)"
+        )
+        (self._entries,) = self._connection.execute(
+            "SELECT COUNT(*) FROM responses"
+        ).fetchone()
+
+    def key_for(
+        self,
+        model_name: str,
+        temperature: float,
+        prompt: str,
+        schema: Optional[type[BaseModel]] = None,
+    ) -> str:
+        """Return the cache key for the next occurrence of this request for
+        the test case being judged"""
+        request = json.dumps(
+            [
+                model_name,
+                temperature,
+                prompt,
+                _schema_fingerprint(schema) if schema else None,
+                _current_test_case.get(),
+            ]
+        )
+        request_hash = hashlib.sha256(request.encode()).hexdigest()
+
+        with self._lock:
+            occurrence = self._occurrences[request_hash]
+            self._occurrences[request_hash] += 1
+
+        return f"{request_hash}:{occurrence}"
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT response FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.stats.misses += 1
+                return None
+
+            self.stats.hits += 1
+            self._connection.execute(
+                "UPDATE responses SET last_used_at = ? WHERE key = ?",
+                (time.time(), key),
+            )
+            return row[0]
+
+    def set(self, key: str, response: str) -> None:
+        with self._lock:
+            cursor = self._connection.execute(
+                "INSERT OR IGNORE INTO responses (key, response, last_used_at) "
+                "VALUES (?, ?, ?)",
+                (key, response, time.time()),
+            )
+            self._entries += cursor.rowcount
+
+            if self._entries > self.max_entries:
+                (self._entries,) = self._connection.execute(
+                    "SELECT COUNT(*) FROM responses"
+                ).fetchone()
+            if self._entries > self.max_entries:
+                self._evict(self._entries - self.max_entries)
+
+    def _evict(self, count: int) -> None:
+        cursor = self._connection.execute(
+            "DELETE FROM responses WHERE key IN "
+            "(SELECT key FROM responses ORDER BY last_used_at ASC LIMIT ?)",
+            (count,),
+        )
+        self._entries -= cursor.rowcount
+        self.stats.evictions += cursor.rowcount
+
+    def __len__(self) -> int:
+        return self._entries
+
+    def close(self) -> None:
+        self._connection.close()
@@ -0,0 +1,204 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Iterator, Optional, TypeVar, cast
+
+import httpx
+import pandas as pd
+from deepeval.metrics import BaseMetric
+
+from .response_cache import judged_test_case
+
+TELEMETRY_FILENAME = "judge_telemetry.jsonl"
+
+Metric = TypeVar("Metric", bound=BaseMetric)
+
+_current_metric: ContextVar[Optional[str]] = ContextVar("judged_metric", default=None)
+_current_call: ContextVar[Optional["JudgeCall"]] = ContextVar(
+    "judge_call", default=None
+)
+
+
+@dataclass
+class JudgeCall:
+    """The telemetry of one request to a judge, including any retries"""
+
+    metric: Optional[str]
+    model: str
+    latency_seconds: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    retries: int = 0
+    parse_failure: bool = False
+    error: Optional[str] = None
+    # HTTP requests made, the first attempt and its retries
+    _attempts: int = 0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {key: value for key, value in asdict(self).items() if key != "_attempts"}
+
+
+class JudgeTelemetry:
+    """Records the latency, token usage, retries and failures of the requests a
+    judge makes, attributed to the metric being measured"""
+
+    def __init__(self):
+        self.calls: list[JudgeCall] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def record(self, model: str) -> Iterator[JudgeCall]:
+        """Record a request to the judge model made within the block. A
+        response that can't be parsed for the requested schema is recorded as
+        a parse failure, other exceptions as errors."""
+        call = JudgeCall(metric=_current_metric.get(), model=model)
+        token = _current_call.set(call)
+        start = time.perf_counter()
+        try:
+            yield call
+        except ValueError as e:
+            # invalid JSON and pydantic validation errors
+            call.parse_failure = True
+            call.error = type(e).__name__
+            raise
+        except Exception as e:
+            call.error = type(e).__name__
+            raise
+        finally:
+            call.latency_seconds = time.perf_counter() - start
+            _current_call.reset(token)
+            with self._lock:
+                self.calls.append(call)
+
+    def take_calls(self) -> list[JudgeCall]:
+        """Return the calls recorded so far and stop holding them, so they can
+        be written out as the evaluation goes"""
+        with self._lock:
+            calls, self.calls = self.calls, []
+        return calls
+
+
+@contextmanager
+def judged_metric(metric_name: str) -> Iterator[None]:
+    """Attribute the judge requests made within the block to the metric"""
+    token = _current_metric.set(metric_name)
+    try:
+        yield
+    finally:
+        _current_metric.reset(token)
+
+
+_telemetry_metric_classes: dict[type, type] = {}
+
+
+def with_judge_telemetry(metric_class: type[Metric]) -> type[Metric]:
+    """Return a subclass of the metric class that attributes the judge requests
+    made while measuring to the metric, and keys their cached responses by the
+    test case. Deepeval copies metrics by their class, so the copies it
+    measures with are attributed too."""
+    if metric_class in _telemetry_metric_classes:
+        return _telemetry_metric_classes[metric_class]
+
+    base_class: Any = metric_class
+
+    class TelemetryMetric(base_class):
+        def measure(self, test_case, *args, **kwargs):
+            with judged_metric(self.__name__), judged_test_case(test_case.name):
+                return super().measure(test_case, *args, **kwargs)
+
+        async def a_measure(self, test_case, *args, **kwargs):
+            with judged_metric(self.__name__), judged_test_case(test_case.name):
+                return await super().a_measure(test_case, *args, **kwargs)
+
+    _telemetry_metric_classes[metric_class] = TelemetryMetric
+    return cast(type[Metric], TelemetryMetric)
+
+
+def http_event_hooks(async_mode: bool) -> dict[str, list]:
+    """Hooks for the judge's HTTP client that count the requests made for each
+    recorded judge request, so retries are counted, and read the token usage
+    of its successful response"""
+    if async_mode:
+
+        async def a_on_response(response: httpx.Response) -> None:
+            if _current_call.get() is not None and response.is_success:
+                await response.aread()
+            _record_response(response)
+
+        return {"request": [_a_record_attempt], "response": [a_on_response]}
+
+    def on_response(response: httpx.Response) -> None:
+        if _current_call.get() is not None and response.is_success:
+            response.read()
+        _record_response(response)
+
+    return {"request": [_record_attempt], "response": [on_response]}
+
+
+def write_judge_telemetry(path: Path, calls: list[JudgeCall]) -> None:
+    """Append the calls to a JSONL file"""
+    with open(path, "a", encoding="utf8") as file:
+        file.writelines(json.dumps(call.to_dict()) + "\n" for call in calls)
+
+
+def judge_telemetry_summary(path: Path) -> pd.DataFrame:
+    """
+    Summarise a judge telemetry file.
+
+    Returns:
+        A row for each metric and judge model, with the number of requests,
+        the p50 and p95 of their latency and token usage, and their total
+        retries, parse failures and errors
+    """
+    calls = pd.read_json(path, lines=True, dtype={"metric": str})
+    if calls.empty:
+        return pd.DataFrame()
+
+    calls["metric"] = calls["metric"].fillna("unknown")
+    calls["errored"] = calls["error"].notna()
+    grouped = calls.groupby(["metric", "model"])
+
+    return pd.DataFrame(
+        {
+            "requests": grouped.size(),
+            "latency_p50": grouped["latency_seconds"].quantile(0.5),
+            "latency_p95": grouped["latency_seconds"].quantile(0.95),
+            "prompt_tokens_p50": grouped["prompt_tokens"].quantile(0.5),
+            "prompt_tokens_p95": grouped["prompt_tokens"].quantile(0.95),
+            "completion_tokens_p50": grouped["completion_tokens"].quantile(0.5),
+            "completion_tokens_p95": grouped["completion_tokens"].quantile(0.95),
+            "retries": grouped["retries"].sum(),
+            "parse_failures": grouped["parse_failure"].sum(),
+            "errors": grouped["errored"].sum(),
+        }
+    )
+
+
+def _record_attempt(request: httpx.Request) -> None:
+    call = _current_call.get()
+    if call is None:
+        return
+    if call._attempts:
+        call.retries += 1
+    call._attempts += 1
+
+
+async def _a_record_attempt(request: httpx.Request) -> None:
+    _record_attempt(request)
+
+
+def _record_response(response: httpx.Response) -> None:
+    call = _current_call.get()
+    if call is None or not response.is_success:
+        return
+
+    try:
+        usage = response.json().get("usage") or {}
+    except (ValueError, AttributeError):
+        return
+    call.prompt_tokens += usage.get("prompt_tokens", 0)
+    call.completion_tokens += usage.get("completion_tokens", 0)
@@ -1,3 +1,8 @@
-from .factual_correctness import FactualCorrectnessMetric
+from .batcher import FactClassificationBatcher
+from .factual_correctness import FactualCorrectnessMetric, FactualCorrectnessResult
 
-__all__ = ["FactualCorrectnessMetric"]
+__all__ = [
+    "FactClassificationBatcher",
+    "FactualCorrectnessMetric",
+    "FactualCorrectnessResult",
+]
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Optional, cast
+
+from deepeval.models import DeepEvalBaseLLM
+
+from ...llm_judges import JudgeGPTModel
+from .schema import BatchFactClassificationResult, ClassifiedFacts
+from .template import FactualCorrectnessTemplate
+
+
+@dataclass
+class _PendingCase:
+    case_id: str
+    answer: str
+    ground_truth: str
+    future: "asyncio.Future[tuple[Optional[ClassifiedFacts], float]]"
+
+
+class FactClassificationBatcher:
+    """Packs the fact classification of several test cases into a single judge
+    request, shared by every copy of a FactualCorrectnessMetric.
+
+    A batch is sent once batch_size test cases are waiting, or max_wait_seconds
+    after the first one arrived. Deepeval starts a test case every
+    throttle_value seconds, so batches only fill when that is lower than
+    max_wait_seconds. Test cases missing from a malformed or failed response
+    are given no classified facts, for the metric to classify them alone."""
+
+    def __init__(
+        self,
+        model: DeepEvalBaseLLM,
+        batch_size: int,
+        max_wait_seconds: float = 0.5,
+    ):
+        self.model = model
+        self.batch_size = batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self._pending: list[_PendingCase] = []
+        self._tasks: set[asyncio.Task] = set()
+
+    async def classify(
+        self, answer: str, ground_truth: str
+    ) -> tuple[Optional[ClassifiedFacts], float]:
+        """Classify the facts of a test case as part of a batch, returning the
+        classified facts (or None if the batch couldn't classify them) and the
+        test case's share of the batch cost"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(
+            _PendingCase(
+                case_id=str(len(self._pending) + 1),
+                answer=answer,
+                ground_truth=ground_truth,
+                future=future,
+            )
+        )
+
+        if len(self._pending) >= self.batch_size:
+            self._start(self._classify_batch(self._take_batch()))
+        elif len(self._pending) == 1:
+            self._start(self._classify_after_wait(self._pending))
+
+        return await future
+
+    def _take_batch(self) -> list[_PendingCase]:
+        batch, self._pending = self._pending, []
+        return batch
+
+    def _start(self, coroutine) -> None:
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _classify_after_wait(self, batch: list[_PendingCase]) -> None:
+        await asyncio.sleep(self.max_wait_seconds)
+        # the batch may have filled up and been sent while waiting
+        if batch is self._pending:
+            await self._classify_batch(self._take_batch())
+
+    async def _classify_batch(self, batch: list[_PendingCase]) -> None:
+        classified_facts: dict[str, ClassifiedFacts] = {}
+        cost = 0.0
+
+        try:
+            cases = [(case.case_id, case.answer, case.ground_truth) for case in batch]
+            if isinstance(self.model, JudgeGPTModel):
+                res, res_cost = await self.model.a_generate_messages(
+                    FactualCorrectnessTemplate.classify_facts_batch_messages(cases),
+                    schema=BatchFactClassificationResult,
+                )
+            else:
+                res, res_cost = await self.model.a_generate(
+                    FactualCorrectnessTemplate.classify_facts_batch(cases),
+                    schema=BatchFactClassificationResult,
+                )
+            if isinstance(res_cost, (int, float)):
+                cost = float(res_cost)
+            classified_facts = {
+                result.case_id: result.classified_facts
+                for result in cast(BatchFactClassificationResult, res).results
+            }
+        except Exception as e:
+            logging.warning(
+                f"Failed to classify a batch of {len(batch)} test cases, "
+                "classifying them individually",
+                exc_info=e,
+            )
+        finally:
+            for case in batch:
+                facts = classified_facts.get(case.case_id)
+                if facts is not None and not facts.has_facts():
+                    facts = None
+                if not case.future.done():
+                    case.future.set_result((facts, cost / len(batch)))
@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 from typing import Optional, List, Type
 
 from deepeval.test_case import LLMTestCase, LLMTestCaseParams
@@ -12,6 +13,8 @@ from deepeval.models import DeepEvalBaseLLM
 from deepeval.metrics.indicator import metric_progress_indicator
 from deepeval.telemetry import capture_metric_type
 
+from ...llm_judges import JudgeGPTModel
+from .batcher import FactClassificationBatcher
 from .template import (
     FactualCorrectnessTemplate,
 )
@@ -19,6 +22,16 @@ from .schema import ClassifiedFacts, FactClassificationResult
 import logging
 
 
+@dataclass(frozen=True)
+class FactualCorrectnessResult:
+    confusion_matrix: ClassifiedFacts
+    score: float
+    reason: Optional[str] = None
+    success: bool = False
+    evaluation_cost: Optional[float] = None
+    error: Optional[str] = None
+
+
 class FactualCorrectnessMetric(BaseMetric):
     _required_params: List[LLMTestCaseParams] = [
         LLMTestCaseParams.INPUT,
@@ -35,6 +48,7 @@ class FactualCorrectnessMetric(BaseMetric):
         threshold: float = 0.5,
         include_reason: bool = True,
         strict_mode: bool = False,
+        batcher: Optional[FactClassificationBatcher] = None,
     ):
         self.model, self.using_native_model = initialize_model(model)
         self.threshold = 1 if strict_mode else threshold
@@ -43,6 +57,7 @@ class FactualCorrectnessMetric(BaseMetric):
         self.strict_mode = strict_mode
         self.evaluation_cost = 0 if self.using_native_model else None
         self.confusion_matrix: ClassifiedFacts = ClassifiedFacts()
+        self.batcher = batcher
 
     def measure(self, test_case: LLMTestCase, *args, **kwargs) -> float:
         """Synchronously evaluate the factual correctness of a test case."""
@@ -53,73 +68,126 @@ class FactualCorrectnessMetric(BaseMetric):
     async def a_measure(
         self, test_case: LLMTestCase, _show_indicator: bool = True
     ) -> float:
-        """Asynchronously evaluate the factual correctness of a test case."""
-        check_llm_test_case_params(test_case, self._required_params, self)
+        """Asynchronously evaluate the factual correctness of a test case.
 
+        The result is also stored on the metric, where deepeval reads it from."""
         with metric_progress_indicator(
             self, async_mode=self.async_mode, _show_indicator=_show_indicator
         ):
-            self.confusion_matrix = await self._a_classify_statements(
-                test_case.input,
-                test_case.actual_output,
-                test_case.expected_output or "",
-            )
-            logging.debug(
-                f"Confusion matrix for test input: '{test_case.input}': \n{self.confusion_matrix}"
-            )
-            return self._finalise_evaluation(test_case.input)
+            result = await self.a_evaluate(test_case)
 
-    def _finalise_evaluation(self, input: str) -> float:
-        """Finalise the evaluation by computing score, reason, and success status."""
-        if self.confusion_matrix.has_facts():
-            self.score = self._calculate_score()
-            self.reason = self._generate_reason()
-            self.success = self.score >= self.threshold
+            self.confusion_matrix = result.confusion_matrix
+            self.evaluation_cost = result.evaluation_cost
+            if result.error is not None:
+                self.error = result.error
+                return result.score
+
+            self.score = result.score
+            self.reason = result.reason
+            self.success = result.success
             capture_metric_type(self.__name__, async_mode=self.async_mode)
-            return self.score
-        else:
-            self.error = f"Error: no facts were classified. confusion_matrix is empty for input: {input}."
-            logging.error(self.error)
-            return float("nan")
+            return result.score
+
+    async def a_evaluate(self, test_case: LLMTestCase) -> FactualCorrectnessResult:
+        """Evaluate the factual correctness of a test case without changing the
+        metric, so one metric can evaluate many test cases concurrently."""
+        check_llm_test_case_params(test_case, self._required_params, self)
 
-    def _generate_reason(self) -> Optional[str]:
-        if not self.include_reason or not self.confusion_matrix.has_facts():
+        confusion_matrix, cost = await self._a_classify_statements(
+            test_case.input,
+            test_case.actual_output,
+            test_case.expected_output or "",
+        )
+        logging.debug(
+            f"Confusion matrix for test input: '{test_case.input}': \n{confusion_matrix}"
+        )
+        return self._finalise_evaluation(test_case.input, confusion_matrix, cost)
+
+    def _finalise_evaluation(
+        self,
+        input: str,
+        confusion_matrix: ClassifiedFacts,
+        evaluation_cost: Optional[float],
+    ) -> FactualCorrectnessResult:
+        """Finalise the evaluation by computing score, reason, and success status."""
+        if not confusion_matrix.has_facts():
+            error = f"Error: no facts were classified. confusion_matrix is empty for input: {input}."
+            logging.error(error)
+            return FactualCorrectnessResult(
+                confusion_matrix=confusion_matrix,
+                score=float("nan"),
+                evaluation_cost=evaluation_cost,
+                error=error,
+            )
+
+        score = self._calculate_score(confusion_matrix)
+        return FactualCorrectnessResult(
+            confusion_matrix=confusion_matrix,
+            score=score,
+            reason=self._generate_reason(confusion_matrix),
+            success=score >= self.threshold,
+            evaluation_cost=evaluation_cost,
+        )
+
+    def _generate_reason(self, confusion_matrix: ClassifiedFacts) -> Optional[str]:
+        if not self.include_reason or not confusion_matrix.has_facts():
             return None
-        return f'{{"true_positive_statements": {self.confusion_matrix.TP}, "false_positive_statements": {self.confusion_matrix.FP}}}'
+        return f'{{"true_positive_statements": {confusion_matrix.TP}, "false_positive_statements": {confusion_matrix.FP}}}'
 
     async def _a_classify_statements(
         self, input: str, actual_output: str, expected_output: str
-    ) -> ClassifiedFacts:
+    ) -> tuple[ClassifiedFacts, Optional[float]]:
+        """Classify the facts of the answer, returning them with the cost of
+        the judge requests, which is None for non-native models"""
+        cost = 0.0 if self.using_native_model else None
+
+        if self.batcher is not None and self.using_native_model:
+            classified_facts, batch_cost = await self.batcher.classify(
+                actual_output, expected_output
+            )
+            cost = (cost or 0.0) + batch_cost
+            if classified_facts is not None:
+                return classified_facts, cost
+
+        if isinstance(self.model, JudgeGPTModel):
+            res, request_cost = await self.model.a_generate_messages(
+                self.evaluation_template.classify_facts_messages(
+                    answer=actual_output, ground_truth=expected_output
+                ),
+                schema=FactClassificationResult,
+            )
+            return res.classified_facts, (cost or 0.0) + request_cost  # type: ignore[union-attr]
+
         prompt = self.evaluation_template.classify_facts(
             answer=actual_output, ground_truth=expected_output
         )
         if self.using_native_model:
-            res, cost = await self.model.a_generate(
+            res, request_cost = await self.model.a_generate(
                 prompt, schema=FactClassificationResult
             )
-            if isinstance(cost, (int, float)):
-                self.evaluation_cost = (self.evaluation_cost or 0.0) + cost
-            return res.classified_facts  # type: ignore[arg-type]
+            if isinstance(request_cost, (int, float)):
+                cost = (cost or 0.0) + request_cost
+            return res.classified_facts, cost  # type: ignore[arg-type]
         else:
             try:
                 res = await self.model.a_generate(
                     prompt, schema=FactClassificationResult
                 )
-                return res.classified_facts  # type: ignore[arg-type]
+                return res.classified_facts, cost  # type: ignore[arg-type]
             except TypeError:
                 try:
                     res = await self.model.a_generate(prompt)
                     data = trimAndLoadJson(res, self)
                     data_model = FactClassificationResult(**data)
-                    return data_model.classified_facts
+                    return data_model.classified_facts, cost
                 except Exception as inner_e:
                     logging.error(
                         f"Failed to parse fallback JSON for test input: {input}",
                         exc_info=inner_e,
                     )
-                    return ClassifiedFacts()
+                    return ClassifiedFacts(), cost
 
-    def _calculate_score(self) -> float:
+    def _calculate_score(self, confusion_matrix: ClassifiedFacts) -> float:
         """
         Calculates the factual-correctness score based on the confusion matrix as a
         float between 0 and 1. The score is calculated as the ratio of the number of
@@ -129,11 +197,8 @@ class FactualCorrectnessMetric(BaseMetric):
         Returns:
             float: The factual-correctness score.
         """
-        if self.confusion_matrix is None:
-            return 0.0
-
-        tp = len(self.confusion_matrix.TP)
-        fp = len(self.confusion_matrix.FP)
+        tp = len(confusion_matrix.TP)
+        fp = len(confusion_matrix.FP)
         score = tp / (tp + fp) if (tp + fp) > 0 else 0.0
 
         return 0.0 if self.strict_mode and score < self.threshold else score
@@ -12,3 +12,12 @@ class ClassifiedFacts(BaseModel):
 
 class FactClassificationResult(BaseModel):
     classified_facts: ClassifiedFacts
+
+
+class CaseClassifiedFacts(BaseModel):
+    case_id: str
+    classified_facts: ClassifiedFacts
+
+
+class BatchFactClassificationResult(BaseModel):
+    results: list[CaseClassifiedFacts]
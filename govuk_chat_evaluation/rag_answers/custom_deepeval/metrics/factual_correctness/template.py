@@ -1,36 +1,19 @@
-class FactualCorrectnessTemplate:
-    @staticmethod
-    def classify_facts(answer, ground_truth):
-        return f"""Given a ground-truth and an answer, analyse each key fact in the answer and classify them in one of the following categories:
+CLASSIFICATION_INSTRUCTIONS = """Given a ground-truth and an answer, analyse each key fact in the answer and classify them in one of the following categories:
 
 - TP (true positive): key facts that are present in both the answer and the ground truth,
 - FP (false positive): key facts present in the answer but not found in the ground truth,
 - FN (false negative): relevant key facts found in the ground truth but omitted in the answer.
 
-IMPORTANT: Each key fact must be classified in exactly one category. Do not try to interpret the meaning of the ground truth or the answer, just compare the presence of the key facts in them.
-
-You are going to write a JSON to collect your classified key facts into a JSON object. The JSON will have 3 fields, each corresponding to a category: 'TP' (list of true positive key facts), 'FP' (list of false positive key facts), and 'FN' (list of false negative key facts).
-
-Now consider the following python pydantic BaseModel for the JSON schema:
-
-class ClassifiedFacts(BaseModel):
-    TP: list[str]
-    FP: list[str]
-    FN: list[str]
-
-class FactClassificationResult(BaseModel):
-   classified_facts: ClassifiedFacts
-
-IMPORTANT: Write your output according to the FactClassificationResult schema. On the output, include only the JSON.
+IMPORTANT: Each key fact must be classified in exactly one category. Do not try to interpret the meaning of the ground truth or the answer, just compare the presence of the key facts in them."""
 
-**
+EXAMPLES = """**
 Here are three examples.
 
 Example Answer: "Universal Credit is a monthly payment for living costs. It replaces benefits like Child Tax Credit and Job Allowance. If you get a Migration Notice, you must transition to Universal Credit within 3 months."
 Example Ground Truth: "Universal Credit is a payment to help with your living costs. It’s paid monthly. You may be able to get it if you’re on a low income or out of work. Universal Credit is replacing Child Tax Credit, Housing Benefit, and Income Support. If you get a Migration Notice, you must move to Universal Credit within 3 months to keep getting financial support."
 Example output JSON:
-{{
-   "classified_facts": {{
+{
+   "classified_facts": {
        "TP": [
            "Universal Credit is a monthly payment for living costs",
            "It replaces benefits like Child Tax Credit",
@@ -43,14 +26,14 @@ Example output JSON:
            "You may be able to get it if you’re on a low income or out of work",
            "Universal Credit is replacing Housing Benefit and Income Support"
        ]
-   }}
-}}
+   }
+}
 
 Example Answer: "The sun is powered by nuclear fission, similar to nuclear reactors on Earth. Its primary function is to provide light which is essential to Earth's climate system."
 Example Ground Truth: "The sun is powered by nuclear fusion. In its core, hydrogen atoms fuse to form helium, releasing a tremendous amount of energy. This energy is what lights up the sun and provides heat and light, essential for life on Earth. The sun's light also plays a critical role in Earth's climate system and helps to drive the weather and ocean currents."
 Example output JSON:
-{{
-    "classified_facts": {{
+{
+    "classified_facts": {
                     "TP": [
                         "The sun's primary function is to provide light",
                         "The sun's light is essential to Earth's climate system",
@@ -65,14 +48,14 @@ Example output JSON:
                         "This energy provides heat and light, essential for life on Earth",
                         "The sun helps to drive the weather and ocean currents",
                     ],
-                }}
-}}
+                }
+}
 
 Example Answer: "The boiling point of water is 100 degrees Celsius at sea level."
 Example Ground Truth: "The boiling point of water is 100 degrees Celsius (212 degrees Fahrenheit) at sea level, but it can change with altitude."
 Example output JSON:
-{{
-    "classified_facts": {{
+{
+    "classified_facts": {
                     "TP": [
                         "The boiling point of water is 100 degrees Celsius at sea level"
                         ],
@@ -81,16 +64,101 @@ Example output JSON:
                         "The boiling point can change with altitude",
                         "The boiling point of water is 212 degrees Fahrenheit at sea level",
                         ],
-                }}
-}}
+                }
+}
+
+**"""
+
+
+CLASSIFY_FACTS_SYSTEM_PROMPT = f"""{CLASSIFICATION_INSTRUCTIONS}
+
+You are going to write a JSON to collect your classified key facts into a JSON object. The JSON will have 3 fields, each corresponding to a category: 'TP' (list of true positive key facts), 'FP' (list of false positive key facts), and 'FN' (list of false negative key facts).
+
+Now consider the following python pydantic BaseModel for the JSON schema:
+
+class ClassifiedFacts(BaseModel):
+    TP: list[str]
+    FP: list[str]
+    FN: list[str]
+
+class FactClassificationResult(BaseModel):
+   classified_facts: ClassifiedFacts
+
+IMPORTANT: Write your output according to the FactClassificationResult schema. On the output, include only the JSON.
+
+{EXAMPLES}"""
+
+CLASSIFY_FACTS_BATCH_SYSTEM_PROMPT = f"""{CLASSIFICATION_INSTRUCTIONS}
+
+You will be given several test cases, each with an ID, a ground truth and an answer. Classify the key facts of each test case independently of the others.
+
+You are going to write a JSON to collect the classified key facts of every test case. For each test case, the JSON will have the test case ID and an object with 3 fields, each corresponding to a category: 'TP' (list of true positive key facts), 'FP' (list of false positive key facts), and 'FN' (list of false negative key facts).
+
+Now consider the following python pydantic BaseModel for the JSON schema:
+
+class ClassifiedFacts(BaseModel):
+    TP: list[str]
+    FP: list[str]
+    FN: list[str]
 
-**
+class CaseClassifiedFacts(BaseModel):
+    case_id: str
+    classified_facts: ClassifiedFacts
 
-Ground Truth:
-{ground_truth}
+class BatchFactClassificationResult(BaseModel):
+    results: list[CaseClassifiedFacts]
 
-Actual Output:
-{answer}
+IMPORTANT: Write your output according to the BatchFactClassificationResult schema, with exactly one result for each test case ID. On the output, include only the JSON.
 
-JSON:
-"""
+The examples below each show the output for a single test case, which is what each result's classified_facts should contain.
+
+{EXAMPLES}"""
+
+
+def messages_to_prompt(messages: list[dict[str, str]]) -> str:
+    """Join chat messages into a single prompt, for judge models that only
+    take a prompt"""
+    return "\n\n".join(message["content"] for message in messages)
+
+
+class FactualCorrectnessTemplate:
+    """The system message of each prompt is static, and the test case is given
+    in the user message after it, so judge providers can cache the system
+    message as a prompt prefix across test cases."""
+
+    @staticmethod
+    def classify_facts_messages(answer, ground_truth) -> list[dict[str, str]]:
+        return [
+            {"role": "system", "content": CLASSIFY_FACTS_SYSTEM_PROMPT},
+            {
+                "role": "user",
+                "content": f"Ground Truth:\n{ground_truth}\n\nActual Output:\n{answer}\n\nJSON:\n",
+            },
+        ]
+
+    @staticmethod
+    def classify_facts(answer, ground_truth):
+        return messages_to_prompt(
+            FactualCorrectnessTemplate.classify_facts_messages(answer, ground_truth)
+        )
+
+    @staticmethod
+    def classify_facts_batch_messages(
+        cases: list[tuple[str, str, str]],
+    ) -> list[dict[str, str]]:
+        """Messages to classify the facts of several (case id, answer, ground
+        truth) test cases at once, sharing the instructions and examples"""
+        test_cases = "\n\n".join(
+            f"Test Case ID: {case_id}\n\nGround Truth:\n{ground_truth}\n\nActual Output:\n{answer}"
+            for case_id, answer, ground_truth in cases
+        )
+        return [
+            {"role": "system", "content": CLASSIFY_FACTS_BATCH_SYSTEM_PROMPT},
+            {"role": "user", "content": f"{test_cases}\n\nJSON:\n"},
+        ]
+
+    @staticmethod
+    def classify_facts_batch(cases: list[tuple[str, str, str]]):
+        return messages_to_prompt(
+            FactualCorrectnessTemplate.classify_facts_batch_messages(cases)
+        )
@@ -1,26 +1,49 @@
 from deepeval.test_case import LLMTestCase
-from pydantic import BaseModel, model_validator
+from pydantic import BaseModel, ConfigDict, DirectoryPath, Field, model_validator
 from pydantic.dataclasses import dataclass
 from enum import Enum
-from typing import Any
-import uuid
+from pathlib import Path
+import hashlib
+import json
+from typing import Annotated, Any, Optional
 
 from deepeval.metrics import (
     FaithfulnessMetric,
     AnswerRelevancyMetric,
     BiasMetric,
 )
-from deepeval.models.llms.openai_model import GPTModel
 
+from .custom_deepeval.llm_judges import (
+    JudgeGPTModel,
+    JudgeRateLimiter,
+    JudgeResponseCache,
+)
+from .custom_deepeval.llm_judges.rate_limiter import DEFAULT_COMPLETION_TOKENS
+from .custom_deepeval.llm_judges.telemetry import with_judge_telemetry
 from .custom_deepeval.metrics.factual_correctness import (
+    FactClassificationBatcher,
     FactualCorrectnessMetric,
 )
+from .context_compaction import ContextCompactor
 from ..config import BaseConfig
+from .. import file_system
+
+
+# Least time a batch of test cases waits to fill before it is sent
+DEFAULT_BATCH_MAX_WAIT_SECONDS = 0.5
 
 
 # ----- Input data models -----
 
 
+def case_content_hash(
+    input: str, actual_output: str, expected_output: str, retrieval_context: list[str]
+) -> str:
+    """Return a stable hash of the test case content that is given to the judges"""
+    content = json.dumps([input, actual_output, expected_output, retrieval_context])
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
 class StructuredContext(BaseModel):
     title: str
     heading_hierarchy: list[str]
@@ -29,13 +52,17 @@ class StructuredContext(BaseModel):
     exact_path: str
     base_path: str
 
-    def to_flattened_string(self) -> str:
-        """Return the flattened string representation of the structure context."""
+    def to_flattened_string(self, compactor: Optional[ContextCompactor] = None) -> str:
+        """Return the flattened string representation of the structure context,
+        with the HTML content converted to text if a compactor is given."""
+        content = (
+            compactor.compact(self.html_content) if compactor else self.html_content
+        )
         return (
             f"{self.title}\n"
             f"{' > '.join(self.heading_hierarchy)}\n"
             f"{self.description}\n\n"
-            f"{self.html_content}"
+            f"{content}"
         )
 
 
@@ -49,15 +76,23 @@ class EvaluationTestCase(GenerateInput):
     llm_answer: str
     retrieved_context: list[StructuredContext]
 
-    def to_llm_test_case(self) -> LLMTestCase:
+    def to_llm_test_case(
+        self, compactor: Optional[ContextCompactor] = None
+    ) -> LLMTestCase:
+        """Return the test case given to the judges, named by the hash of its
+        content, so the same test case can be matched across runs, resumed
+        and reused evaluations"""
+        retrieval_context = [
+            ctx.to_flattened_string(compactor) for ctx in self.retrieved_context
+        ]
         return LLMTestCase(
             input=self.question,
-            name=str(uuid.uuid4()),
+            name=case_content_hash(
+                self.question, self.llm_answer, self.ideal_answer, retrieval_context
+            ),
             expected_output=self.ideal_answer,
             actual_output=self.llm_answer,
-            retrieval_context=[
-                ctx.to_flattened_string() for ctx in self.retrieved_context
-            ],
+            retrieval_context=retrieval_context,
         )
 
 
@@ -79,11 +114,23 @@ class LLMJudgeModel(str, Enum):
 
 
 class LLMJudgeModelConfig(BaseModel):
+    # frozen so identical judge configs can key the judges shared by metrics
+    model_config = ConfigDict(frozen=True)
+
     model: LLMJudgeModel
     temperature: float = 0.0
-
-    def instantiate_llm_judge(self):
-        """Return the LLM judge model instance."""
+    # an OpenAI compatible server to use instead of OpenAI, GPT models only
+    base_url: Optional[str] = None
+
+    def instantiate_llm_judge(
+        self,
+        cache: Optional[JudgeResponseCache] = None,
+        rate_limiter: Optional[JudgeRateLimiter] = None,
+        max_connections: Optional[int] = None,
+    ):
+        """Return the LLM judge model instance, responses are served from the
+        cache and requests are limited by the rate limiter when given. Requests
+        share a pool of up to max_connections connections."""
         match self.model:
             case LLMJudgeModel.AMAZON_NOVA_MICRO_1:
                 raise NotImplementedError(
@@ -103,36 +150,225 @@ class LLMJudgeModelConfig(BaseModel):
                     f"Judge model {self.model} instantiation not implemented."
                 )
             case LLMJudgeModel.GPT_4O_MINI | LLMJudgeModel.GPT_4O:
-                return GPTModel(model=self.model.value, temperature=self.temperature)
+                return JudgeGPTModel(
+                    model=self.model.value,
+                    temperature=self.temperature,
+                    base_url=self.base_url,
+                    cache=cache,
+                    rate_limiter=rate_limiter,
+                    max_connections=max_connections,
+                )
+
+
+class LexicalPrescreenConfig(BaseModel):
+    """Similarity cut-offs, from 0 to 1, at which a test case is scored without
+    its judge: 1 when its answer is at least pass_above similar to the
+    expected answer, 0 when it is less than fail_below similar"""
+
+    pass_above: Optional[float] = None
+    fail_below: Optional[float] = None
+
+
+class JudgeCascadeConfig(BaseModel):
+    """A more capable judge that test cases are escalated to when the metric's
+    judge is uncertain: its mean score is within threshold_margin of the
+    threshold, or its runs disagree on success"""
+
+    model: LLMJudgeModel
+    temperature: float = 0.0
+    threshold_margin: float = 0.1
+    escalate_on_disagreement: bool = True
 
 
 class MetricConfig(BaseModel):
     name: MetricName
     threshold: float
     llm_judge: LLMJudgeModelConfig
+    # number of test cases to classify per judge request, factual correctness only
+    batch_size: Optional[int] = None
+    # seconds a batch waits to fill before it is sent, by default long enough
+    # for batch_size test cases to be scheduled at the effective throttle_value
+    batch_max_wait_seconds: Optional[float] = None
+    # skip the judge for answers that are lexically near identical to, or
+    # unlike, the expected answer, factual correctness only
+    prescreen: Optional[LexicalPrescreenConfig] = None
+    cascade: Optional[JudgeCascadeConfig] = None
 
     @model_validator(mode="before")
     @classmethod
     def inject_llm_judge(cls, values: dict[str, Any]) -> dict[str, Any]:
-        # extract model and temperature to build llm_judge
+        # extract model, temperature and base_url to build llm_judge
         if "llm_judge" not in values:
             values["llm_judge"] = {
                 "model": values.pop("model"),
                 "temperature": values.pop("temperature", 0.0),
+                "base_url": values.pop("base_url", None),
             }
         return values
 
-    def to_metric_instance(self):
-        model = self.llm_judge.instantiate_llm_judge()
+    @model_validator(mode="after")
+    def validate_batch_size(self):
+        if self.batch_size is not None and self.name != MetricName.FACTUAL_CORRECTNESS:
+            raise ValueError(f"batch_size is not supported by the {self.name} metric")
+        return self
+
+    @model_validator(mode="after")
+    def validate_prescreen(self):
+        if self.prescreen is not None and self.name != MetricName.FACTUAL_CORRECTNESS:
+            raise ValueError(f"prescreen is not supported by the {self.name} metric")
+        return self
+
+    def config_hash(
+        self,
+        n_runs: int,
+        n_runs_max: Optional[int] = None,
+        standard_error_threshold: Optional[float] = None,
+    ) -> str:
+        """Return a stable hash of this metric configuration for the number of
+        runs, identifying judgements that can be reused between evaluations.
+        Adaptive runs, up to n_runs_max until the standard error is within
+        standard_error_threshold, give test cases a different number of runs
+        than a fixed n_runs, so they are only reused with the same settings.
+        How long batches wait to fill doesn't change the judgements."""
+        runs: list[Any] = [n_runs]
+        if n_runs_max is not None:
+            runs += [n_runs_max, standard_error_threshold]
+        return self._hash(*runs)
+
+    def judgement_hash(self) -> str:
+        """Return a stable hash of the settings that change each judgement of
+        this metric, whatever the number of runs"""
+        return self._hash()
+
+    def _hash(self, *runs: Any) -> str:
+        content = json.dumps(
+            [
+                self.model_dump(
+                    mode="json",
+                    exclude_none=True,
+                    exclude={"batch_max_wait_seconds"},
+                ),
+                *runs,
+            ],
+            sort_keys=True,
+        )
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def escalation_metric_config(self) -> Optional["MetricConfig"]:
+        """Return this metric configured with its cascade judge, or None if it
+        has no cascade"""
+        if self.cascade is None:
+            return None
+        return self.model_copy(
+            update={
+                "llm_judge": self.llm_judge.model_copy(
+                    update={
+                        "model": self.cascade.model,
+                        "temperature": self.cascade.temperature,
+                    }
+                ),
+                "cascade": None,
+                "prescreen": None,
+            }
+        )
+
+    def to_metric_instance(
+        self,
+        cache: Optional[JudgeResponseCache] = None,
+        rate_limiters: Optional[dict[LLMJudgeModel, JudgeRateLimiter]] = None,
+        judges: Optional[dict[LLMJudgeModelConfig, Any]] = None,
+        throttle_value: float = 0.0,
+    ):
+        """Return the runtime metric object, using the judge for its judge
+        config from judges when there is one. Batches wait long enough to fill
+        with test cases scheduled every throttle_value seconds, unless
+        batch_max_wait_seconds is set."""
+        model = (judges or {}).get(self.llm_judge) or (
+            self.llm_judge.instantiate_llm_judge(
+                cache, (rate_limiters or {}).get(self.llm_judge.model)
+            )
+        )
+        # metrics attribute the judge telemetry of their requests to themselves
         match self.name:
             case MetricName.FAITHFULNESS:
-                return FaithfulnessMetric(threshold=self.threshold, model=model)
+                return with_judge_telemetry(FaithfulnessMetric)(
+                    threshold=self.threshold, model=model
+                )
             case MetricName.RELEVANCE:
-                return AnswerRelevancyMetric(threshold=self.threshold, model=model)
+                return with_judge_telemetry(AnswerRelevancyMetric)(
+                    threshold=self.threshold, model=model
+                )
             case MetricName.BIAS:
-                return BiasMetric(threshold=self.threshold, model=model)
+                return with_judge_telemetry(BiasMetric)(
+                    threshold=self.threshold, model=model
+                )
             case MetricName.FACTUAL_CORRECTNESS:
-                return FactualCorrectnessMetric(threshold=self.threshold, model=model)
+                batcher = (
+                    FactClassificationBatcher(
+                        model,
+                        self.batch_size,
+                        self.batch_max_wait_seconds
+                        if self.batch_max_wait_seconds is not None
+                        else max(
+                            DEFAULT_BATCH_MAX_WAIT_SECONDS,
+                            throttle_value * self.batch_size,
+                        ),
+                    )
+                    if self.batch_size
+                    else None
+                )
+                return with_judge_telemetry(FactualCorrectnessMetric)(
+                    threshold=self.threshold, model=model, batcher=batcher
+                )
+
+
+class JudgeCacheConfig(BaseModel):
+    enabled: bool = True
+    path: Optional[Path] = None
+    max_entries: int = 100_000
+
+    def instantiate_cache(self) -> Optional[JudgeResponseCache]:
+        """Return the judge response cache, or None if caching is disabled.
+        Disable it for runs that are intended to sample fresh judgements."""
+        if not self.enabled:
+            return None
+
+        path = self.path or (
+            file_system.project_root()
+            / "results"
+            / "rag_answers"
+            / "judge_cache.sqlite3"
+        )
+        return JudgeResponseCache(path, max_entries=self.max_entries)
+
+
+class JudgeRateLimitConfig(BaseModel):
+    max_concurrent: Optional[int] = None
+    requests_per_minute: Optional[int] = None
+    tokens_per_minute: Optional[int] = None
+    completion_tokens: int = DEFAULT_COMPLETION_TOKENS
+
+    def instantiate_rate_limiter(self) -> JudgeRateLimiter:
+        return JudgeRateLimiter(
+            max_concurrent=self.max_concurrent,
+            requests_per_minute=self.requests_per_minute,
+            tokens_per_minute=self.tokens_per_minute,
+            completion_tokens=self.completion_tokens,
+        )
+
+    def share(self, n_workers: int) -> "JudgeRateLimitConfig":
+        """Return each worker's share of these limits, when they are split
+        between n_workers processes"""
+        return JudgeRateLimitConfig(
+            max_concurrent=_share_limit(self.max_concurrent, n_workers),
+            requests_per_minute=_share_limit(self.requests_per_minute, n_workers),
+            tokens_per_minute=_share_limit(self.tokens_per_minute, n_workers),
+            completion_tokens=self.completion_tokens,
+        )
+
+
+def _share_limit(limit: Optional[int], n_workers: int) -> Optional[int]:
+    return max(1, limit // n_workers) if limit else limit
 
 
 # ----- Configuration models -----
@@ -145,14 +381,162 @@ class Config(BaseConfig):
     input_path: BaseConfig.GenericFields.input_path
     metrics: list[MetricConfig]
     n_runs: int
+    n_runs_max: Annotated[
+        Optional[int],
+        Field(
+            description=(
+                "Maximum runs of a test case, giving test cases more runs than "
+                "n_runs until their scores converge"
+            )
+        ),
+    ] = None
+    standard_error_threshold: Annotated[
+        float,
+        Field(
+            description=(
+                "Standard error of a metric's scores below which a test case "
+                "gets no more runs, when n_runs_max is set"
+            )
+        ),
+    ] = 0.05
+    max_concurrent: Annotated[
+        int, Field(description="Maximum test cases evaluated concurrently")
+    ] = 40
+    throttle_value: Annotated[
+        int, Field(description="Seconds to wait between scheduling test cases")
+    ] = 5
+    evaluation_chunk_size: Annotated[
+        int,
+        Field(
+            description="Test cases evaluated before their results are written to disk",
+            gt=0,
+        ),
+    ] = 100
+    judge_max_connections: Annotated[
+        Optional[int],
+        Field(description="Maximum HTTP connections each judge keeps open"),
+    ] = None
+    n_workers: Annotated[
+        int,
+        Field(
+            description=(
+                "Processes the test cases are split between, each with its own "
+                "evaluation loop and a share of the concurrency and rate limits"
+            ),
+            gt=0,
+        ),
+    ] = 1
+    judge_rate_limits: dict[LLMJudgeModel, JudgeRateLimitConfig] = {}
+    judge_cache: JudgeCacheConfig = JudgeCacheConfig()
+    compact_retrieval_context: Annotated[
+        bool,
+        Field(description="Whether to convert retrieved context HTML to plain text"),
+    ] = True
+    incremental_from: Annotated[
+        Optional[DirectoryPath],
+        Field(description="Previous results directory to reuse judgements from"),
+    ] = None
 
     @model_validator(mode="after")
     def run_validatons(self):
         return self._validate_fields_required_for_generate("provider")
 
-    def metric_instances(self):
-        """Return the list of runtime metric objects for evaluation."""
-        return [metric.to_metric_instance() for metric in self.metrics]  # type: ignore
+    @model_validator(mode="after")
+    def validate_n_runs_max(self):
+        if self.n_runs_max is None:
+            return self
+        if self.n_runs < 2:
+            raise ValueError("n_runs must be at least 2 when n_runs_max is set")
+        if self.n_runs_max < self.n_runs:
+            raise ValueError("n_runs_max must not be less than n_runs")
+        return self
+
+    @model_validator(mode="after")
+    def validate_batch_max_wait_seconds(self):
+        for metric in self.metrics:
+            if (
+                metric.batch_size
+                and metric.batch_size > 1
+                and metric.batch_max_wait_seconds is not None
+                and self.effective_throttle_value() >= metric.batch_max_wait_seconds
+            ):
+                raise ValueError(
+                    f"batch_max_wait_seconds of the {metric.name.value} metric "
+                    "must be more than throttle_value / n_runs for its batches to fill"
+                )
+        return self
+
+    def effective_throttle_value(self) -> float:
+        """Return the seconds between deepeval scheduling test cases, as the
+        throttle_value is divided between the run copies of each test case"""
+        return self.throttle_value / self.n_runs
+
+    def worker_config(self) -> "Config":
+        """Return the config for one of the n_workers processes, with the
+        concurrency and judge rate limits divided between them so together they
+        stay within the limits"""
+        return self.model_copy(
+            update={
+                "max_concurrent": _share_limit(self.max_concurrent, self.n_workers),
+                "judge_max_connections": _share_limit(
+                    self.judge_max_connections, self.n_workers
+                ),
+                "judge_rate_limits": {
+                    model: rate_limit.share(self.n_workers)
+                    for model, rate_limit in self.judge_rate_limits.items()
+                },
+            }
+        )
+
+    def instantiate_context_compactor(self) -> Optional[ContextCompactor]:
+        return ContextCompactor() if self.compact_retrieval_context else None
+
+    def metric_instances(self, cache: Optional[JudgeResponseCache] = None):
+        """Return the list of runtime metric objects for evaluation. Metrics that
+        use the same judge model share its rate limits, and metrics with the
+        same judge config share one judge and its connection pool."""
+        return self._instantiate_metrics(self.metrics, cache)
+
+    def escalation_metric_instances(
+        self, cache: Optional[JudgeResponseCache] = None
+    ) -> list[Optional[Any]]:
+        """Return the runtime metric objects that use each metric's cascade
+        judge, None for metrics without a cascade"""
+        escalation_configs = [
+            metric.escalation_metric_config() for metric in self.metrics
+        ]
+        instances = iter(
+            self._instantiate_metrics(
+                [config for config in escalation_configs if config is not None],
+                cache,
+            )
+        )
+        return [
+            next(instances) if config is not None else None
+            for config in escalation_configs
+        ]
+
+    def _instantiate_metrics(
+        self, metrics: list[MetricConfig], cache: Optional[JudgeResponseCache]
+    ) -> list[Any]:
+        rate_limiters = {
+            model: rate_limit.instantiate_rate_limiter()
+            for model, rate_limit in self.judge_rate_limits.items()
+        }
+        judges: dict[LLMJudgeModelConfig, Any] = {}
+        for metric in metrics:
+            if metric.llm_judge not in judges:
+                judges[metric.llm_judge] = metric.llm_judge.instantiate_llm_judge(
+                    cache,
+                    rate_limiters.get(metric.llm_judge.model),
+                    self.judge_max_connections,
+                )
+        return [
+            metric.to_metric_instance(  # type: ignore
+                cache, rate_limiters, judges, self.effective_throttle_value()
+            )
+            for metric in metrics
+        ]
 
 
 # ----- Output data models -----
@@ -162,10 +546,12 @@ class Config(BaseConfig):
 class RunMetricOutput:
     run: int
     metric: str
-    score: float
+    # None when the metric errored
+    score: float | None
     cost: float | None = None
     reason: str | None = None
     success: bool | None = None
+    error: str | None = None
 
 
 @dataclass
@@ -176,3 +562,19 @@ class EvaluationResult:
     expected_output: str
     retrieval_context: list[str]
     run_metric_outputs: list[RunMetricOutput]
+
+    def content_hash(self) -> str:
+        return case_content_hash(
+            self.input,
+            self.actual_output,
+            self.expected_output,
+            self.retrieval_context,
+        )
+
+
+class MetricJudgements(BaseModel):
+    """The outputs of every run of one metric configuration for one test case"""
+
+    case_hash: str
+    metric_config_hash: str
+    run_metric_outputs: list[RunMetricOutput]
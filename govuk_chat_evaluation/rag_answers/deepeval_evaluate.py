@@ -1,149 +1,130 @@
 from collections import defaultdict
+from dataclasses import replace
+from typing import Any
 
 from deepeval import evaluate as deepeval_evaluate
 from deepeval.evaluate.types import TestResult
 from deepeval.metrics import BaseMetric
 from deepeval.test_case import LLMTestCase
 
-from .data_models import EvaluationResult, RunMetricOutput
 from ..timing import log_task_duration
 import logging
 
+RUN_TAG_SEPARATOR = "::run-"
+DUPLICATE_NAME_SEPARATOR = "::duplicate-"
+
 
 def run_deepeval_evaluation(
-    cases: list[LLMTestCase], metrics: list[BaseMetric], n_runs: int = 1, **kwargs
+    cases: list[LLMTestCase],
+    metrics: list[BaseMetric],
+    n_runs: int = 1,
+    first_run: int = 0,
+    **kwargs,
 ) -> list[list[TestResult]]:
     """ "
     Run the Deepval evaluation on the given models and metrics
 
+    All runs are scheduled together in a single deepeval evaluation, so they
+    share one concurrency budget rather than waiting on each other. Each test
+    case is copied once per run with its run index tagged onto its name, the
+    tag is removed again when the results are grouped by run. deepeval waits
+    the async_config throttle_value after scheduling each test case, so the
+    wait is divided between the run copies of a test case, keeping the time
+    spent scheduling the same however many runs there are.
+
     Args:
         cases : List of test cases to evaluate
         metrics : List of metrics to use for evaluation
         n_runs : Number of runs to perform for the evaluation
+        first_run : Index of the first run, when adding runs to an evaluation
         **kwargs: Additional arguments to pass to the deepeval.evaluation function
 
     Returns:
-        Evaluation results grouped by run
+        Evaluation results grouped by run, starting with first_run
 
     """
 
     with log_task_duration("Running Deepval Evaluation"):
-        logging.info("Running Deepval evaluation")
-
-        all_evaluation_runs = []
+        logging.info(f"Running Deepval evaluation of {n_runs} run(s) concurrently")
+
+        run_cases = [
+            replace(case, name=tag_name_with_run(case.name, first_run + run_idx))
+            for run_idx in range(n_runs)
+            for case in cases
+        ]
+
+        if kwargs.get("async_config") is not None and n_runs > 1:
+            async_config = kwargs["async_config"]
+            kwargs["async_config"] = replace(
+                async_config, throttle_value=async_config.throttle_value / n_runs
+            )
 
-        for i in range(n_runs):
-            logging.info(f"Running evaluation iteration {i + 1}/{n_runs}...")
+        evaluation = deepeval_evaluate(
+            test_cases=run_cases,
+            metrics=metrics,
+            **kwargs,  # pass additional arguments dynamically
+        )
 
-            evaluation_run = deepeval_evaluate(
-                test_cases=cases,
-                metrics=metrics,
-                **kwargs,  # pass additional arguments dynamically
-            )
+        all_evaluation_runs: list[list[TestResult]] = [[] for _ in range(n_runs)]
 
-            all_evaluation_runs.append(
-                evaluation_run.test_results
-            )  # Store results per run
+        for result in evaluation.test_results:
+            name, run_idx = untag_name_with_run(result.name)
+            all_evaluation_runs[run_idx - first_run].append(replace(result, name=name))
 
     logging.info("Deepval evaluation complete")
 
     return all_evaluation_runs
 
 
-def convert_deepeval_output_to_evaluation_results(
-    all_runs: list[list[TestResult]],
-) -> list[EvaluationResult]:
-    """
-    Convert the results from DeepEval into a more structured format.
-
-    Intermediate steps:
-    1. Group the results by input and run index.
-                {
-            'input_1': {
-                0: [TestResult],
-                1: [TestResult],
-                2: [TestResult,],
-            },
-            'input_2': {
-                0: [TestResult],
-                1: [TestResult],
-                2: [TestResult],
-            },
-        }
-    2. For each input, create an EvaluationResult object containing the input, actual output, expected output, and the evaluation results for each run.
-        [
-            EvaluationResult(
-                name='input_1',
-                input='input_1',
-                actual_output='actual_output_1',
-                expected_output='expected_output_1',
-                retrieval_context=['context_1'],
-                evaluation_results=[
-                    RunMetricOutput(
-                        run=0,
-                        metric='metric_1',
-                        score=0.9,
-                        reason='reason_1',
-                        cost=0.5,
-                        success=True
-                    ),
-                    RunMetricOutput(
-                        run=1,
-                        metric='metric_2',
-                        score=0.8,
-                        reason='reason_2',
-                        cost=0.6,
-                        success=True
-                    )
-                ]
-            ),
-            EvaluationResult(
-                name='input_2',
-                ...)
-                ]
-
-    3. Return a list of EvaluationResult objects.
+def tag_name_with_run(name: str | None, run_idx: int) -> str:
+    """Append a run index to a test case name so results from concurrent runs
+    of the same test case can be told apart"""
+    return f"{name}{RUN_TAG_SEPARATOR}{run_idx}"
 
-    Args:
-        all_runs : List of evaluation runs, each containing a list of TestResult objects, one object per test case, the ouput of run_deepeval_evaluation
-    """
-    grouped_by_input_and_run = defaultdict(lambda: defaultdict(list))
-
-    for run_idx, run in enumerate(all_runs):  # all_runs = List[List[TestResult]]
-        for result in run:
-            grouped_by_input_and_run[result.name][run_idx].append(result)
-
-    aggregated_results: list[EvaluationResult] = []
-
-    for _input_name, run_results in grouped_by_input_and_run.items():
-        evaluation_outputs: list[RunMetricOutput] = []
-
-        # taking the first TestResult for each input to extract static info
-        sample_result = run_results[0][0]
-
-        for run_idx, results in run_results.items():
-            for result in results:
-                for metric_data in result.metrics_data:
-                    evaluation_outputs.append(
-                        RunMetricOutput(
-                            run=run_idx,
-                            metric=metric_data.name,
-                            score=metric_data.score,
-                            reason=metric_data.reason,
-                            cost=metric_data.evaluation_cost,
-                            success=metric_data.success,
-                        )
-                    )
-
-        aggregated_results.append(
-            EvaluationResult(
-                name=sample_result.name,
-                input=sample_result.input,
-                actual_output=sample_result.actual_output,
-                expected_output=sample_result.expected_output,
-                retrieval_context=sample_result.retrieval_context or [],
-                run_metric_outputs=evaluation_outputs,
-            )
-        )
 
-    return aggregated_results
+def untag_name_with_run(tagged_name: str) -> tuple[str, int]:
+    """Split a name created by tag_name_with_run back into the original name and
+    run index"""
+    name, _, run_idx = tagged_name.rpartition(RUN_TAG_SEPARATOR)
+    return name, int(run_idx)
+
+
+def with_unique_names(cases: list[LLMTestCase]) -> list[LLMTestCase]:
+    """Give repeated test case names a numbered suffix, so test cases with
+    identical content are still evaluated and reported separately"""
+    counts: dict[str | None, int] = defaultdict(int)
+    unique_cases = []
+
+    for case in cases:
+        counts[case.name] += 1
+        if counts[case.name] > 1:
+            case = replace(
+                case, name=f"{case.name}{DUPLICATE_NAME_SEPARATOR}{counts[case.name]}"
+            )
+        unique_cases.append(case)
+
+    return unique_cases
+
+
+def stream_row_from_test_result(result: TestResult, run_idx: int) -> dict[str, Any]:
+    """Convert one run of a test case to the fields of an EvaluationResult with
+    the outputs of that run only, as plain values that aren't validated"""
+    return {
+        "name": result.name,
+        "input": str(result.input),
+        "actual_output": str(result.actual_output),
+        "expected_output": result.expected_output or "",
+        "retrieval_context": result.retrieval_context or [],
+        "run_metric_outputs": [
+            {
+                "run": run_idx,
+                "metric": metric_data.name,
+                "score": metric_data.score,
+                "cost": metric_data.evaluation_cost,
+                "reason": metric_data.reason,
+                "success": metric_data.success,
+                "error": metric_data.error,
+            }
+            for metric_data in result.metrics_data or []
+        ],
+    }
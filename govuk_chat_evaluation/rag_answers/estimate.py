@@ -0,0 +1,237 @@
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from typing import Any, Collection, Iterable, Optional
+
+from deepeval.metrics.answer_relevancy.template import AnswerRelevancyTemplate
+from deepeval.metrics.bias.template import BiasTemplate
+from deepeval.metrics.faithfulness.template import FaithfulnessTemplate
+from deepeval.models.llms.openai_model import model_pricing
+from deepeval.test_case import LLMTestCase
+from tabulate import tabulate
+
+from .custom_deepeval.llm_judges.rate_limiter import estimate_prompt_tokens
+from .custom_deepeval.metrics.factual_correctness.template import (
+    CLASSIFY_FACTS_BATCH_SYSTEM_PROMPT,
+    FactualCorrectnessTemplate,
+)
+from ..file_system import jsonl_to_models
+from .data_models import Config, EvaluationTestCase, MetricConfig, MetricName
+
+# Test cases sent to a worker process at a time
+CHUNK_SIZE = 256
+
+# Allowance for the JSON structure and short reasons in each judge response
+RESPONSE_OVERHEAD_TOKENS = 50
+
+
+@dataclass
+class MetricEstimate:
+    metric: str
+    judge_model: str
+    api_calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+    @property
+    def cost(self) -> Optional[float]:
+        pricing = model_pricing.get(self.judge_model)
+        if pricing is None:
+            return None
+        return (
+            self.input_tokens * pricing["input"]
+            + self.output_tokens * pricing["output"]
+        )
+
+    def for_table(self) -> dict[str, Any]:
+        return {
+            "metric": self.metric,
+            "judge model": self.judge_model,
+            "API calls": self.api_calls,
+            "input tokens": self.input_tokens,
+            "output tokens": self.output_tokens,
+            "cost ($)": None if self.cost is None else round(self.cost, 4),
+        }
+
+
+def judge_prompts(
+    metric_name: MetricName, case: LLMTestCase, batched: bool = False
+) -> list[tuple[str, str]]:
+    """
+    Build the prompts a metric sends to its judge for a test case.
+
+    The deepeval metrics chain prompts, using the response of one judge call
+    in the next, so the answer and retrieval context stand in for the
+    statements, claims and truths the judge would extract. A batched test
+    case's prompt is its part of the batch prompt, without the instructions
+    the batch shares.
+
+    Returns:
+        A (prompt, approximate response) pair for each judge call
+    """
+    answer = str(case.actual_output)
+    ground_truth = case.expected_output or ""
+    context = "\n\n".join(case.retrieval_context or [])
+
+    match metric_name:
+        case MetricName.FACTUAL_CORRECTNESS if batched:
+            [_, case_message] = (
+                FactualCorrectnessTemplate.classify_facts_batch_messages(
+                    [(str(case.name), answer, ground_truth)]
+                )
+            )
+            return [(case_message["content"], answer + ground_truth)]
+        case MetricName.FACTUAL_CORRECTNESS:
+            return [
+                (
+                    FactualCorrectnessTemplate.classify_facts(
+                        answer=answer, ground_truth=ground_truth
+                    ),
+                    answer + ground_truth,
+                )
+            ]
+        case MetricName.FAITHFULNESS:
+            return [
+                (FaithfulnessTemplate.generate_claims(answer), answer),
+                (FaithfulnessTemplate.generate_truths(context), context),
+                (FaithfulnessTemplate.generate_verdicts([answer], context), answer),
+                (FaithfulnessTemplate.generate_reason(1.0, []), ""),
+            ]
+        case MetricName.RELEVANCE:
+            return [
+                (AnswerRelevancyTemplate.generate_statements(answer), answer),
+                (AnswerRelevancyTemplate.generate_verdicts(case.input, answer), answer),
+                (AnswerRelevancyTemplate.generate_reason([], case.input, 1.0), ""),
+            ]
+        case MetricName.BIAS:
+            return [
+                (BiasTemplate.generate_opinions(answer), answer),
+                (BiasTemplate.generate_verdicts([answer]), answer),
+                (BiasTemplate.generate_reason([], 0.0), ""),
+            ]
+
+
+def estimate_case(
+    metric_names: list[MetricName],
+    case: LLMTestCase,
+    batched_metrics: Collection[MetricName] = (),
+) -> list[tuple[int, int, int]]:
+    """Return the (API calls, input tokens, output tokens) of a single run of
+    each metric for a test case, with no API calls for batched metrics as a
+    test case shares its call with the rest of its batch"""
+    estimates = []
+
+    for metric_name in metric_names:
+        batched = metric_name in batched_metrics
+        prompts = judge_prompts(metric_name, case, batched)
+        estimates.append(
+            (
+                0 if batched else len(prompts),
+                sum(estimate_prompt_tokens(prompt) for prompt, _ in prompts),
+                sum(
+                    estimate_prompt_tokens(response) + RESPONSE_OVERHEAD_TOKENS
+                    for _, response in prompts
+                ),
+            )
+        )
+
+    return estimates
+
+
+def estimate_evaluation(
+    cases: list[LLMTestCase],
+    metrics: list[MetricConfig],
+    n_runs: int,
+    processes: int = 1,
+) -> list[MetricEstimate]:
+    """
+    Estimate the judge API calls, tokens and cost of evaluating the test cases
+    with the metrics for n_runs.
+
+    A test case takes tens of microseconds to estimate, while starting a pool
+    of processes takes seconds, so test cases are estimated in this process
+    unless processes is more than 1. A pool is only quicker for datasets of
+    hundreds of thousands of test cases on a machine with several CPUs.
+
+    Metrics with a batch_size make a judge call for each batch of test cases
+    from all runs, which are evaluated together, sharing its instructions.
+    """
+    estimates = [
+        MetricEstimate(
+            metric=metric.name.value, judge_model=metric.llm_judge.model.value
+        )
+        for metric in metrics
+    ]
+    estimate = partial(
+        estimate_case,
+        [metric.name for metric in metrics],
+        batched_metrics={metric.name for metric in metrics if metric.batch_size},
+    )
+
+    if processes <= 1 or len(cases) <= CHUNK_SIZE:
+        case_estimates = map(estimate, cases)
+        _accumulate(estimates, case_estimates, n_runs)
+    else:
+        # spawn as the deepeval telemetry threads make forking unsafe
+        with ProcessPoolExecutor(
+            max_workers=processes, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            case_estimates = executor.map(estimate, cases, chunksize=CHUNK_SIZE)
+            _accumulate(estimates, case_estimates, n_runs)
+
+    for metric_estimate, metric in zip(estimates, metrics):
+        if metric.batch_size:
+            batches = math.ceil(len(cases) * n_runs / metric.batch_size)
+            metric_estimate.api_calls += batches
+            metric_estimate.input_tokens += batches * estimate_prompt_tokens(
+                CLASSIFY_FACTS_BATCH_SYSTEM_PROMPT
+            )
+
+    return estimates
+
+
+def estimate_evaluation_table(
+    evaluation_data_path: Path, config: Config, processes: int = 1
+) -> str:
+    """Estimate the cost of evaluating a dataset with a config, returning a
+    table of the estimate for each metric and a total"""
+    models = jsonl_to_models(evaluation_data_path, EvaluationTestCase)
+    compactor = config.instantiate_context_compactor()
+    cases = [model.to_llm_test_case(compactor) for model in models]
+    estimates = estimate_evaluation(cases, config.metrics, config.n_runs, processes)
+
+    rows = [estimate.for_table() for estimate in estimates]
+    costs = [estimate.cost for estimate in estimates if estimate.cost is not None]
+    rows.append(
+        {
+            "metric": "total",
+            "judge model": "",
+            "API calls": sum(estimate.api_calls for estimate in estimates),
+            "input tokens": sum(estimate.input_tokens for estimate in estimates),
+            "output tokens": sum(estimate.output_tokens for estimate in estimates),
+            # unpriced judge models leave the total cost unknown
+            "cost ($)": round(sum(costs), 4) if len(costs) == len(estimates) else None,
+        }
+    )
+
+    return (
+        f"Estimate for {len(cases)} test case(s) over {config.n_runs} run(s)\n"
+        + tabulate(rows, headers="keys")
+    )
+
+
+def _accumulate(
+    estimates: list[MetricEstimate],
+    case_estimates: Iterable[list[tuple[int, int, int]]],
+    n_runs: int,
+) -> None:
+    for case_estimate in case_estimates:
+        for estimate, (api_calls, input_tokens, output_tokens) in zip(
+            estimates, case_estimate
+        ):
+            estimate.api_calls += api_calls * n_runs
+            estimate.input_tokens += input_tokens * n_runs
+            estimate.output_tokens += output_tokens * n_runs
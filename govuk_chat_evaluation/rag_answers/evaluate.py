@@ -1,10 +1,14 @@
+import multiprocessing
 import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import cast
-from functools import cached_property
+from typing import Optional, cast
+from functools import cached_property, partial
 import pandas as pd
 
 from deepeval.metrics import BaseMetric
+from deepeval.test_case import LLMTestCase
 from deepeval.evaluate.configs import (
     AsyncConfig,
     DisplayConfig,
@@ -12,12 +16,50 @@ from deepeval.evaluate.configs import (
     ErrorConfig,
 )
 
-from .deepeval_evaluate import (
-    run_deepeval_evaluation,
-    convert_deepeval_output_to_evaluation_results,
+from .custom_deepeval.llm_judges import JudgeGPTModel
+from .custom_deepeval.llm_judges.telemetry import (
+    TELEMETRY_FILENAME,
+    judge_telemetry_summary,
+    write_judge_telemetry,
 )
-from ..file_system import jsonl_to_models
-from .data_models import EvaluationTestCase, Config, EvaluationResult
+from .adaptive_runs import RunOutputsByCase
+from .bootstrap import hierarchical_bootstrap_interval
+from .cascade import (
+    CASCADE_FILENAME,
+    ESCALATIONS_STREAM_FILENAME,
+    apply_escalations,
+    plan_escalations,
+)
+from .deepeval_evaluate import run_deepeval_evaluation, with_unique_names
+from .prescreen import prescreen_cases, write_prescreen_audit
+from .resume import (
+    plan_resumed_evaluation,
+    resumable_metric_names,
+    resume_result_stream,
+    write_metric_hashes,
+)
+from .sharding import (
+    merge_shard_files,
+    merge_shard_streams,
+    shard_evaluation_plan,
+    shard_stream_path,
+)
+from .results_table import ResultsTable
+from .result_stream import (
+    RESULTS_STREAM_FILENAME,
+    ResultStream,
+    read_streamed_results_table,
+)
+from .incremental import (
+    JUDGEMENTS_FILENAME,
+    evaluation_results_to_judgements,
+    load_previous_judgements,
+    merge_previous_judgements,
+    plan_evaluation,
+)
+from ..file_system import jsonl_to_models, write_models_to_jsonl
+from ..logging import setup_logging
+from .data_models import EvaluationTestCase, Config
 import logging
 
 
@@ -27,11 +69,6 @@ display_config = DisplayConfig(
     print_results=False,
 )
 
-async_config = AsyncConfig(
-    max_concurrent=40,
-    throttle_value=5,
-)
-
 cache_config = CacheConfig(
     use_cache=False,
 )
@@ -43,7 +80,10 @@ error_config = ErrorConfig(
 
 # would expect we need to pass config object through if that has metrics configuration
 def evaluate_and_output_results(
-    output_dir: Path, evaluation_data_path: Path, evaluation_config: Config
+    output_dir: Path,
+    evaluation_data_path: Path,
+    evaluation_config: Config,
+    resume: bool = False,
 ):
     """
     Function to run the evaluation, aggregate the results, and export them to files.
@@ -52,6 +92,8 @@ def evaluate_and_output_results(
         output_dir: The directory to save the evaluation results.
         evaluation_data_path: Path to the JSONL file containing the evaluation data.
         evaluation_config: Configuration for the evaluation.
+        resume: Whether to resume an interrupted evaluation in output_dir,
+            judging only what is missing from its results or errored.
     """
     # set DeepEval results folder
     os.environ["DEEPEVAL_RESULTS_FOLDER"] = str(output_dir)
@@ -62,21 +104,137 @@ def evaluate_and_output_results(
         logging.error("\nThere is no data to evaluate")
         return
 
-    evaluation_outputs = run_deepeval_evaluation(
-        cases=[model.to_llm_test_case() for model in models],
-        metrics=cast(list[BaseMetric], evaluation_config.metric_instances()),
-        n_runs=evaluation_config.n_runs,
-        display_config=display_config,
-        async_config=async_config,
-        cache_config=cache_config,
-        error_config=error_config,
+    # worker processes judge with metrics and judge cache connections of their
+    # own, so with workers the metrics of this process only name judgements
+    judge_cache = (
+        evaluation_config.judge_cache.instantiate_cache()
+        if evaluation_config.n_workers == 1
+        else None
+    )
+    metrics = cast(list[BaseMetric], evaluation_config.metric_instances(judge_cache))
+    metric_config_hashes = [
+        metric_config.config_hash(
+            evaluation_config.n_runs,
+            evaluation_config.n_runs_max,
+            evaluation_config.standard_error_threshold,
+        )
+        for metric_config in evaluation_config.metrics
+    ]
+    compactor = evaluation_config.instantiate_context_compactor()
+    cases = with_unique_names([model.to_llm_test_case(compactor) for model in models])
+    if compactor is not None:
+        logging.info(f"Retrieved context compaction: {compactor.stats}")
+
+    previous_judgements = (
+        load_previous_judgements(
+            evaluation_config.incremental_from, evaluation_config.n_runs
+        )
+        if evaluation_config.incremental_from
+        else {}
+    )
+
+    # test cases the lexical pre-screen scores are handled like reused
+    # judgements, so they skip the judge
+    prescreened, prescreen_audit = prescreen_cases(
+        cases, evaluation_config, metrics, metric_config_hashes
+    )
+    write_prescreen_audit(output_dir, prescreen_audit)
+    previous_judgements = previous_judgements | prescreened
+
+    results_stream_path = output_dir / RESULTS_STREAM_FILENAME
+    telemetry_path = output_dir / TELEMETRY_FILENAME
+    plan = plan_evaluation(cases, metric_config_hashes, previous_judgements)
+    metric_names = [metric.__name__ for metric in metrics]
+
+    metric_hashes = {
+        metric.__name__: metric_config.judgement_hash()
+        for metric, metric_config in zip(metrics, evaluation_config.metrics)
+    }
+
+    if resume:
+        # results of the worker processes of an interrupted evaluation
+        merge_shard_streams(results_stream_path, [str(case.name) for case in cases])
+        merge_shard_files(telemetry_path)
+        # adaptive runs add runs beyond n_runs, up to n_runs_max
+        completed = resume_result_stream(
+            results_stream_path,
+            {str(case.name) for case in cases},
+            resumable_metric_names(output_dir, metric_hashes),
+            evaluation_config.n_runs_max or evaluation_config.n_runs,
+        )
+        evaluation_plan = plan_resumed_evaluation(
+            plan, metric_names, evaluation_config.n_runs, completed
+        )
+    else:
+        evaluation_plan = {
+            (metric_indexes, range(evaluation_config.n_runs)): pending_cases
+            for metric_indexes, pending_cases in plan.items()
+        }
+
+    write_metric_hashes(output_dir, metric_hashes)
+
+    if evaluation_config.n_workers > 1:
+        evaluate_plan_in_workers(
+            results_stream_path,
+            telemetry_path,
+            evaluation_plan,
+            cases,
+            evaluation_config,
+        )
+        # the workers have finished with the judge cache, escalations use it
+        judge_cache = evaluation_config.judge_cache.instantiate_cache()
+    else:
+        evaluate_plan(
+            results_stream_path,
+            telemetry_path,
+            evaluation_plan,
+            metrics,
+            evaluation_config,
+        )
+
+    results = read_streamed_results_table(results_stream_path)
+    log_errored_judgements(results)
+
+    escalation_metrics = evaluation_config.escalation_metric_instances(judge_cache)
+    if any(escalation_metrics):
+        results = escalate_uncertain_judgements(
+            output_dir,
+            results,
+            cases,
+            metrics,
+            cast(list[Optional[BaseMetric]], escalation_metrics),
+            evaluation_config,
+        )
+
+    judged_metrics = metrics + [
+        metric for metric in escalation_metrics if metric is not None
+    ]
+    log_judge_token_usage(judged_metrics)
+    write_judges_telemetry(telemetry_path, judged_metrics)
+    log_judge_telemetry(telemetry_path)
+
+    if judge_cache is not None:
+        logging.info(f"Judge response cache: {judge_cache.stats}")
+        judge_cache.close()
+
+    results = merge_previous_judgements(
+        results, cases, metric_config_hashes, previous_judgements
     )
 
-    evaluation_results = convert_deepeval_output_to_evaluation_results(
-        evaluation_outputs
+    write_models_to_jsonl(
+        output_dir,
+        evaluation_results_to_judgements(
+            results,
+            {
+                metric.__name__: metric_config_hash
+                for metric, metric_config_hash in zip(metrics, metric_config_hashes)
+            },
+        ),
+        filename=JUDGEMENTS_FILENAME,
+        data_label="judgements",
     )
 
-    aggregation = AggregatedResults(evaluation_results)
+    aggregation = AggregatedResults(results)
 
     # calculate aggregated results and exports results to CSV files
     aggregation.export_to_csvs(output_dir)
@@ -85,9 +243,283 @@ def evaluate_and_output_results(
     logging.info(aggregation.summary)
 
 
+def evaluate_plan(
+    results_stream_path: Path,
+    telemetry_path: Path,
+    evaluation_plan: dict[tuple[tuple[int, ...], range], list[LLMTestCase]],
+    metrics: list[BaseMetric],
+    evaluation_config: Config,
+):
+    """Evaluate the test cases of an evaluation plan with the metrics and runs
+    they are keyed by, a chunk at a time"""
+    chunk_size = evaluation_config.evaluation_chunk_size
+
+    # results and judge telemetry are written to disk after each chunk of test
+    # cases, rather than held in memory until every test case has been evaluated
+    with ResultStream(results_stream_path) as result_stream:
+        for (metric_indexes, runs), pending_cases in evaluation_plan.items():
+            for start in range(0, len(pending_cases), chunk_size):
+                evaluate_chunk(
+                    result_stream,
+                    pending_cases[start : start + chunk_size],
+                    [metrics[index] for index in metric_indexes],
+                    evaluation_config,
+                    runs,
+                )
+                write_judges_telemetry(telemetry_path, metrics)
+
+
+def evaluate_plan_in_workers(
+    results_stream_path: Path,
+    telemetry_path: Path,
+    evaluation_plan: dict[tuple[tuple[int, ...], range], list[LLMTestCase]],
+    cases: list[LLMTestCase],
+    evaluation_config: Config,
+):
+    """
+    Evaluate an evaluation plan split between n_workers processes, each with
+    its own evaluation loop and judges, and a share of the concurrency and
+    rate limits.
+
+    Each worker writes to its own results stream, which are merged into the
+    results stream in the order of the test cases once every worker has
+    finished, and its own judge telemetry file. If a worker fails, its stream
+    and those of the other workers are left to be merged by a resumed
+    evaluation.
+    """
+    n_workers = evaluation_config.n_workers
+    logging.info(f"Evaluating test cases in {n_workers} worker processes")
+    worker_config = evaluation_config.worker_config()
+
+    with (
+        tempfile.TemporaryDirectory(prefix="rag_answers_workers_") as working_dir,
+        ProcessPoolExecutor(
+            max_workers=n_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=initialise_worker,
+            initargs=(results_stream_path.parent, Path(working_dir)),
+        ) as executor,
+    ):
+        futures = [
+            executor.submit(
+                evaluate_shard,
+                shard_stream_path(results_stream_path, shard_index),
+                shard_stream_path(telemetry_path, shard_index),
+                shard_plan,
+                worker_config,
+            )
+            for shard_index, shard_plan in enumerate(
+                shard_evaluation_plan(evaluation_plan, cases, n_workers)
+            )
+            if shard_plan
+        ]
+        for future in futures:
+            future.result()
+
+    merge_shard_streams(results_stream_path, [str(case.name) for case in cases])
+    merge_shard_files(telemetry_path)
+
+
+def initialise_worker(output_dir: Path, working_dir: Path):
+    """Set up a worker process to log to the output directory, and to work in
+    a directory of its own, as deepeval writes its test run to a file in the
+    working directory"""
+    setup_logging(output_dir)
+    process_dir = working_dir / str(os.getpid())
+    process_dir.mkdir()
+    os.chdir(process_dir)
+
+
+def evaluate_shard(
+    results_stream_path: Path,
+    telemetry_path: Path,
+    evaluation_plan: dict[tuple[tuple[int, ...], range], list[LLMTestCase]],
+    evaluation_config: Config,
+):
+    """Evaluate a worker process's shard of an evaluation plan"""
+    judge_cache = evaluation_config.judge_cache.instantiate_cache()
+    metrics = cast(list[BaseMetric], evaluation_config.metric_instances(judge_cache))
+
+    evaluate_plan(
+        results_stream_path, telemetry_path, evaluation_plan, metrics, evaluation_config
+    )
+
+    log_judge_token_usage(metrics)
+    if judge_cache is not None:
+        logging.info(f"Judge response cache: {judge_cache.stats}")
+        judge_cache.close()
+
+
+def evaluate_chunk(
+    result_stream: ResultStream,
+    cases: list[LLMTestCase],
+    metrics: list[BaseMetric],
+    evaluation_config: Config,
+    runs: Optional[range] = None,
+):
+    """
+    Evaluate a chunk of test cases for the runs, n_runs by default, writing
+    the results to the stream.
+
+    When n_runs_max is set and every one of the n_runs is evaluated, test
+    cases whose scores for a metric have a standard error above the threshold
+    are then run again, one run at a time, until they converge or reach
+    n_runs_max runs.
+    """
+    evaluate = partial(
+        run_deepeval_evaluation,
+        metrics=metrics,
+        display_config=display_config,
+        async_config=AsyncConfig(
+            max_concurrent=evaluation_config.max_concurrent,
+            throttle_value=evaluation_config.throttle_value,
+        ),
+        cache_config=cache_config,
+        error_config=error_config,
+    )
+
+    runs = runs or range(evaluation_config.n_runs)
+    all_runs = evaluate(cases=cases, n_runs=len(runs), first_run=runs.start)
+    result_stream.write(all_runs, first_run=runs.start)
+
+    if evaluation_config.n_runs_max is None or runs != range(evaluation_config.n_runs):
+        return
+
+    outputs = RunOutputsByCase()
+    outputs.add(all_runs)
+
+    for run_idx in range(evaluation_config.n_runs, evaluation_config.n_runs_max):
+        cases = outputs.unconverged_cases(
+            cases, evaluation_config.standard_error_threshold
+        )
+        if not cases:
+            break
+
+        logging.info(f"Adaptive runs: {len(cases)} test case(s) need run {run_idx}")
+        all_runs = evaluate(cases=cases, n_runs=1, first_run=run_idx)
+        result_stream.write(all_runs, first_run=run_idx)
+        outputs.add(all_runs, first_run=run_idx)
+
+
+def escalate_uncertain_judgements(
+    output_dir: Path,
+    results: ResultsTable,
+    cases: list[LLMTestCase],
+    metrics: list[BaseMetric],
+    escalation_metrics: list[Optional[BaseMetric]],
+    evaluation_config: Config,
+) -> ResultsTable:
+    """
+    Judge the test cases that a metric's judge was uncertain about again with
+    its cascade judge, writing the results to a stream as they are evaluated.
+
+    Returns:
+        The results with the cascade judge's outputs in place of
+        the escalated outputs. The verdicts of both judges are written to a
+        CSV file.
+    """
+    escalations_path = output_dir / ESCALATIONS_STREAM_FILENAME
+    # escalations are planned afresh from the results, including when resuming
+    escalations_path.unlink(missing_ok=True)
+    cases_by_name = {case.name: case for case in cases}
+    chunk_size = evaluation_config.evaluation_chunk_size
+
+    with ResultStream(escalations_path) as result_stream:
+        for index, names in plan_escalations(
+            results, evaluation_config.metrics, metrics
+        ).items():
+            escalated_cases = [cases_by_name[name] for name in names]
+            for start in range(0, len(escalated_cases), chunk_size):
+                result_stream.write(
+                    run_deepeval_evaluation(
+                        cases=escalated_cases[start : start + chunk_size],
+                        metrics=[cast(BaseMetric, escalation_metrics[index])],
+                        n_runs=evaluation_config.n_runs,
+                        display_config=display_config,
+                        async_config=AsyncConfig(
+                            max_concurrent=evaluation_config.max_concurrent,
+                            throttle_value=evaluation_config.throttle_value,
+                        ),
+                        cache_config=cache_config,
+                        error_config=error_config,
+                    )
+                )
+                write_judges_telemetry(
+                    output_dir / TELEMETRY_FILENAME,
+                    [cast(BaseMetric, escalation_metrics[index])],
+                )
+
+    results, report = apply_escalations(
+        results,
+        read_streamed_results_table(escalations_path),
+        evaluation_config.metrics,
+        metrics,
+    )
+    report.to_csv(output_dir / CASCADE_FILENAME, index=False)
+
+    return results
+
+
+def log_errored_judgements(results: ResultsTable):
+    """Warn about the judgements that errored, which a resumed evaluation
+    judges again"""
+    errored = sum(error is not None for error in results.error)
+    if errored:
+        logging.warning(
+            f"{errored} judgement(s) errored, resume the evaluation with "
+            "--resume to judge them again"
+        )
+
+
+def log_judge_token_usage(metrics: list[BaseMetric]):
+    """Log the tokens used by each judge model that records them, including
+    those served from the provider's prompt cache"""
+    for judge in unique_judges(metrics):
+        if judge.token_usage.prompt_tokens:
+            logging.info(
+                f"Judge {judge.get_model_name()} token usage: {judge.token_usage}"
+            )
+
+
+def write_judges_telemetry(path: Path, metrics: list[BaseMetric]):
+    """Append the telemetry of the requests each judge model made since it was
+    last written to a JSONL file"""
+    calls = [
+        call
+        for judge in unique_judges(metrics)
+        for call in judge.telemetry.take_calls()
+    ]
+    if calls:
+        write_judge_telemetry(path, calls)
+
+
+def log_judge_telemetry(path: Path):
+    """Log a summary of the judge telemetry, by metric and judge model"""
+    if not path.exists():
+        return
+
+    summary = judge_telemetry_summary(path)
+    if not summary.empty:
+        logging.info(
+            "Judge telemetry (latency in seconds):\n"
+            + summary.to_string(float_format="{:.2f}".format)
+        )
+
+
+def unique_judges(metrics: list[BaseMetric]) -> list[JudgeGPTModel]:
+    """The judge models of the metrics that record their token usage and
+    telemetry, once each"""
+    judges: dict[int, JudgeGPTModel] = {}
+    for metric in metrics:
+        model = getattr(metric, "model", None)
+        if isinstance(model, JudgeGPTModel):
+            judges[id(model)] = model
+    return list(judges.values())
+
+
 class AggregatedResults:
-    def __init__(self, evaluation_results: list[EvaluationResult]):
-        self.evaluation_results = evaluation_results
+    def __init__(self, results: ResultsTable):
+        self.table = results
 
     @cached_property
     def per_input_metric_averages(self) -> pd.DataFrame:
@@ -97,39 +529,28 @@ class AggregatedResults:
         Returns:
             DataFrame with rows as test names and columns as metrics.
         """
-        # flatten the evaluation results
-        data = []
-
-        for eval_result in self.evaluation_results or []:
-            for evaluation_output in eval_result.run_metric_outputs:
-                data.append(
-                    {
-                        "name": eval_result.name,
-                        "input": eval_result.input,
-                        "metric": evaluation_output.metric,
-                        "score": evaluation_output.score,
-                    }
-                )
-
-        df = pd.DataFrame(data)
-
-        return (
-            df.groupby(["name", "input", "metric"])["score"]
-            .agg(["mean", "std"])
-            .unstack()
-            .reset_index()
-        )
+        return self.table.per_input_metric_stats()
 
     @cached_property
     def summary(self) -> pd.DataFrame:
         """
-        Summary statistics across all inputs: median, mean, std per metric.
+        Summary statistics across all inputs: median, mean, std per metric,
+        and a hierarchical bootstrap confidence interval for the mean, which
+        resamples inputs and then the runs of each input.
 
         Returns:
             DataFrame with metric as index and stats as columns.
         """
 
         mean_df = self.per_input_metric_averages["mean"]
+        intervals = pd.DataFrame.from_dict(
+            {
+                metric: hierarchical_bootstrap_interval(run_scores)
+                for metric, run_scores in self.table.run_scores_by_metric().items()
+            },
+            orient="index",
+            columns=pd.Index(["mean_ci_lower", "mean_ci_upper"]),
+        )
 
         return pd.DataFrame(
             {
@@ -137,12 +558,12 @@ class AggregatedResults:
                 "mean": mean_df.mean(),
                 "std": mean_df.std(),
             }
-        )
+        ).join(intervals)
 
     def export_to_csvs(self, output_dir: Path) -> None:
         """
         Exports per-input and summary metric statistics to CSV files.
         """
-        pd.DataFrame(self.evaluation_results).to_csv(output_dir / "tidy_results.csv")
+        self.table.tidy_results().to_csv(output_dir / "tidy_results.csv")
         self.per_input_metric_averages.to_csv(output_dir / "results_per_input.csv")
         self.summary.to_csv(output_dir / "results_summary.csv")
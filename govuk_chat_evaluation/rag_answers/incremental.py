@@ -0,0 +1,174 @@
+from collections import defaultdict
+from pathlib import Path
+
+from deepeval.test_case import LLMTestCase
+
+from ..file_system import jsonl_to_models
+from .data_models import (
+    EvaluationResult,
+    MetricJudgements,
+    RunMetricOutput,
+    case_content_hash,
+)
+from .results_table import ResultsTable, ResultsTableBuilder
+import logging
+
+JUDGEMENTS_FILENAME = "judgements.jsonl"
+
+# Run metric outputs keyed by (test case content hash, metric config hash)
+PreviousJudgements = dict[tuple[str, str], list[RunMetricOutput]]
+
+
+def llm_test_case_content_hash(case: LLMTestCase) -> str:
+    return case_content_hash(
+        case.input,
+        case.actual_output,
+        case.expected_output or "",
+        case.retrieval_context or [],
+    )
+
+
+def load_previous_judgements(results_dir: Path, n_runs: int) -> PreviousJudgements:
+    """Load the judgements of a previous evaluation that can be reused, ignoring
+    any that are missing the output of a run or where a run errored. Judgements
+    may have extra runs, from an evaluation with adaptive runs."""
+    path = results_dir / JUDGEMENTS_FILENAME
+
+    if not path.exists():
+        logging.warning(
+            f"No {JUDGEMENTS_FILENAME} found in {results_dir}, all test cases "
+            "will be judged"
+        )
+        return {}
+
+    return {
+        (judgements.case_hash, judgements.metric_config_hash): (
+            judgements.run_metric_outputs
+        )
+        for judgements in jsonl_to_models(path, MetricJudgements)
+        if set(range(n_runs))
+        <= {
+            output.run
+            for output in judgements.run_metric_outputs
+            if output.error is None
+        }
+    }
+
+
+def plan_evaluation(
+    cases: list[LLMTestCase],
+    metric_config_hashes: list[str],
+    previous_judgements: PreviousJudgements,
+) -> dict[tuple[int, ...], list[LLMTestCase]]:
+    """
+    Group the test cases by the metrics they still need to be judged against,
+    so each group can be evaluated with only those metrics.
+
+    Returns:
+        The test cases keyed by the indexes (in metric_config_hashes) of the
+        metrics that have no previous judgement to reuse. Test cases that have
+        previous judgements for every metric are left out.
+    """
+    plan: dict[tuple[int, ...], list[LLMTestCase]] = defaultdict(list)
+
+    for case in cases:
+        case_hash = llm_test_case_content_hash(case)
+        metric_indexes = tuple(
+            index
+            for index, metric_config_hash in enumerate(metric_config_hashes)
+            if (case_hash, metric_config_hash) not in previous_judgements
+        )
+        if metric_indexes:
+            plan[metric_indexes].append(case)
+
+    reused = len(cases) * len(metric_config_hashes) - sum(
+        len(metric_indexes) * len(plan_cases)
+        for metric_indexes, plan_cases in plan.items()
+    )
+    if reused:
+        logging.info(f"Reusing {reused} previous test case judgement(s)")
+
+    return dict(plan)
+
+
+def merge_previous_judgements(
+    results: ResultsTable,
+    cases: list[LLMTestCase],
+    metric_config_hashes: list[str],
+    previous_judgements: PreviousJudgements,
+) -> ResultsTable:
+    """Add the reused previous judgements of each test case to its results,
+    adding test cases that weren't judged again, in the order of the test
+    cases"""
+    results_by_hash: dict[str, list[str]] = defaultdict(list)
+    for name, content_hash in zip(results.name.tolist(), results.content_hashes()):
+        results_by_hash[content_hash].append(name)
+
+    reused = ResultsTableBuilder()
+    merged_names: list[str] = []
+
+    for case in cases:
+        case_hash = llm_test_case_content_hash(case)
+        reused_outputs = [
+            output
+            for metric_config_hash in metric_config_hashes
+            for output in previous_judgements.get((case_hash, metric_config_hash), [])
+        ]
+
+        if results_by_hash[case_hash]:
+            name = results_by_hash[case_hash].pop(0)
+        elif reused_outputs:
+            name = str(case.name)
+        else:
+            continue
+
+        if reused_outputs:
+            reused.add_evaluation_result(
+                EvaluationResult(
+                    name=name,
+                    input=case.input,
+                    actual_output=str(case.actual_output),
+                    expected_output=case.expected_output or "",
+                    retrieval_context=case.retrieval_context or [],
+                    run_metric_outputs=reused_outputs,
+                )
+            )
+        merged_names.append(name)
+
+    # keep any results that couldn't be matched to a test case
+    for unmatched_names in results_by_hash.values():
+        merged_names.extend(unmatched_names)
+
+    merged = ResultsTable.concat([results, reused.build()])
+    case_indexes = {name: index for index, name in enumerate(merged.name.tolist())}
+    return merged.select_cases([case_indexes[name] for name in merged_names])
+
+
+def evaluation_results_to_judgements(
+    results: ResultsTable,
+    metric_config_hash_by_name: dict[str, str],
+) -> list[MetricJudgements]:
+    """Split results into the judgements of each metric for each test case, so
+    they can be reused by a later evaluation"""
+    judgements = []
+
+    for case_hash, outputs in zip(
+        results.content_hashes(), results.run_metric_outputs_by_case()
+    ):
+        outputs_by_metric: dict[str, list[RunMetricOutput]] = defaultdict(list)
+        for output in outputs:
+            outputs_by_metric[output["metric"]].append(RunMetricOutput(**output))
+
+        for metric, metric_outputs in outputs_by_metric.items():
+            if metric not in metric_config_hash_by_name:
+                continue
+
+            judgements.append(
+                MetricJudgements(
+                    case_hash=case_hash,
+                    metric_config_hash=metric_config_hash_by_name[metric],
+                    run_metric_outputs=metric_outputs,
+                )
+            )
+
+    return judgements
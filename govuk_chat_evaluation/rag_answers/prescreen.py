@@ -0,0 +1,196 @@
+import logging
+from pathlib import Path
+from typing import Optional, Sequence, cast
+
+import numpy as np
+import pandas as pd
+from deepeval.metrics import BaseMetric
+from deepeval.test_case import LLMTestCase
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import CountVectorizer
+
+from .data_models import Config, LexicalPrescreenConfig, RunMetricOutput
+from .incremental import PreviousJudgements, llm_test_case_content_hash
+
+PRESCREEN_FILENAME = "prescreen_skips.csv"
+
+# words, including single characters such as numbers, lowercased
+TOKEN_PATTERN = r"(?u)\b\w+\b"
+
+
+def lexical_similarities(answers: list[str], references: list[str]) -> pd.DataFrame:
+    """
+    Compare each answer with its reference answer.
+
+    Returns:
+        A row for each pair with the F1 of their token overlap, bigram overlap
+        and longest common subsequence of tokens (ROUGE-L), each from 0 to 1.
+        Pairs too short to have bigrams use their token overlap as their
+        bigram overlap.
+    """
+    token_overlap = np.nan_to_num(_ngram_overlap(answers, references, 1))
+    bigram_overlap = _ngram_overlap(answers, references, 2)
+
+    return pd.DataFrame(
+        {
+            "token_overlap": token_overlap,
+            "bigram_overlap": np.where(
+                np.isnan(bigram_overlap), token_overlap, bigram_overlap
+            ),
+            "rouge_l": _rouge_l(answers, references),
+        }
+    )
+
+
+def rouge_l_f1(answer: list[str], reference: list[str]) -> float:
+    """The ROUGE-L F1 of two token sequences"""
+    if not answer or not reference:
+        return 0.0
+
+    vocabulary = {token: index for index, token in enumerate(dict.fromkeys(reference))}
+    reference_ids = np.array([vocabulary[token] for token in reference])
+    answer_ids = np.array([vocabulary.get(token, -1) for token in answer])
+
+    # the longest common subsequence, a row of the dynamic programming table at
+    # a time: each row is the running maximum of the row above and matches
+    # extending the diagonal
+    row = np.zeros(len(reference) + 1, dtype=np.int32)
+    for token_id in answer_ids:
+        candidates = row.copy()
+        candidates[1:] = np.maximum(
+            row[1:], np.where(reference_ids == token_id, row[:-1] + 1, 0)
+        )
+        row = np.maximum.accumulate(candidates)
+
+    lcs = int(row[-1])
+    return 2 * lcs / (len(answer) + len(reference))
+
+
+def prescreen_cases(
+    cases: list[LLMTestCase],
+    evaluation_config: Config,
+    metrics: Sequence[BaseMetric],
+    metric_config_hashes: list[str],
+) -> tuple[PreviousJudgements, pd.DataFrame]:
+    """
+    Score the test cases that a metric's lexical pre-screen can decide without
+    its judge. An answer at least as similar to the expected answer as
+    pass_above, on every similarity measure, scores 1. An answer less similar
+    than fail_below, on every measure, scores 0.
+
+    Returns:
+        The outputs of every run of the screened test cases, keyed like
+        previous judgements so they are not judged again, and a record of
+        each skip for auditing
+    """
+    screened: PreviousJudgements = {}
+    skips: list[pd.DataFrame] = []
+    screening = [
+        (metric_config, metric.__name__, metric_config_hash)
+        for metric_config, metric, metric_config_hash in zip(
+            evaluation_config.metrics, metrics, metric_config_hashes
+        )
+        if metric_config.prescreen is not None
+    ]
+
+    if not cases or not screening:
+        return screened, pd.DataFrame()
+
+    similarities = lexical_similarities(
+        [str(case.actual_output) for case in cases],
+        [case.expected_output or "" for case in cases],
+    )
+    case_hashes = [llm_test_case_content_hash(case) for case in cases]
+
+    for metric_config, metric_name, metric_config_hash in screening:
+        prescreen = cast(LexicalPrescreenConfig, metric_config.prescreen)
+        scores = _prescreen_scores(similarities, prescreen)
+
+        for index in np.flatnonzero(~np.isnan(scores)):
+            score = float(scores[index])
+            screened[(case_hashes[index], metric_config_hash)] = [
+                RunMetricOutput(
+                    run=run,
+                    metric=metric_name,
+                    score=score,
+                    cost=0.0,
+                    reason="Lexical pre-screen: "
+                    + ("near identical" if score else "dissimilar")
+                    + " to the expected output",
+                    success=score >= metric_config.threshold,
+                )
+                for run in range(evaluation_config.n_runs)
+            ]
+
+        skipped = ~np.isnan(scores)
+        skips.append(
+            similarities[skipped].assign(
+                name=[str(cases[index].name) for index in np.flatnonzero(skipped)],
+                metric=metric_name,
+                score=scores[skipped],
+            )
+        )
+
+    audit = pd.concat(skips, ignore_index=True).reindex(
+        columns=["name", "metric", "score", *similarities.columns]
+    )
+    logging.info(f"Lexical pre-screen: {len(audit)} judgement(s) skipped")
+
+    return screened, audit
+
+
+def write_prescreen_audit(output_dir: Path, audit: pd.DataFrame) -> Optional[Path]:
+    """Write the pre-screen skips to a CSV file, if there are any"""
+    if audit.empty:
+        return None
+
+    path = output_dir / PRESCREEN_FILENAME
+    audit.to_csv(path, index=False)
+    return path
+
+
+def _prescreen_scores(
+    similarities: pd.DataFrame, prescreen: LexicalPrescreenConfig
+) -> np.ndarray:
+    # NaN where the judge is still needed
+    scores = np.full(len(similarities), np.nan)
+    values = similarities.to_numpy()
+
+    if prescreen.fail_below is not None:
+        scores[(values < prescreen.fail_below).all(axis=1)] = 0.0
+    if prescreen.pass_above is not None:
+        scores[(values >= prescreen.pass_above).all(axis=1)] = 1.0
+
+    return scores
+
+
+def _ngram_overlap(answers: list[str], references: list[str], n: int) -> np.ndarray:
+    # NaN where neither text has n tokens
+    vectorizer = CountVectorizer(token_pattern=TOKEN_PATTERN, ngram_range=(n, n))
+    try:
+        counts = csr_matrix(vectorizer.fit_transform(answers + references))
+    except ValueError:
+        # no text has n tokens
+        return np.full(len(answers), np.nan)
+
+    answer_counts = counts[: len(answers)]
+    reference_counts = counts[len(answers) :]
+    overlap = np.asarray(answer_counts.minimum(reference_counts).sum(axis=1)).ravel()
+    totals = (
+        np.asarray(answer_counts.sum(axis=1)).ravel()
+        + np.asarray(reference_counts.sum(axis=1)).ravel()
+    )
+
+    return np.divide(
+        2 * overlap, totals, out=np.full(len(answers), np.nan), where=totals > 0
+    )
+
+
+def _rouge_l(answers: list[str], references: list[str]) -> np.ndarray:
+    tokenize = CountVectorizer(token_pattern=TOKEN_PATTERN).build_analyzer()
+    return np.array(
+        [
+            rouge_l_f1(tokenize(answer), tokenize(reference))
+            for answer, reference in zip(answers, references)
+        ]
+    )
@@ -0,0 +1,57 @@
+import json
+from pathlib import Path
+from typing import Self
+
+from deepeval.evaluate.types import TestResult
+from pydantic_core import from_json
+
+from .data_models import EvaluationResult
+from .deepeval_evaluate import stream_row_from_test_result
+from .results_table import ResultsTable
+
+RESULTS_STREAM_FILENAME = "run_metric_outputs.jsonl"
+
+
+class ResultStream:
+    """Appends the outputs of each run of each test case to a JSONL file as
+    they are evaluated, so finished judgements are on disk before the whole
+    evaluation completes"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._file = open(path, "a", encoding="utf8")
+
+    def write(self, all_runs: list[list[TestResult]], first_run: int = 0) -> None:
+        """Append the results of run_deepeval_evaluation, one line per test
+        case and run"""
+        for run_idx, run in enumerate(all_runs, start=first_run):
+            for result in run:
+                self._file.write(
+                    json.dumps(
+                        stream_row_from_test_result(result, run_idx), ensure_ascii=False
+                    )
+                    + "\n"
+                )
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def read_streamed_results_table(path: Path) -> ResultsTable:
+    """Read a file written by ResultStream into a ResultsTable, combining the
+    runs of each test case in the order they were first written"""
+    with open(path, "r", encoding="utf8") as file:
+        return ResultsTable.from_rows(from_json(line) for line in file if line.strip())
+
+
+def read_streamed_evaluation_results(path: Path) -> list[EvaluationResult]:
+    """Read a file written by ResultStream, combining the runs of each test case
+    into a single evaluation result in the order they were first written"""
+    return read_streamed_results_table(path).evaluation_results
@@ -0,0 +1,429 @@
+from array import array
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Any, Iterable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from pydantic import TypeAdapter
+
+from .data_models import EvaluationResult, case_content_hash
+
+_CASE_FIELDS = [
+    "name",
+    "input",
+    "actual_output",
+    "expected_output",
+    "retrieval_context",
+]
+# in the order of RunMetricOutput's fields
+_RUN_METRIC_OUTPUT_FIELDS = [
+    "run",
+    "metric",
+    "score",
+    "cost",
+    "reason",
+    "success",
+    "error",
+]
+
+_evaluation_results_adapter = TypeAdapter(list[EvaluationResult])
+
+
+@dataclass
+class ResultsTable:
+    """
+    Evaluation results held as NumPy columns.
+
+    The case columns have a row for each test case. The output columns have a
+    row for each run of each metric, which refers to its test case by its row
+    in the case columns. Scores and costs that are None are held as NaN.
+    """
+
+    # case columns
+    name: np.ndarray
+    input: np.ndarray
+    actual_output: np.ndarray
+    expected_output: np.ndarray
+    retrieval_context: np.ndarray
+    # output columns
+    case_index: np.ndarray
+    run: np.ndarray
+    metric: np.ndarray
+    score: np.ndarray
+    cost: np.ndarray
+    reason: np.ndarray
+    success: np.ndarray
+    error: np.ndarray
+
+    @classmethod
+    def from_evaluation_results(
+        cls, evaluation_results: list[EvaluationResult]
+    ) -> "ResultsTable":
+        builder = ResultsTableBuilder()
+        for result in evaluation_results:
+            builder.add_evaluation_result(result)
+        return builder.build()
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[dict[str, Any]]) -> "ResultsTable":
+        """Build the table from rows as ResultStream writes them, with a test
+        case for each name in the order they first appear"""
+        builder = ResultsTableBuilder()
+        for row in rows:
+            builder.add_row(row)
+        return builder.build()
+
+    @classmethod
+    def concat(cls, tables: Sequence["ResultsTable"]) -> "ResultsTable":
+        """Combine the tables, with a test case for each name in the order they
+        first appear, as from_rows combines rows, and the outputs of each
+        table in turn"""
+        names = np.concatenate([table.name for table in tables])
+        codes, _ = pd.factorize(names)
+        _, first_rows = np.unique(codes, return_index=True)
+        offsets = np.cumsum([0] + [len(table.name) for table in tables[:-1]])
+
+        return ResultsTable(
+            **{
+                field: np.concatenate([getattr(table, field) for table in tables])[
+                    first_rows
+                ]
+                for field in _CASE_FIELDS
+            },
+            case_index=codes[
+                np.concatenate(
+                    [
+                        table.case_index + offset
+                        for table, offset in zip(tables, offsets)
+                    ]
+                )
+            ].astype(np.intp),
+            **{
+                field: np.concatenate([getattr(table, field) for table in tables])
+                for field in _RUN_METRIC_OUTPUT_FIELDS
+            },
+        )
+
+    def select_cases(self, case_indexes: Sequence[int]) -> "ResultsTable":
+        """The test cases at the indexes, in that order, with their outputs"""
+        selected = np.asarray(case_indexes, dtype=np.intp)
+        new_case_indexes = np.full(len(self.name), -1, dtype=np.intp)
+        new_case_indexes[selected] = np.arange(len(selected))
+        output_case_indexes = new_case_indexes[self.case_index]
+        kept = output_case_indexes >= 0
+
+        return ResultsTable(
+            **{field: getattr(self, field)[selected] for field in _CASE_FIELDS},
+            case_index=output_case_indexes[kept],
+            **{
+                field: getattr(self, field)[kept] for field in _RUN_METRIC_OUTPUT_FIELDS
+            },
+        )
+
+    def select_outputs(self, kept: np.ndarray) -> "ResultsTable":
+        """Every test case, with only the outputs where kept is True"""
+        return ResultsTable(
+            **{field: getattr(self, field) for field in _CASE_FIELDS},
+            case_index=self.case_index[kept],
+            **{
+                field: getattr(self, field)[kept] for field in _RUN_METRIC_OUTPUT_FIELDS
+            },
+        )
+
+    def content_hashes(self) -> list[str]:
+        """The hash of the content of each test case, as
+        EvaluationResult.content_hash gives it"""
+        return [
+            case_content_hash(input, actual_output, expected_output, retrieval_context)
+            for input, actual_output, expected_output, retrieval_context in zip(
+                self.input,
+                self.actual_output,
+                self.expected_output,
+                self.retrieval_context,
+            )
+        ]
+
+    def run_metric_outputs_by_case(self) -> list[list[dict[str, Any]]]:
+        """The outputs of each test case as dicts of RunMetricOutput's fields,
+        in the order they were added"""
+        outputs: list[list[dict[str, Any]]] = [[] for _ in range(len(self.name))]
+        columns = [
+            _python_values(getattr(self, field)) for field in _RUN_METRIC_OUTPUT_FIELDS
+        ]
+        for case_index, values in zip(self.case_index.tolist(), zip(*columns)):
+            outputs[case_index].append(dict(zip(_RUN_METRIC_OUTPUT_FIELDS, values)))
+        return outputs
+
+    @cached_property
+    def evaluation_results(self) -> list[EvaluationResult]:
+        """The table as evaluation results, with the outputs of each test case
+        in the order they were added, validated together in a single pass"""
+        outputs = self.run_metric_outputs_by_case()
+
+        return _evaluation_results_adapter.validate_python(
+            [
+                {
+                    "name": name,
+                    "input": input,
+                    "actual_output": actual_output,
+                    "expected_output": expected_output,
+                    "retrieval_context": retrieval_context,
+                    "run_metric_outputs": run_metric_outputs,
+                }
+                for (
+                    name,
+                    input,
+                    actual_output,
+                    expected_output,
+                    retrieval_context,
+                    run_metric_outputs,
+                ) in zip(
+                    self.name,
+                    self.input,
+                    self.actual_output,
+                    self.expected_output,
+                    self.retrieval_context,
+                    outputs,
+                )
+            ]
+        )
+
+    def per_input_metric_stats(self) -> pd.DataFrame:
+        """
+        The mean and standard deviation of the scores of each metric for each
+        test input, ignoring errored runs.
+
+        Returns:
+            DataFrame with a row for each name and input, in order, and a
+            column for the mean and std of each metric, in order
+        """
+        input_codes, names, inputs = self._input_codes()
+        metric_codes, metrics = pd.factorize(self.metric, sort=True)
+        n_inputs, n_metrics = len(names), len(metrics)
+
+        output_input_codes = input_codes[self.case_index]
+        groups = output_input_codes * n_metrics + metric_codes
+        scored = ~np.isnan(self.score)
+        scored_groups = groups[scored]
+        scores = self.score[scored]
+
+        counts = np.bincount(scored_groups, minlength=n_inputs * n_metrics)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = (
+                np.bincount(
+                    scored_groups, weights=scores, minlength=n_inputs * n_metrics
+                )
+                / counts
+            )
+            squared_deviations = np.bincount(
+                scored_groups,
+                weights=(scores - means[scored_groups]) ** 2,
+                minlength=n_inputs * n_metrics,
+            )
+            stds = np.where(
+                counts > 1, np.sqrt(squared_deviations / (counts - 1)), np.nan
+            )
+
+        # inputs of test cases without any outputs are left out
+        has_outputs = np.bincount(output_input_codes, minlength=n_inputs) > 0
+        means = means.reshape(n_inputs, n_metrics)[has_outputs]
+        stds = stds.reshape(n_inputs, n_metrics)[has_outputs]
+
+        stats = pd.DataFrame(
+            np.hstack([means, stds]),
+            columns=pd.MultiIndex.from_product(
+                [["mean", "std"], list(metrics)], names=[None, "metric"]
+            ),
+        )
+        stats.insert(0, ("name", ""), names[has_outputs])
+        stats.insert(1, ("input", ""), inputs[has_outputs])
+        return stats
+
+    def run_scores_by_metric(self) -> dict[str, np.ndarray]:
+        """
+        The scores of each metric for each test input, ignoring errored runs,
+        grouped as per_input_metric_stats groups them.
+
+        Returns:
+            For each metric, in order, an array with a row for each input it
+            scored, holding its run scores first and padded with NaN
+        """
+        input_codes, _, _ = self._input_codes()
+        metric_codes, metrics = pd.factorize(self.metric, sort=True)
+        scored = ~np.isnan(self.score)
+        groups = (input_codes[self.case_index] * len(metrics) + metric_codes)[scored]
+        scores = self.score[scored]
+
+        # the position of each score among the scores of its input and metric
+        order = np.argsort(groups, kind="stable")
+        groups, scores = groups[order], scores[order]
+        group_starts = np.searchsorted(groups, groups)
+        positions = np.arange(len(groups)) - group_starts
+
+        run_scores = {}
+        for metric_code, metric in enumerate(metrics):
+            in_metric = groups % len(metrics) == metric_code
+            metric_inputs, rows = np.unique(
+                groups[in_metric] // len(metrics), return_inverse=True
+            )
+            metric_scores = np.full(
+                (len(metric_inputs), positions[in_metric].max(initial=-1) + 1), np.nan
+            )
+            metric_scores[rows, positions[in_metric]] = scores[in_metric]
+            run_scores[metric] = metric_scores
+
+        return run_scores
+
+    def _input_codes(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Group the test cases by name and input, as test cases with the same
+        name and input are aggregated together.
+
+        Returns:
+            The code of each test case's group, and the name and input of each
+            group, sorted by name and then input
+        """
+        name_codes, names = pd.factorize(self.name, sort=True)
+        text_codes, texts = pd.factorize(self.input, sort=True)
+        pairs, input_codes = np.unique(
+            name_codes * len(texts) + text_codes, return_inverse=True
+        )
+        return (
+            input_codes,
+            np.asarray(names)[pairs // len(texts)],
+            np.asarray(texts)[pairs % len(texts)],
+        )
+
+    def tidy_results(self) -> pd.DataFrame:
+        """A row for each test case, with its run metric outputs as a list of
+        dicts in the order they were added"""
+        if not len(self.name):
+            return pd.DataFrame()
+
+        return pd.DataFrame(
+            {
+                "name": self.name,
+                "input": self.input,
+                "actual_output": self.actual_output,
+                "expected_output": self.expected_output,
+                "retrieval_context": self.retrieval_context,
+                "run_metric_outputs": self.run_metric_outputs_by_case(),
+            }
+        )
+
+
+class ResultsTableBuilder:
+    """Builds a ResultsTable a row at a time, appending to a typed buffer for
+    each column"""
+
+    def __init__(self):
+        self._case_indexes: dict[str, int] = {}
+        self._cases: dict[str, list[Any]] = {field: [] for field in _CASE_FIELDS}
+        self._case_index = array("q")
+        self._run = array("q")
+        self._score = array("d")
+        self._cost = array("d")
+        self._metric: list[str] = []
+        self._reason: list[Optional[str]] = []
+        self._success: list[Optional[bool]] = []
+        self._error: list[Optional[str]] = []
+
+    def add_evaluation_result(self, result: EvaluationResult) -> None:
+        """Add a test case and its outputs, as a separate test case from any
+        added before"""
+        case_index = self._add_case(
+            result.name,
+            result.input,
+            result.actual_output,
+            result.expected_output,
+            result.retrieval_context,
+        )
+        for output in result.run_metric_outputs:
+            self._add_output(
+                case_index,
+                output.run,
+                output.metric,
+                output.score,
+                output.cost,
+                output.reason,
+                output.success,
+                output.error,
+            )
+
+    def add_row(self, row: dict[str, Any]) -> None:
+        """Add the outputs of a row as ResultStream writes it, with the fields
+        of an EvaluationResult, to the test case with the same name if one has
+        been added"""
+        case_index = self._case_indexes.get(row["name"])
+        if case_index is None:
+            case_index = self._case_indexes[row["name"]] = self._add_case(
+                row["name"],
+                row["input"],
+                row["actual_output"],
+                row["expected_output"],
+                row["retrieval_context"],
+            )
+        for output in row["run_metric_outputs"]:
+            self._add_output(case_index, **output)
+
+    def build(self) -> ResultsTable:
+        return ResultsTable(
+            **{field: _object_array(column) for field, column in self._cases.items()},
+            case_index=np.array(self._case_index, dtype=np.intp),
+            run=np.array(self._run, dtype=np.int64),
+            metric=_object_array(self._metric),
+            score=np.array(self._score, dtype=np.float64),
+            cost=np.array(self._cost, dtype=np.float64),
+            reason=_object_array(self._reason),
+            success=_object_array(self._success),
+            error=_object_array(self._error),
+        )
+
+    def _add_case(
+        self,
+        name: str,
+        input: str,
+        actual_output: str,
+        expected_output: str,
+        retrieval_context: list[str],
+    ) -> int:
+        self._cases["name"].append(name)
+        self._cases["input"].append(input)
+        self._cases["actual_output"].append(actual_output)
+        self._cases["expected_output"].append(expected_output)
+        self._cases["retrieval_context"].append(retrieval_context)
+        return len(self._cases["name"]) - 1
+
+    def _add_output(
+        self,
+        case_index: int,
+        run: int,
+        metric: str,
+        score: Optional[float],
+        cost: Optional[float],
+        reason: Optional[str],
+        success: Optional[bool],
+        error: Optional[str],
+    ) -> None:
+        self._case_index.append(case_index)
+        self._run.append(run)
+        self._metric.append(metric)
+        self._score.append(np.nan if score is None else score)
+        self._cost.append(np.nan if cost is None else cost)
+        self._reason.append(reason)
+        self._success.append(success)
+        self._error.append(error)
+
+
+def _object_array(values: list[Any]) -> np.ndarray:
+    # from an iterator, so lists such as retrieval contexts stay one value each
+    return np.fromiter(values, dtype=object, count=len(values))
+
+
+def _python_values(column: np.ndarray) -> list[Any]:
+    """The values of a column as Python objects, with NaN as None"""
+    values = column.tolist()
+    if column.dtype.kind == "f":
+        return [None if value != value else value for value in values]
+    return values
@@ -0,0 +1,157 @@
+import json
+import logging
+import os
+from collections import defaultdict
+from pathlib import Path
+from typing import Optional
+
+from deepeval.test_case import LLMTestCase
+from pydantic import TypeAdapter
+
+from .data_models import EvaluationResult, RunMetricOutput
+
+_evaluation_result_adapter = TypeAdapter(EvaluationResult)
+
+# the judgement hash of each metric an evaluation was started with
+METRIC_HASHES_FILENAME = "metric_judgement_hashes.json"
+
+# (test case name, metric name, run) of each judgement that completed
+CompletedCells = set[tuple[str, str, int]]
+
+
+def write_metric_hashes(output_dir: Path, metric_hashes: dict[str, str]) -> None:
+    """Record the judgement hash of each metric being evaluated, for the
+    evaluation to be resumed with the same metric configs"""
+    with open(output_dir / METRIC_HASHES_FILENAME, "w", encoding="utf8") as file:
+        json.dump(metric_hashes, file, indent=2)
+
+
+def resumable_metric_names(output_dir: Path, metric_hashes: dict[str, str]) -> set[str]:
+    """
+    Return the metrics whose judgements in an interrupted evaluation can be
+    resumed, those whose config is unchanged since it started. The judgements
+    of other metrics are judged again.
+    """
+    path = output_dir / METRIC_HASHES_FILENAME
+    if not path.exists():
+        logging.warning(
+            f"No metric configs to resume found at {path}, every metric is judged again"
+        )
+        return set()
+
+    with open(path, "r", encoding="utf8") as file:
+        previous_hashes = json.load(file)
+
+    changed = [
+        name
+        for name, metric_hash in metric_hashes.items()
+        if previous_hashes.get(name) != metric_hash
+    ]
+    if changed:
+        logging.warning(
+            f"The config of {', '.join(changed)} changed since the evaluation "
+            "started, its judgements are judged again"
+        )
+
+    return set(metric_hashes) - set(changed)
+
+
+def resume_result_stream(
+    path: Path,
+    case_names: set[str],
+    metric_names: set[str],
+    max_runs: Optional[int] = None,
+) -> CompletedCells:
+    """
+    Prepare the results stream of an interrupted evaluation to be resumed.
+
+    The stream is rewritten with only the outputs of completed judgements, of
+    the test cases, metrics and runs below max_runs still being evaluated, so
+    missing and errored judgements can be evaluated again and appended to it.
+
+    Returns:
+        The judgements that completed
+    """
+    if not path.exists():
+        logging.warning(f"No results to resume found at {path}")
+        return set()
+
+    outputs_by_case_run: dict[tuple[str, int], dict[str, RunMetricOutput]] = {}
+    results: dict[tuple[str, int], EvaluationResult] = {}
+
+    with open(path, "r", encoding="utf8") as file:
+        for line in file:
+            if not line.strip():
+                continue
+            result = _evaluation_result_adapter.validate_json(line)
+            if result.name not in case_names:
+                continue
+            for output in result.run_metric_outputs:
+                if (
+                    output.error is None
+                    and output.metric in metric_names
+                    and (max_runs is None or output.run < max_runs)
+                ):
+                    key = (result.name, output.run)
+                    results.setdefault(key, result)
+                    # a later output for the same judgement replaces an earlier one
+                    outputs_by_case_run.setdefault(key, {})[output.metric] = output
+
+    resumed_path = path.with_suffix(path.suffix + ".resumed")
+    with open(resumed_path, "w", encoding="utf8") as file:
+        for key, result in results.items():
+            result.run_metric_outputs = list(outputs_by_case_run[key].values())
+            file.write(_evaluation_result_adapter.dump_json(result).decode() + "\n")
+    os.replace(resumed_path, path)
+
+    completed = {
+        (name, output.metric, run)
+        for (name, run), outputs in outputs_by_case_run.items()
+        for output in outputs.values()
+    }
+    logging.info(f"Resuming evaluation with {len(completed)} completed judgement(s)")
+
+    return completed
+
+
+def plan_resumed_evaluation(
+    plan: dict[tuple[int, ...], list[LLMTestCase]],
+    metric_names: list[str],
+    n_runs: int,
+    completed: CompletedCells,
+) -> dict[tuple[tuple[int, ...], range], list[LLMTestCase]]:
+    """
+    Narrow an evaluation plan, from plan_evaluation, to the judgements that
+    did not complete.
+
+    Returns:
+        The test cases keyed by the indexes of the metrics and the range of
+        runs they still need to be judged for. Test cases missing runs that
+        aren't consecutive appear once for each range of consecutive runs.
+    """
+    resumed_plan: dict[tuple[tuple[int, ...], range], list[LLMTestCase]] = defaultdict(
+        list
+    )
+
+    for metric_indexes, cases in plan.items():
+        for case in cases:
+            missing_metrics = [
+                tuple(
+                    index
+                    for index in metric_indexes
+                    if (str(case.name), metric_names[index], run) not in completed
+                )
+                for run in range(n_runs)
+            ] + [()]
+
+            # consecutive runs missing the same metrics are evaluated together
+            first_run = 0
+            for run in range(1, n_runs + 1):
+                if missing_metrics[run] != missing_metrics[first_run]:
+                    if missing_metrics[first_run]:
+                        resumed_plan[
+                            (missing_metrics[first_run], range(first_run, run))
+                        ].append(case)
+                    first_run = run
+
+    return dict(resumed_plan)
@@ -0,0 +1,102 @@
+import json
+import re
+from collections import defaultdict
+from pathlib import Path
+from typing import TypeVar
+
+from deepeval.test_case import LLMTestCase
+
+PlanKey = TypeVar("PlanKey")
+
+_SHARD_INDEX = re.compile(r"\.shard-(\d+)$")
+
+
+def shard_stream_path(results_stream_path: Path, shard_index: int) -> Path:
+    """The results stream, or other file, a worker process writes for its
+    shard of the test cases"""
+    return results_stream_path.with_name(
+        f"{results_stream_path.stem}.shard-{shard_index}{results_stream_path.suffix}"
+    )
+
+
+def shard_evaluation_plan(
+    evaluation_plan: dict[PlanKey, list[LLMTestCase]],
+    cases: list[LLMTestCase],
+    n_shards: int,
+) -> list[dict[PlanKey, list[LLMTestCase]]]:
+    """
+    Split an evaluation plan between n_shards worker processes.
+
+    Test cases are dealt to the shards in turn, in the order of cases, so
+    every run and metric of a test case is evaluated by the same worker and
+    the shards get a similar share of the work.
+
+    Returns:
+        A plan for each shard, with the keys of evaluation_plan in the same
+        order. Shards without any test cases have an empty plan.
+    """
+    shard_by_name = {case.name: index % n_shards for index, case in enumerate(cases)}
+    shards: list[dict[PlanKey, list[LLMTestCase]]] = [
+        defaultdict(list) for _ in range(n_shards)
+    ]
+
+    for key, pending_cases in evaluation_plan.items():
+        for case in pending_cases:
+            shards[shard_by_name[case.name]][key].append(case)
+
+    return [dict(shard) for shard in shards]
+
+
+def merge_shard_streams(results_stream_path: Path, case_names: list[str]) -> None:
+    """
+    Append the results streams of the shards to the results stream and remove
+    them, including any left by an interrupted evaluation.
+
+    The results are ordered by test case, in the order of case_names, and
+    then in the order they were written, so the merged stream doesn't depend
+    on the number of shards or the order they finished in.
+    """
+    shard_paths = _shard_paths(results_stream_path)
+    if not shard_paths:
+        return
+
+    lines = []
+    for path in shard_paths:
+        with open(path, "r", encoding="utf8") as file:
+            lines += [line.rstrip("\n") for line in file if line.strip()]
+
+    case_order = {name: index for index, name in enumerate(case_names)}
+    lines.sort(
+        key=lambda line: case_order.get(json.loads(line)["name"], len(case_order))
+    )
+
+    with open(results_stream_path, "a", encoding="utf8") as file:
+        for line in lines:
+            file.write(line + "\n")
+
+    for path in shard_paths:
+        path.unlink()
+
+
+def merge_shard_files(path: Path) -> None:
+    """Append the files the shards wrote in place of the file at path to it,
+    in the order of the shards, and remove them"""
+    shard_paths = _shard_paths(path)
+    if not shard_paths:
+        return
+
+    with open(path, "a", encoding="utf8") as file:
+        for shard_path in shard_paths:
+            file.write(shard_path.read_text(encoding="utf8"))
+            shard_path.unlink()
+
+
+def _shard_paths(path: Path) -> list[Path]:
+    return sorted(
+        (
+            shard_path
+            for shard_path in path.parent.glob(f"{path.stem}.shard-*{path.suffix}")
+            if _SHARD_INDEX.search(shard_path.stem)
+        ),
+        key=lambda shard_path: int(_SHARD_INDEX.search(shard_path.stem)[1]),  # type: ignore[index]
+    )
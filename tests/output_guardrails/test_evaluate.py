@@ -226,15 +226,15 @@ class TestAggregateResults:
             [0, 0, 0],
         ]
 
-        assert expected_vectors == expected_ground_truth
-        assert actual_vectors == actual_predictions
+        assert expected_vectors.tolist() == expected_ground_truth
+        assert actual_vectors.tolist() == actual_predictions
 
     def test_expected_actual_vectors_empty(self):
         aggregate = AggregateResults([])
         assert aggregate.guardrail_names == []
         expected_vectors, actual_vectors = aggregate._expected_actual_guardrails_vectors
-        assert expected_vectors == []
-        assert actual_vectors == []
+        assert expected_vectors.tolist() == []
+        assert actual_vectors.tolist() == []
 
     def test_precision_per_guardrail(self, per_guardrail_eval_results):
         aggregate = AggregateResults(per_guardrail_eval_results)
@@ -1,4 +1,5 @@
 import json
+from typing import Any, Callable, Optional
 
 import pytest
 import yaml
@@ -102,12 +103,79 @@ def mock_deepeval_results():
 
 
 @pytest.fixture
-def mock_deepeval_evaluate(mocker, mock_deepeval_results):
-    wrapped_results = [
-        DeepevalEvaluationResult(test_results=result, confident_link=None)
-        for result in mock_deepeval_results
-    ]
+def mock_deepeval_evaluate(mocker):
+    def evaluate(test_cases, metrics, **_kwargs):
+        metrics_data = [
+            MetricData(
+                name=metric.__name__,
+                threshold=metric.threshold,
+                score=0.5,
+                reason="A reason",
+                success=True,
+            )  # pyright: ignore[reportCallIssue]
+            for metric in metrics
+        ]
+        test_results = [
+            DeepevalTestResult(
+                name=test_case.name,
+                input=test_case.input,
+                actual_output=test_case.actual_output,
+                expected_output=test_case.expected_output,
+                retrieval_context=test_case.retrieval_context,
+                metrics_data=metrics_data,
+                success=True,
+                conversational=False,
+            )
+            for test_case in test_cases
+        ]
+        return DeepevalEvaluationResult(test_results=test_results, confident_link=None)
+
     return mocker.patch(
         "govuk_chat_evaluation.rag_answers.deepeval_evaluate.deepeval_evaluate",
-        side_effect=wrapped_results,  # using side effects to return a group per execution
+        side_effect=evaluate,
     )
+
+
+@pytest.fixture
+def fake_run_deepeval_evaluation(mocker):
+    """Return a function that patches run_deepeval_evaluation to judge each
+    test case with score(index, case, metric, run), where index is the
+    position of the case in the evaluated cases. A score of None is a
+    judgement that errored."""
+
+    def patch(score: Callable[[int, Any, Any, int], Optional[float]]):
+        def evaluate(cases, metrics, n_runs=1, first_run=0, **_kwargs):
+            def metric_data(index, case, metric, run_idx):
+                value = score(index, case, metric, run_idx)
+                return MetricData(
+                    name=metric.__name__,
+                    threshold=metric.threshold,
+                    score=value,
+                    success=value is not None and value >= metric.threshold,
+                    error="Judgement errored" if value is None else None,
+                )  # pyright: ignore[reportCallIssue]
+
+            return [
+                [
+                    DeepevalTestResult(
+                        name=case.name,
+                        input=case.input,
+                        actual_output=case.actual_output,
+                        success=True,
+                        conversational=False,
+                        metrics_data=[
+                            metric_data(index, case, metric, run_idx)
+                            for metric in metrics
+                        ],
+                    )
+                    for index, case in enumerate(cases)
+                ]
+                for run_idx in range(first_run, first_run + n_runs)
+            ]
+
+        return mocker.patch(
+            "govuk_chat_evaluation.rag_answers.evaluate.run_deepeval_evaluation",
+            side_effect=evaluate,
+        )
+
+    return patch
@@ -0,0 +1,308 @@
+import asyncio
+from unittest.mock import AsyncMock, Mock
+
+import httpx
+import pytest
+from deepeval.metrics import BaseMetric
+from deepeval.metrics.utils import is_native_model
+from deepeval.models import GPTModel
+from deepeval.test_case import LLMTestCase
+from openai import DefaultHttpxClient
+from openai.types.completion_usage import CompletionUsage, PromptTokensDetails
+from pydantic import BaseModel
+
+from govuk_chat_evaluation.rag_answers.custom_deepeval.llm_judges import (
+    JudgeGPTModel,
+    JudgeRateLimiter,
+    JudgeResponseCache,
+    JudgeTokenUsage,
+)
+from govuk_chat_evaluation.rag_answers.custom_deepeval.llm_judges.telemetry import (
+    with_judge_telemetry,
+)
+
+
+class Verdict(BaseModel):
+    verdict: str
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = JudgeResponseCache(tmp_path / "cache.sqlite3")
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def mock_gpt_a_generate(mocker):
+    return mocker.patch.object(
+        GPTModel,
+        "a_generate",
+        new_callable=AsyncMock,
+        return_value=(Verdict(verdict="yes"), 0.1),
+    )
+
+
+@pytest.fixture
+def mock_gpt_generate(mocker):
+    return mocker.patch.object(
+        GPTModel, "generate", Mock(return_value=("a response", 0.1))
+    )
+
+
+def test_is_a_native_model(cache):
+    assert is_native_model(JudgeGPTModel(model="gpt-4o", cache=cache))
+
+
+@pytest.mark.asyncio
+async def test_a_generate_serves_repeat_evaluations_from_cache(
+    tmp_path, mock_gpt_a_generate
+):
+    path = tmp_path / "cache.sqlite3"
+
+    first_cache = JudgeResponseCache(path)
+    model = JudgeGPTModel(model="gpt-4o", cache=first_cache)
+    assert await model.a_generate("prompt", schema=Verdict) == (  # type: ignore[arg-type]
+        Verdict(verdict="yes"),
+        0.1,
+    )
+    first_cache.close()
+
+    second_cache = JudgeResponseCache(path)
+    model = JudgeGPTModel(model="gpt-4o", cache=second_cache)
+    assert await model.a_generate("prompt", schema=Verdict) == (  # type: ignore[arg-type]
+        Verdict(verdict="yes"),
+        0.0,
+    )
+    second_cache.close()
+
+    mock_gpt_a_generate.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_a_generate_repeated_prompts_in_a_run_call_the_model(
+    cache, mock_gpt_a_generate
+):
+    model = JudgeGPTModel(model="gpt-4o", cache=cache)
+
+    await model.a_generate("prompt", schema=Verdict)  # type: ignore[arg-type]
+    await model.a_generate("prompt", schema=Verdict)  # type: ignore[arg-type]
+
+    assert mock_gpt_a_generate.await_count == 2
+
+
+class VerdictMetric(BaseMetric):
+    def __init__(self, model):
+        self.model = model
+
+    async def a_measure(self, test_case, *args, **kwargs):
+        verdict, _ = await self.model.a_generate("prompt", schema=Verdict)
+        return verdict
+
+
+@pytest.mark.asyncio
+async def test_a_generate_serves_a_resumed_run_only_its_own_responses(
+    tmp_path, mock_gpt_a_generate
+):
+    path = tmp_path / "cache.sqlite3"
+    metric_class = with_judge_telemetry(VerdictMetric)
+
+    async def measure_runs(runs: list[int]):
+        cache = JudgeResponseCache(path)
+        metric = metric_class(JudgeGPTModel(model="gpt-4o", cache=cache))
+        for run in runs:
+            await metric.a_measure(
+                LLMTestCase(name=f"case::run-{run}", input="?", actual_output="!")
+            )
+        cache.close()
+
+    # run 0 is judged before the evaluation is interrupted, then resumed
+    await measure_runs([0])
+    await measure_runs([1])
+    assert mock_gpt_a_generate.await_count == 2
+
+    # a re-run of the whole evaluation is served from the cache
+    await measure_runs([0, 1])
+    assert mock_gpt_a_generate.await_count == 2
+
+
+def test_generate_serves_repeat_evaluations_from_cache(tmp_path, mock_gpt_generate):
+    path = tmp_path / "cache.sqlite3"
+
+    for expected_cost in [0.1, 0.0]:
+        cache = JudgeResponseCache(path)
+        model = JudgeGPTModel(model="gpt-4o", cache=cache)
+        assert model.generate("prompt") == ("a response", expected_cost)
+        cache.close()
+
+    mock_gpt_generate.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_a_generate_without_cache_calls_the_model(mock_gpt_a_generate):
+    model = JudgeGPTModel(model="gpt-4o")
+
+    assert await model.a_generate("prompt") == (Verdict(verdict="yes"), 0.1)
+    mock_gpt_a_generate.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_a_generate_waits_on_the_rate_limiter(mocker, mock_gpt_a_generate):
+    rate_limiter = JudgeRateLimiter(requests_per_minute=10)
+    limit = mocker.spy(rate_limiter, "limit")
+    model = JudgeGPTModel(model="gpt-4o", rate_limiter=rate_limiter)
+
+    await model.a_generate("prompt")
+
+    limit.assert_called_once_with("prompt")
+
+
+@pytest.mark.asyncio
+async def test_a_generate_cache_hits_skip_the_rate_limiter(
+    tmp_path, mocker, mock_gpt_a_generate
+):
+    path = tmp_path / "cache.sqlite3"
+    first_cache = JudgeResponseCache(path)
+    await JudgeGPTModel(model="gpt-4o", cache=first_cache).a_generate("prompt")
+    first_cache.close()
+
+    rate_limiter = JudgeRateLimiter(requests_per_minute=10)
+    limit = mocker.spy(rate_limiter, "limit")
+    second_cache = JudgeResponseCache(path)
+    model = JudgeGPTModel(model="gpt-4o", cache=second_cache, rate_limiter=rate_limiter)
+
+    await model.a_generate("prompt")
+    second_cache.close()
+
+    limit.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_a_generate_does_not_share_cached_responses_between_servers(
+    cache, mock_gpt_a_generate
+):
+    await JudgeGPTModel(model="gpt-4o", cache=cache).a_generate("prompt")
+    await JudgeGPTModel(
+        model="gpt-4o", base_url="http://127.0.0.1:8000/v1", cache=cache
+    ).a_generate("prompt")
+
+    assert len(cache) == 2
+
+
+class TestLoadModel:
+    def test_reuses_the_client(self):
+        model = JudgeGPTModel(model="gpt-4o")
+        assert model.load_model() is model.load_model()
+
+    @pytest.mark.asyncio
+    async def test_reuses_the_async_client_in_an_event_loop(self):
+        model = JudgeGPTModel(model="gpt-4o")
+        assert model.load_model(async_mode=True) is model.load_model(async_mode=True)
+
+    def test_creates_an_async_client_for_each_event_loop(self):
+        model = JudgeGPTModel(model="gpt-4o")
+
+        async def load_client():
+            return model.load_model(async_mode=True)
+
+        assert asyncio.run(load_client()) is not asyncio.run(load_client())
+
+    def test_limits_the_connection_pool(self, mocker):
+        http_client = mocker.patch(
+            "govuk_chat_evaluation.rag_answers.custom_deepeval.llm_judges."
+            "judge_gpt_model.DefaultHttpxClient",
+            wraps=DefaultHttpxClient,
+        )
+
+        JudgeGPTModel(model="gpt-4o", max_connections=5).load_model()
+
+        assert http_client.call_args.kwargs["limits"] == httpx.Limits(
+            max_connections=5, max_keepalive_connections=5
+        )
+
+
+class TestAGenerateMessages:
+    messages = [
+        {"role": "system", "content": "Static instructions"},
+        {"role": "user", "content": "Test case"},
+    ]
+
+    @pytest.fixture
+    def mock_client(self, mocker):
+        usage = CompletionUsage(
+            prompt_tokens=1000,
+            completion_tokens=100,
+            total_tokens=1100,
+            prompt_tokens_details=PromptTokensDetails(cached_tokens=800),
+        )
+        completion = Mock(usage=usage)
+        completion.choices = [Mock(message=Mock(parsed=Verdict(verdict="yes")))]
+
+        client = Mock()
+        client.beta.chat.completions.parse = AsyncMock(return_value=completion)
+        mocker.patch.object(JudgeGPTModel, "load_model", return_value=client)
+        return client
+
+    @pytest.mark.asyncio
+    async def test_sends_the_messages(self, mock_client):
+        model = JudgeGPTModel(model="gpt-4o")
+
+        output, _ = await model.a_generate_messages(self.messages, schema=Verdict)
+
+        assert output == Verdict(verdict="yes")
+        _, kwargs = mock_client.beta.chat.completions.parse.call_args
+        assert kwargs["messages"] == self.messages
+        assert kwargs["response_format"] is Verdict
+
+    @pytest.mark.asyncio
+    async def test_cost_accounts_for_cached_prompt_tokens(self, mock_client):
+        model = JudgeGPTModel(model="gpt-4o")
+
+        _, cost = await model.a_generate_messages(self.messages, schema=Verdict)
+
+        # 200 uncached and 800 cached prompt tokens, 100 completion tokens
+        assert cost == pytest.approx(200 * 2.5e-06 + 800 * 1.25e-06 + 100 * 1e-05)
+
+    @pytest.mark.asyncio
+    async def test_records_token_usage(self, mock_client):
+        model = JudgeGPTModel(model="gpt-4o")
+
+        await model.a_generate_messages(self.messages, schema=Verdict)
+        await model.a_generate_messages(self.messages, schema=Verdict)
+
+        assert model.token_usage == JudgeTokenUsage(
+            prompt_tokens=2000, cached_prompt_tokens=1600, completion_tokens=200
+        )
+        assert model.token_usage.prompt_cache_hit_rate == 0.8
+
+    @pytest.mark.asyncio
+    async def test_is_cached_as_the_joined_prompt(
+        self, tmp_path, mock_client, mock_gpt_a_generate
+    ):
+        path = tmp_path / "cache.sqlite3"
+        first_cache = JudgeResponseCache(path)
+        await JudgeGPTModel(model="gpt-4o", cache=first_cache).a_generate_messages(
+            self.messages, schema=Verdict
+        )
+        first_cache.close()
+
+        second_cache = JudgeResponseCache(path)
+        model = JudgeGPTModel(model="gpt-4o", cache=second_cache)
+        result = await model.a_generate(
+            "Static instructions\n\nTest case",
+            schema=Verdict,  # type: ignore[arg-type]
+        )
+        second_cache.close()
+
+        assert result == (Verdict(verdict="yes"), 0.0)
+        mock_gpt_a_generate.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_waits_on_the_rate_limiter(self, mocker, mock_client):
+        rate_limiter = JudgeRateLimiter(requests_per_minute=10)
+        limit = mocker.spy(rate_limiter, "limit")
+        model = JudgeGPTModel(model="gpt-4o", rate_limiter=rate_limiter)
+
+        await model.a_generate_messages(self.messages, schema=Verdict)
+
+        limit.assert_called_once_with("Static instructions\n\nTest case")
@@ -0,0 +1,247 @@
+import asyncio
+import time
+
+import pytest
+from deepeval.evaluate.configs import (
+    AsyncConfig,
+    CacheConfig,
+    DisplayConfig,
+    ErrorConfig,
+)
+from deepeval.metrics import AnswerRelevancyMetric, BiasMetric, FaithfulnessMetric
+from deepeval.test_case import LLMTestCase
+
+from govuk_chat_evaluation.rag_answers.custom_deepeval.llm_judges import JudgeGPTModel
+from govuk_chat_evaluation.rag_answers.custom_deepeval.llm_judges.mock_judge_server import (
+    MOCK_TEXT,
+    MockJudgeServer,
+    mock_value,
+)
+from govuk_chat_evaluation.rag_answers.custom_deepeval.metrics.factual_correctness import (
+    FactClassificationBatcher,
+    FactualCorrectnessMetric,
+)
+from govuk_chat_evaluation.rag_answers.custom_deepeval.metrics.factual_correctness.schema import (
+    BatchFactClassificationResult,
+    ClassifiedFacts,
+    FactClassificationResult,
+)
+from govuk_chat_evaluation.rag_answers.data_models import Config, MetricConfig
+from govuk_chat_evaluation.rag_answers.deepeval_evaluate import (
+    run_deepeval_evaluation,
+)
+
+
+@pytest.fixture
+def server():
+    with MockJudgeServer() as server:
+        yield server
+
+
+@pytest.fixture
+def test_case():
+    return LLMTestCase(
+        name="case",
+        input="What noise do pigs make?",
+        actual_output="Pigs oink.",
+        expected_output="Pigs oink.",
+        retrieval_context=["Pigs oink."],
+    )
+
+
+class TestMockValue:
+    def test_is_valid_for_a_pydantic_schema(self):
+        schema = FactClassificationResult.model_json_schema()
+
+        value = mock_value(schema, schema.get("$defs", {}), "prompt")
+
+        assert FactClassificationResult.model_validate(value).classified_facts == (
+            ClassifiedFacts(TP=[MOCK_TEXT], FP=[MOCK_TEXT], FN=[MOCK_TEXT])
+        )
+
+    def test_uses_the_first_enum_value(self):
+        assert mock_value({"enum": ["yes", "no", "idk"]}, {}, "prompt") == "yes"
+
+    def test_skips_null_options(self):
+        schema = {"anyOf": [{"type": "null"}, {"type": "integer"}]}
+
+        assert mock_value(schema, {}, "prompt") == 1
+
+    def test_has_a_result_per_batched_test_case(self):
+        schema = BatchFactClassificationResult.model_json_schema()
+        prompt = "Test Case ID: 1\n\nTest Case ID: 2\n\nTest Case ID: 3"
+
+        value = mock_value(schema, schema.get("$defs", {}), prompt)
+
+        result = BatchFactClassificationResult.model_validate(value)
+        assert [case.case_id for case in result.results] == ["1", "2", "3"]
+
+
+class TestChatCompletion:
+    def test_returns_text_without_a_response_format(self, server):
+        response = server.chat_completion(
+            {"model": "gpt-4o", "messages": [{"role": "user", "content": "Hi"}]}
+        )
+
+        assert response["choices"][0]["message"]["content"] == MOCK_TEXT
+        assert response["model"] == "gpt-4o"
+
+    def test_reports_repeated_system_messages_as_cached(self, server):
+        request = {
+            "messages": [
+                {"role": "system", "content": "Static instructions" * 100},
+                {"role": "user", "content": "Test case"},
+            ]
+        }
+
+        first = server.chat_completion(request)
+        second = server.chat_completion(request)
+
+        assert first["usage"]["prompt_tokens_details"]["cached_tokens"] == 0
+        assert second["usage"]["prompt_tokens_details"]["cached_tokens"] > 0
+
+
+class TestJudgingWithMockJudgeServer:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "metric_class",
+        [
+            FactualCorrectnessMetric,
+            FaithfulnessMetric,
+            AnswerRelevancyMetric,
+            BiasMetric,
+        ],
+    )
+    async def test_metrics_measure_test_cases(self, server, test_case, metric_class):
+        model = JudgeGPTModel(model="gpt-4o", base_url=server.url)
+        metric = metric_class(model=model)
+
+        score = await metric.a_measure(test_case, _show_indicator=False)
+
+        assert 0 <= score <= 1
+        assert metric.evaluation_cost > 0
+        assert server.request_count > 0
+
+    @pytest.mark.asyncio
+    async def test_batched_fact_classification(self, server):
+        model = JudgeGPTModel(model="gpt-4o", base_url=server.url)
+        batcher = FactClassificationBatcher(model, batch_size=3)
+
+        results = await asyncio.gather(
+            *[batcher.classify(f"Answer {i}", f"Truth {i}") for i in range(3)]
+        )
+
+        assert server.request_count == 1
+        assert all(facts is not None for facts, _ in results)
+
+    @pytest.mark.asyncio
+    async def test_prompt_cache_tokens_are_recorded(self, server, test_case):
+        model = JudgeGPTModel(model="gpt-4o", base_url=server.url)
+        metric = FactualCorrectnessMetric(model=model)
+
+        await metric.a_measure(test_case, _show_indicator=False)
+        await metric.a_measure(test_case, _show_indicator=False)
+
+        assert model.token_usage.cached_prompt_tokens > 0
+
+    def test_run_deepeval_evaluation(self, server, monkeypatch, tmp_path):
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.delenv("DEEPEVAL_RESULTS_FOLDER", raising=False)
+        model = JudgeGPTModel(model="gpt-4o", base_url=server.url)
+        cases = [
+            LLMTestCase(
+                name=f"case_{i}",
+                input="Question",
+                actual_output=f"Answer {i}",
+                expected_output="Ideal answer",
+            )
+            for i in range(10)
+        ]
+
+        evaluation_runs = run_deepeval_evaluation(
+            cases=cases,
+            metrics=[FactualCorrectnessMetric(model=model)],
+            n_runs=2,
+            async_config=AsyncConfig(max_concurrent=10, throttle_value=0),
+            display_config=DisplayConfig(show_indicator=False, print_results=False),
+            cache_config=CacheConfig(use_cache=False, write_cache=False),
+            error_config=ErrorConfig(ignore_errors=False),
+        )
+
+        assert server.request_count == 20
+        assert [len(run) for run in evaluation_runs] == [10, 10]
+        assert all(
+            metric_data.score is not None
+            for run in evaluation_runs
+            for result in run
+            for metric_data in result.metrics_data or []
+        )
+
+    def test_batches_fill_between_throttled_test_cases(
+        self, server, monkeypatch, tmp_path, mock_input_data
+    ):
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.delenv("DEEPEVAL_RESULTS_FOLDER", raising=False)
+        config = Config(
+            what="Batching",
+            generate=False,
+            provider=None,
+            input_path=mock_input_data,
+            metrics=[
+                MetricConfig(
+                    **{
+                        "name": "factual_correctness",
+                        "threshold": 0.5,
+                        "model": "gpt-4o",
+                        "base_url": server.url,
+                        "batch_size": 2,
+                    }
+                )
+            ],
+            n_runs=1,
+            throttle_value=1,
+        )
+        cases = [
+            LLMTestCase(
+                name=f"case_{i}",
+                input="Question",
+                actual_output=f"Answer {i}",
+                expected_output="Ideal answer",
+            )
+            for i in range(2)
+        ]
+
+        [run] = run_deepeval_evaluation(
+            cases=cases,
+            metrics=config.metric_instances(),
+            async_config=AsyncConfig(throttle_value=config.throttle_value),
+            display_config=DisplayConfig(show_indicator=False, print_results=False),
+            cache_config=CacheConfig(use_cache=False, write_cache=False),
+            error_config=ErrorConfig(ignore_errors=False),
+        )
+
+        assert server.request_count == 1
+        assert len(run) == 2
+
+
+def test_mock_judge_server_handles_requests_concurrently():
+    latency = 0.2
+    requests = 10
+
+    with MockJudgeServer(latency_seconds=latency) as server:
+        model = JudgeGPTModel(model="gpt-4o", base_url=server.url)
+
+        async def judge_all():
+            await asyncio.gather(
+                *[
+                    model.a_generate_messages([{"role": "user", "content": "Hi"}])
+                    for _ in range(requests)
+                ]
+            )
+
+        start = time.perf_counter()
+        asyncio.run(judge_all())
+        elapsed = time.perf_counter() - start
+
+    assert server.request_count == requests
+    assert elapsed < latency * requests / 2
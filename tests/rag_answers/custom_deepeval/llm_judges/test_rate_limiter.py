@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from govuk_chat_evaluation.rag_answers.custom_deepeval.llm_judges.rate_limiter import (
+    DEFAULT_COMPLETION_TOKENS,
+    JudgeRateLimiter,
+    TokenBucket,
+    estimate_prompt_tokens,
+)
+
+
+def test_estimate_prompt_tokens():
+    assert estimate_prompt_tokens("") == 1
+    assert estimate_prompt_tokens("a" * 400) == 101
+
+
+class TestTokenBucket:
+    @pytest.mark.asyncio
+    async def test_acquire_within_capacity_does_not_wait(self, mocker):
+        sleep = mocker.patch("asyncio.sleep")
+        bucket = TokenBucket(per_minute=60)
+
+        for _ in range(60):
+            await bucket.acquire()
+
+        sleep.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_acquire_beyond_capacity_waits_for_refill(self, mocker):
+        clock = mocker.patch("time.monotonic", return_value=0.0)
+
+        async def advance_clock(seconds):
+            clock.return_value += seconds
+
+        sleep = mocker.patch("asyncio.sleep", side_effect=advance_clock)
+        bucket = TokenBucket(per_minute=60)
+
+        await bucket.acquire(60)
+        await bucket.acquire(2)
+
+        sleep.assert_awaited_once_with(pytest.approx(2.0))
+
+    @pytest.mark.asyncio
+    async def test_acquire_more_than_capacity_is_clamped(self, mocker):
+        sleep = mocker.patch("asyncio.sleep")
+        bucket = TokenBucket(per_minute=10)
+
+        await bucket.acquire(1000)
+
+        sleep.assert_not_called()
+
+
+class TestJudgeRateLimiter:
+    @pytest.mark.asyncio
+    async def test_limits_concurrent_requests(self):
+        rate_limiter = JudgeRateLimiter(max_concurrent=2)
+        active = 0
+        max_active = 0
+
+        async def request():
+            nonlocal active, max_active
+            async with rate_limiter.limit("prompt"):
+                active += 1
+                max_active = max(max_active, active)
+                await asyncio.sleep(0.01)
+                active -= 1
+
+        await asyncio.gather(*(request() for _ in range(10)))
+
+        assert max_active == 2
+
+    @pytest.mark.asyncio
+    async def test_consumes_request_and_token_budgets(self, mocker):
+        rate_limiter = JudgeRateLimiter(requests_per_minute=100, tokens_per_minute=1000)
+        requests = mocker.spy(rate_limiter._requests, "acquire")
+        tokens = mocker.spy(rate_limiter._tokens, "acquire")
+
+        async with rate_limiter.limit("a" * 400):
+            pass
+
+        requests.assert_called_once_with()
+        tokens.assert_called_once_with(101 + DEFAULT_COMPLETION_TOKENS)
+
+    @pytest.mark.asyncio
+    async def test_charges_completion_tokens_allowance(self, mocker):
+        rate_limiter = JudgeRateLimiter(tokens_per_minute=1000, completion_tokens=50)
+        tokens = mocker.spy(rate_limiter._tokens, "acquire")
+
+        async with rate_limiter.limit("a" * 400):
+            pass
+
+        tokens.assert_called_once_with(151)
+
+    @pytest.mark.asyncio
+    async def test_without_limits_does_not_wait(self):
+        async with JudgeRateLimiter().limit("prompt"):
+            pass
@@ -0,0 +1,117 @@
+import pytest
+from pydantic import BaseModel
+
+from govuk_chat_evaluation.rag_answers.custom_deepeval.llm_judges import (
+    JudgeResponseCache,
+)
+from govuk_chat_evaluation.rag_answers.custom_deepeval.llm_judges.response_cache import (
+    judged_test_case,
+)
+
+
+class Verdict(BaseModel):
+    verdict: str
+
+
+class OtherVerdict(BaseModel):
+    verdict: int
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = JudgeResponseCache(tmp_path / "cache.sqlite3")
+    yield cache
+    cache.close()
+
+
+class TestKeyFor:
+    def test_differs_by_model_temperature_prompt_and_schema(self, cache):
+        keys = {
+            cache.key_for("gpt-4o", 0.0, "prompt", Verdict),
+            cache.key_for("gpt-4o-mini", 0.0, "prompt", Verdict),
+            cache.key_for("gpt-4o", 0.5, "prompt", Verdict),
+            cache.key_for("gpt-4o", 0.0, "other prompt", Verdict),
+            cache.key_for("gpt-4o", 0.0, "prompt", OtherVerdict),
+            cache.key_for("gpt-4o", 0.0, "prompt"),
+        }
+        assert len(keys) == 6
+
+    def test_repeated_requests_get_distinct_keys(self, cache):
+        first = cache.key_for("gpt-4o", 0.0, "prompt")
+        second = cache.key_for("gpt-4o", 0.0, "prompt")
+        assert first != second
+
+    def test_differs_by_judged_test_case(self, cache):
+        keys = set()
+        for name in ["case::run-0", "case::run-1", None]:
+            with judged_test_case(name):
+                keys.add(cache.key_for("gpt-4o", 0.0, "prompt"))
+        assert len(keys) == 3
+
+    def test_keys_are_stable_across_instances(self, tmp_path):
+        caches = [JudgeResponseCache(tmp_path / f"{i}.sqlite3") for i in range(2)]
+        keys = [
+            [cache.key_for("gpt-4o", 0.0, "prompt") for _ in range(2)]
+            for cache in caches
+        ]
+        assert keys[0] == keys[1]
+
+
+class TestGetAndSet:
+    def test_returns_none_and_records_miss(self, cache):
+        assert cache.get("missing") is None
+        assert cache.stats.misses == 1
+        assert cache.stats.hits == 0
+
+    def test_returns_stored_response_and_records_hit(self, cache):
+        cache.set("key", "response")
+        assert cache.get("key") == "response"
+        assert cache.stats.hits == 1
+
+    def test_persists_to_disk(self, tmp_path):
+        path = tmp_path / "cache.sqlite3"
+        cache = JudgeResponseCache(path)
+        cache.set("key", "response")
+        cache.close()
+
+        reopened = JudgeResponseCache(path)
+        assert reopened.get("key") == "response"
+        assert len(reopened) == 1
+        reopened.close()
+
+    def test_evicts_least_recently_used_beyond_max_entries(self, tmp_path):
+        cache = JudgeResponseCache(tmp_path / "cache.sqlite3", max_entries=2)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        cache.get("a")
+        cache.set("c", "3")
+
+        assert len(cache) == 2
+        assert cache.stats.evictions == 1
+        assert cache.get("b") is None
+        assert cache.get("a") == "1"
+        assert cache.get("c") == "3"
+        cache.close()
+
+    def test_counts_entries_other_processes_added_before_evicting(self, tmp_path):
+        path = tmp_path / "cache.sqlite3"
+        cache = JudgeResponseCache(path, max_entries=2)
+        other_cache = JudgeResponseCache(path, max_entries=2)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        other_cache.set("c", "3")
+        cache.set("d", "4")
+
+        assert len(cache) == 2
+        assert cache.stats.evictions == 2
+        other_cache.close()
+        cache.close()
+
+
+def test_stats_hit_rate(cache):
+    cache.set("key", "response")
+    cache.get("key")
+    cache.get("missing")
+
+    assert cache.stats.hit_rate == 0.5
+    assert "1 hits, 1 misses" in str(cache.stats)
@@ -0,0 +1,177 @@
+import json
+
+import httpx
+import pytest
+from deepeval.metrics import BiasMetric, FaithfulnessMetric
+from deepeval.test_case import LLMTestCase
+from pydantic import BaseModel, ValidationError
+
+from govuk_chat_evaluation.rag_answers.custom_deepeval.llm_judges import (
+    JudgeCall,
+    JudgeGPTModel,
+    JudgeTelemetry,
+)
+from govuk_chat_evaluation.rag_answers.custom_deepeval.llm_judges.mock_judge_server import (
+    MockJudgeServer,
+)
+from govuk_chat_evaluation.rag_answers.custom_deepeval.llm_judges.telemetry import (
+    http_event_hooks,
+    judge_telemetry_summary,
+    judged_metric,
+    with_judge_telemetry,
+    write_judge_telemetry,
+)
+
+
+class Verdict(BaseModel):
+    verdict: str
+
+
+request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+
+
+class TestJudgeTelemetry:
+    def test_records_calls_for_the_metric_being_measured(self):
+        telemetry = JudgeTelemetry()
+
+        with judged_metric("Faithfulness"):
+            with telemetry.record("gpt-4o"):
+                pass
+        with telemetry.record("gpt-4o"):
+            pass
+
+        assert [(call.metric, call.model) for call in telemetry.calls] == [
+            ("Faithfulness", "gpt-4o"),
+            (None, "gpt-4o"),
+        ]
+        assert all(call.latency_seconds >= 0 for call in telemetry.calls)
+
+    def test_records_responses_that_cannot_be_parsed(self):
+        telemetry = JudgeTelemetry()
+
+        with pytest.raises(ValidationError):
+            with telemetry.record("gpt-4o"):
+                Verdict.model_validate({"verdict": None})
+
+        assert telemetry.calls[0].parse_failure
+        assert telemetry.calls[0].error == "ValidationError"
+
+    def test_records_errors(self):
+        telemetry = JudgeTelemetry()
+
+        with pytest.raises(TimeoutError):
+            with telemetry.record("gpt-4o"):
+                raise TimeoutError
+
+        assert not telemetry.calls[0].parse_failure
+        assert telemetry.calls[0].error == "TimeoutError"
+
+    def test_http_hooks_count_retries_and_token_usage(self):
+        telemetry = JudgeTelemetry()
+        hooks = http_event_hooks(async_mode=False)
+        response = httpx.Response(
+            200,
+            json={"usage": {"prompt_tokens": 1000, "completion_tokens": 100}},
+            request=request,
+        )
+
+        with telemetry.record("gpt-4o"):
+            for _ in range(3):
+                hooks["request"][0](request)
+            hooks["response"][0](httpx.Response(429, request=request))
+            hooks["response"][0](response)
+
+        assert telemetry.calls[0].retries == 2
+        assert telemetry.calls[0].prompt_tokens == 1000
+        assert telemetry.calls[0].completion_tokens == 100
+
+    def test_http_hooks_ignore_requests_that_are_not_recorded(self):
+        hooks = http_event_hooks(async_mode=False)
+
+        hooks["request"][0](request)
+        hooks["response"][0](httpx.Response(200, json={}, request=request))
+
+
+class TestWithJudgeTelemetry:
+    def test_is_a_subclass_of_the_metric_class(self):
+        metric_class = with_judge_telemetry(FaithfulnessMetric)
+
+        assert issubclass(metric_class, FaithfulnessMetric)
+        assert with_judge_telemetry(FaithfulnessMetric) is metric_class
+
+    @pytest.mark.asyncio
+    async def test_attributes_judge_requests_to_the_metric(self):
+        test_case = LLMTestCase(
+            input="What noise do pigs make?",
+            actual_output="Pigs oink.",
+            retrieval_context=["Pigs oink."],
+        )
+        with MockJudgeServer() as server:
+            model = JudgeGPTModel(model="gpt-4o", base_url=server.url)
+            metrics = [
+                with_judge_telemetry(FaithfulnessMetric)(model=model),
+                with_judge_telemetry(BiasMetric)(model=model),
+            ]
+            for metric in metrics:
+                await metric.a_measure(test_case, _show_indicator=False)
+
+        calls = model.telemetry.calls
+        assert len(calls) == server.request_count
+        assert {call.metric for call in calls} == {"Faithfulness", "Bias"}
+        assert all(call.model == "gpt-4o" for call in calls)
+        assert all(call.prompt_tokens > 0 and call.retries == 0 for call in calls)
+
+
+def test_judge_telemetry_summary(tmp_path):
+    path = tmp_path / "judge_telemetry.jsonl"
+    write_judge_telemetry(
+        path,
+        [
+            JudgeCall(
+                metric="Bias",
+                model="gpt-4o",
+                latency_seconds=latency,
+                prompt_tokens=100,
+                completion_tokens=10,
+                retries=1,
+            )
+            for latency in [1.0, 2.0, 3.0]
+        ]
+        + [
+            JudgeCall(
+                metric="Bias",
+                model="gpt-4o-mini",
+                parse_failure=True,
+                error="ValidationError",
+            )
+        ],
+    )
+
+    summary = judge_telemetry_summary(path)
+
+    assert json.loads(path.read_text().splitlines()[0]) == {
+        "metric": "Bias",
+        "model": "gpt-4o",
+        "latency_seconds": 1.0,
+        "prompt_tokens": 100,
+        "completion_tokens": 10,
+        "retries": 1,
+        "parse_failure": False,
+        "error": None,
+    }
+    assert summary.loc[("Bias", "gpt-4o")].to_dict() == pytest.approx(
+        {
+            "requests": 3,
+            "latency_p50": 2.0,
+            "latency_p95": 2.9,
+            "prompt_tokens_p50": 100,
+            "prompt_tokens_p95": 100,
+            "completion_tokens_p50": 10,
+            "completion_tokens_p95": 10,
+            "retries": 3,
+            "parse_failures": 0,
+            "errors": 0,
+        }
+    )
+    assert summary.loc[("Bias", "gpt-4o-mini"), "parse_failures"] == 1
+    assert summary.loc[("Bias", "gpt-4o-mini"), "errors"] == 1
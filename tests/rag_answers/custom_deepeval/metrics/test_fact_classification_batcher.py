@@ -0,0 +1,123 @@
+import asyncio
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from deepeval.models import GPTModel
+
+from govuk_chat_evaluation.rag_answers.custom_deepeval.metrics.factual_correctness import (
+    FactClassificationBatcher,
+)
+from govuk_chat_evaluation.rag_answers.custom_deepeval.metrics.factual_correctness.schema import (
+    BatchFactClassificationResult,
+    CaseClassifiedFacts,
+    ClassifiedFacts,
+)
+from govuk_chat_evaluation.rag_answers.custom_deepeval.metrics.factual_correctness.template import (
+    FactualCorrectnessTemplate,
+)
+
+
+def batch_result(*case_ids: str) -> BatchFactClassificationResult:
+    return BatchFactClassificationResult(
+        results=[
+            CaseClassifiedFacts(
+                case_id=case_id,
+                classified_facts=ClassifiedFacts(TP=[f"fact {case_id}"]),
+            )
+            for case_id in case_ids
+        ]
+    )
+
+
+@pytest.fixture
+def mock_model():
+    mock = Mock(spec=GPTModel)
+    mock.a_generate = AsyncMock(return_value=(batch_result("1", "2"), 0.4))
+    return mock
+
+
+def test_classify_facts_batch_includes_every_case():
+    prompt = FactualCorrectnessTemplate.classify_facts_batch(
+        [("1", "Answer one", "Truth one"), ("2", "Answer two", "Truth two")]
+    )
+
+    assert "Test Case ID: 1" in prompt
+    assert "Test Case ID: 2" in prompt
+    assert "Answer two" in prompt
+    assert "Truth one" in prompt
+    assert prompt.count("Here are three examples.") == 1
+
+
+class TestFactClassificationBatcher:
+    @pytest.mark.asyncio
+    async def test_sends_a_full_batch_in_one_request(self, mock_model):
+        batcher = FactClassificationBatcher(mock_model, batch_size=2)
+
+        results = await asyncio.gather(
+            batcher.classify("Answer one", "Truth one"),
+            batcher.classify("Answer two", "Truth two"),
+        )
+
+        mock_model.a_generate.assert_awaited_once()
+        _, kwargs = mock_model.a_generate.call_args
+        assert kwargs["schema"] is BatchFactClassificationResult
+        assert results == [
+            (ClassifiedFacts(TP=["fact 1"]), pytest.approx(0.2)),
+            (ClassifiedFacts(TP=["fact 2"]), pytest.approx(0.2)),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_sends_a_partial_batch_after_waiting(self, mock_model):
+        mock_model.a_generate.return_value = (batch_result("1"), 0.1)
+        batcher = FactClassificationBatcher(
+            mock_model, batch_size=5, max_wait_seconds=0.01
+        )
+
+        facts, cost = await batcher.classify("Answer", "Truth")
+
+        mock_model.a_generate.assert_awaited_once()
+        assert facts == ClassifiedFacts(TP=["fact 1"])
+        assert cost == pytest.approx(0.1)
+
+    @pytest.mark.asyncio
+    async def test_missing_cases_have_no_classified_facts(self, mock_model):
+        mock_model.a_generate.return_value = (batch_result("2"), 0.4)
+        batcher = FactClassificationBatcher(mock_model, batch_size=2)
+
+        [(first_facts, _), (second_facts, _)] = await asyncio.gather(
+            batcher.classify("Answer one", "Truth one"),
+            batcher.classify("Answer two", "Truth two"),
+        )
+
+        assert first_facts is None
+        assert second_facts == ClassifiedFacts(TP=["fact 2"])
+
+    @pytest.mark.asyncio
+    async def test_empty_classified_facts_are_treated_as_missing(self, mock_model):
+        mock_model.a_generate.return_value = (
+            BatchFactClassificationResult(
+                results=[
+                    CaseClassifiedFacts(case_id="1", classified_facts=ClassifiedFacts())
+                ]
+            ),
+            0.1,
+        )
+        batcher = FactClassificationBatcher(
+            mock_model, batch_size=1, max_wait_seconds=0.01
+        )
+
+        facts, _ = await batcher.classify("Answer", "Truth")
+
+        assert facts is None
+
+    @pytest.mark.asyncio
+    async def test_failed_request_has_no_classified_facts(self, mock_model):
+        mock_model.a_generate.side_effect = ValueError("Malformed JSON")
+        batcher = FactClassificationBatcher(mock_model, batch_size=2)
+
+        results = await asyncio.gather(
+            batcher.classify("Answer one", "Truth one"),
+            batcher.classify("Answer two", "Truth two"),
+        )
+
+        assert results == [(None, 0.0), (None, 0.0)]
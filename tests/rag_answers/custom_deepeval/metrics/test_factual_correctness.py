@@ -1,21 +1,30 @@
+import asyncio
 import pytest
 import json
 import math
 import logging
+import random
+import re
 
 from unittest.mock import Mock, AsyncMock, patch
 from deepeval.test_case import LLMTestCase
 from deepeval.models import GPTModel, DeepEvalBaseLLM
 from deepeval.errors import MissingTestCaseParamsError
 
+from govuk_chat_evaluation.rag_answers.custom_deepeval.llm_judges import JudgeGPTModel
 from govuk_chat_evaluation.rag_answers.custom_deepeval.metrics.factual_correctness import (
+    FactClassificationBatcher,
     FactualCorrectnessMetric,
+    FactualCorrectnessResult,
 )
 
 from govuk_chat_evaluation.rag_answers.custom_deepeval.metrics.factual_correctness.schema import (
     ClassifiedFacts,
     FactClassificationResult,
 )
+from govuk_chat_evaluation.rag_answers.custom_deepeval.metrics.factual_correctness.template import (
+    FactualCorrectnessTemplate,
+)
 
 
 @pytest.fixture
@@ -575,3 +584,162 @@ class TestFactualCorrectness:
         await metric.a_measure(test_case)
 
         assert metric.is_successful() is expected_success
+
+    class TestAEvaluate:
+        @pytest.mark.asyncio
+        async def test_returns_the_result_without_changing_the_metric(
+            self, mock_native_model: Mock, test_case: LLMTestCase
+        ):
+            metric = FactualCorrectnessMetric(model=mock_native_model)
+
+            result = await metric.a_evaluate(test_case)
+
+            assert result == FactualCorrectnessResult(
+                confusion_matrix=ClassifiedFacts(TP=["fact1"], FP=["fact2"], FN=[]),
+                score=0.5,
+                reason=(
+                    "{\"true_positive_statements\": ['fact1'], "
+                    "\"false_positive_statements\": ['fact2']}"
+                ),
+                success=True,
+                evaluation_cost=0.1,
+            )
+            assert metric.score is None
+            assert metric.confusion_matrix == ClassifiedFacts()
+            assert metric.evaluation_cost == 0
+
+        @pytest.mark.asyncio
+        async def test_returns_an_error_when_no_facts_are_classified(
+            self, mock_native_model: Mock, test_case: LLMTestCase
+        ):
+            mock_native_model.a_generate = AsyncMock(
+                return_value=(
+                    FactClassificationResult(classified_facts=ClassifiedFacts()),
+                    0.1,
+                )
+            )
+            metric = FactualCorrectnessMetric(model=mock_native_model)
+
+            result = await metric.a_evaluate(test_case)
+
+            assert math.isnan(result.score)
+            assert result.error is not None
+            assert metric.error is None
+
+        @pytest.mark.asyncio
+        async def test_one_metric_evaluates_overlapping_test_cases(self):
+            async def a_generate(prompt, schema=None):
+                true_positives = int(re.findall(r"answer-(\d+)", prompt)[0])
+                await asyncio.sleep(random.uniform(0, 0.01))
+                return (
+                    FactClassificationResult(
+                        classified_facts=ClassifiedFacts(
+                            TP=[f"fact{i}" for i in range(true_positives)],
+                            FP=["wrong"],
+                        )
+                    ),
+                    0.01,
+                )
+
+            model = Mock(spec=GPTModel)
+            model.get_model_name.return_value = "gpt-4o"
+            model.a_generate = AsyncMock(side_effect=a_generate)
+            metric = FactualCorrectnessMetric(model=model, threshold=0.75)
+            test_cases = [
+                LLMTestCase(
+                    input=f"Input {i}",
+                    actual_output=f"answer-{i % 10}",
+                    expected_output="Expected",
+                )
+                for i in range(300)
+            ]
+
+            scores, results = await asyncio.gather(
+                asyncio.gather(
+                    *(
+                        metric.a_measure(case, _show_indicator=False)
+                        for case in test_cases
+                    )
+                ),
+                asyncio.gather(*(metric.a_evaluate(case) for case in test_cases)),
+            )
+
+            for i, (score, result) in enumerate(zip(scores, results)):
+                true_positives = i % 10
+                expected_score = true_positives / (true_positives + 1)
+                assert score == pytest.approx(expected_score)
+                assert result.score == pytest.approx(expected_score)
+                assert len(result.confusion_matrix.TP) == true_positives
+                assert result.success is (expected_score >= 0.75)
+                assert result.evaluation_cost == pytest.approx(0.01)
+
+    class TestBatching:
+        @pytest.mark.asyncio
+        async def test_uses_batched_classification(
+            self, mock_native_model: Mock, test_case: LLMTestCase
+        ):
+            batcher = Mock(spec=FactClassificationBatcher)
+            batcher.classify = AsyncMock(
+                return_value=(ClassifiedFacts(TP=["fact1"], FP=["fact2"]), 0.05)
+            )
+            metric = FactualCorrectnessMetric(model=mock_native_model, batcher=batcher)
+
+            score = await metric.a_measure(test_case)
+
+            batcher.classify.assert_awaited_once_with("Actual", "Expected")
+            mock_native_model.a_generate.assert_not_called()
+            assert score == 0.5
+            assert metric.evaluation_cost == pytest.approx(0.05)
+
+        @pytest.mark.asyncio
+        async def test_falls_back_to_single_case_classification(
+            self, mock_native_model: Mock, test_case: LLMTestCase
+        ):
+            batcher = Mock(spec=FactClassificationBatcher)
+            batcher.classify = AsyncMock(return_value=(None, 0.05))
+            metric = FactualCorrectnessMetric(model=mock_native_model, batcher=batcher)
+
+            score = await metric.a_measure(test_case)
+
+            mock_native_model.a_generate.assert_awaited_once()
+            assert score == 0.5
+            assert metric.evaluation_cost == pytest.approx(0.15)
+
+    class TestJudgeMessages:
+        def test_classify_facts_messages_have_a_static_system_message(self):
+            first = FactualCorrectnessTemplate.classify_facts_messages("A1", "G1")
+            second = FactualCorrectnessTemplate.classify_facts_messages("A2", "G2")
+
+            assert [message["role"] for message in first] == ["system", "user"]
+            assert first[0] == second[0]
+            assert "A1" in first[1]["content"]
+            assert "G1" in first[1]["content"]
+            assert FactualCorrectnessTemplate.classify_facts("A1", "G1") == (
+                f"{first[0]['content']}\n\n{first[1]['content']}"
+            )
+
+        @pytest.mark.asyncio
+        async def test_sends_messages_to_a_judge_gpt_model(
+            self,
+            mocker,
+            test_case: LLMTestCase,
+            fact_classification_result: FactClassificationResult,
+        ):
+            model = JudgeGPTModel(model="gpt-4o")
+            a_generate_messages = mocker.patch.object(
+                model,
+                "a_generate_messages",
+                AsyncMock(return_value=(fact_classification_result, 0.1)),
+            )
+            metric = FactualCorrectnessMetric(model=model)
+
+            score = await metric.a_measure(test_case)
+
+            a_generate_messages.assert_awaited_once_with(
+                FactualCorrectnessTemplate.classify_facts_messages(
+                    answer="Actual", ground_truth="Expected"
+                ),
+                schema=FactClassificationResult,
+            )
+            assert score == 0.5
+            assert metric.evaluation_cost == pytest.approx(0.1)
@@ -0,0 +1,70 @@
+import math
+
+import pytest
+from deepeval.evaluate.types import TestResult as DeepevalTestResult
+from deepeval.test_case import LLMTestCase
+from deepeval.test_run import MetricData
+
+from govuk_chat_evaluation.rag_answers.adaptive_runs import (
+    RunOutputsByCase,
+    has_converged,
+    standard_error,
+)
+from govuk_chat_evaluation.rag_answers.data_models import RunMetricOutput
+
+
+def deepeval_result(name: str, score: float) -> DeepevalTestResult:
+    return DeepevalTestResult(
+        name=name,
+        success=True,
+        conversational=False,
+        metrics_data=[
+            MetricData(name="faithfulness", threshold=0.5, score=score, success=True),  # pyright: ignore[reportCallIssue]
+        ],
+    )
+
+
+def test_standard_error():
+    assert standard_error([1.0, 1.0, 1.0]) == 0.0
+    assert standard_error([0.0, 1.0]) == pytest.approx(0.5)
+    assert standard_error([1.0]) == math.inf
+
+
+class TestHasConverged:
+    def test_when_every_metric_is_within_the_threshold(self):
+        outputs = [
+            RunMetricOutput(run=run, metric=metric, score=1.0)
+            for run in range(2)
+            for metric in ["faithfulness", "bias"]
+        ]
+        assert has_converged(outputs, threshold=0.1)
+
+    def test_not_when_a_metric_is_above_the_threshold(self):
+        outputs = [
+            RunMetricOutput(run=0, metric="faithfulness", score=1.0),
+            RunMetricOutput(run=1, metric="faithfulness", score=1.0),
+            RunMetricOutput(run=0, metric="bias", score=0.0),
+            RunMetricOutput(run=1, metric="bias", score=1.0),
+        ]
+        assert not has_converged(outputs, threshold=0.1)
+
+    def test_not_with_a_single_score(self):
+        outputs = [RunMetricOutput(run=0, metric="faithfulness", score=1.0)]
+        assert not has_converged(outputs, threshold=0.1)
+
+
+def test_run_outputs_by_case_unconverged_cases():
+    stable = LLMTestCase(input="a", actual_output="a", name="stable")
+    noisy = LLMTestCase(input="b", actual_output="b", name="noisy")
+    outputs = RunOutputsByCase()
+
+    outputs.add(
+        [
+            [deepeval_result("stable", 1.0), deepeval_result("noisy", 0.0)],
+            [deepeval_result("stable", 1.0), deepeval_result("noisy", 1.0)],
+        ]
+    )
+    assert outputs.unconverged_cases([stable, noisy], threshold=0.1) == [noisy]
+
+    outputs.add([[deepeval_result("noisy", 1.0)]] * 20, first_run=2)
+    assert outputs.unconverged_cases([stable, noisy], threshold=0.1) == []
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from govuk_chat_evaluation.rag_answers import bootstrap
+from govuk_chat_evaluation.rag_answers.bootstrap import (
+    hierarchical_bootstrap_interval,
+)
+
+nan = np.nan
+
+
+@pytest.fixture
+def run_scores():
+    scores = np.random.default_rng(1).random((200, 3))
+    scores[::4, 1:] = nan
+    return scores
+
+
+def test_interval_contains_the_mean_of_the_input_means(run_scores):
+    lower, upper = hierarchical_bootstrap_interval(run_scores)
+
+    assert lower < np.nanmean(run_scores, axis=1).mean() < upper
+
+
+def test_interval_is_reproducible(run_scores):
+    assert hierarchical_bootstrap_interval(
+        run_scores
+    ) == hierarchical_bootstrap_interval(run_scores)
+
+
+def test_interval_narrows_with_more_inputs():
+    scores = np.random.default_rng(1).random((1000, 2))
+
+    few_lower, few_upper = hierarchical_bootstrap_interval(scores[:50])
+    many_lower, many_upper = hierarchical_bootstrap_interval(scores)
+
+    assert many_upper - many_lower < few_upper - few_lower
+
+
+def test_resamples_the_runs_of_each_input():
+    # with one input, only resampling its runs varies the mean
+    lower, upper = hierarchical_bootstrap_interval(np.array([[0.0, 1.0]]))
+
+    assert (lower, upper) == (0.0, 1.0)
+
+
+def test_constant_scores_have_no_width():
+    assert hierarchical_bootstrap_interval(np.full((10, 3), 0.5)) == pytest.approx(
+        (0.5, 0.5)
+    )
+
+
+def test_ignores_inputs_without_scores():
+    assert hierarchical_bootstrap_interval(
+        np.array([[1.0, 1.0], [nan, nan]])
+    ) == pytest.approx((1.0, 1.0))
+
+
+def test_without_scores_is_nan():
+    lower, upper = hierarchical_bootstrap_interval(np.full((2, 2), nan))
+
+    assert np.isnan(lower) and np.isnan(upper)
+
+
+def test_resampling_runs_one_by_one_matches_enumerated_resamples(
+    run_scores, monkeypatch
+):
+    enumerated = hierarchical_bootstrap_interval(run_scores)
+    monkeypatch.setattr(bootstrap, "MAX_ENUMERATED_RUNS", 0)
+
+    assert hierarchical_bootstrap_interval(run_scores) == pytest.approx(
+        enumerated, abs=0.01
+    )
+
+
+def test_run_resamples():
+    compositions, composition_of_sequence = bootstrap._run_resamples(2)
+
+    assert compositions.tolist() == [[0, 2], [1, 1], [2, 0]]
+    # the sequences (0, 0), (0, 1), (1, 0) and (1, 1)
+    assert composition_of_sequence.tolist() == [2, 1, 1, 0]
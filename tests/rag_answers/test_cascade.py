@@ -0,0 +1,192 @@
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+from deepeval.metrics import BaseMetric
+
+from govuk_chat_evaluation.rag_answers.cascade import (
+    apply_escalations,
+    needs_escalation,
+    plan_escalations,
+)
+from govuk_chat_evaluation.rag_answers.data_models import (
+    EvaluationResult,
+    JudgeCascadeConfig,
+    LLMJudgeModel,
+    MetricConfig,
+    RunMetricOutput,
+)
+from govuk_chat_evaluation.rag_answers.results_table import ResultsTable
+
+cascade = JudgeCascadeConfig(model=LLMJudgeModel.GPT_4O)
+
+
+def outputs(*scores: float, threshold: float = 0.5) -> list[RunMetricOutput]:
+    return [
+        RunMetricOutput(
+            run=run, metric="Faithfulness", score=score, success=score >= threshold
+        )
+        for run, score in enumerate(scores)
+    ]
+
+
+def results_table(*evaluation_results: EvaluationResult) -> ResultsTable:
+    return ResultsTable.from_evaluation_results(list(evaluation_results))
+
+
+def needs_escalation_of(
+    outputs: list[RunMetricOutput], cascade: JudgeCascadeConfig = cascade
+) -> bool:
+    result = evaluation_result("case")
+    result.run_metric_outputs = outputs
+    return bool(
+        needs_escalation(results_table(result), "Faithfulness", 0.5, cascade)[0]
+    )
+
+
+def evaluation_result(name: str, *scores: float) -> EvaluationResult:
+    return EvaluationResult(
+        name=name,
+        input=name,
+        actual_output="answer",
+        expected_output="expected",
+        retrieval_context=[],
+        run_metric_outputs=outputs(*scores)
+        + [RunMetricOutput(run=0, metric="Bias", score=0.0)],
+    )
+
+
+@pytest.fixture
+def metric_configs():
+    return [
+        MetricConfig(
+            name="faithfulness",  # type: ignore[arg-type]
+            threshold=0.5,
+            model="gpt-4o-mini",  # type: ignore[call-arg]
+            cascade=cascade,
+        ),
+        MetricConfig(
+            name="bias",  # type: ignore[arg-type]
+            threshold=0.5,
+            model="gpt-4o-mini",  # type: ignore[call-arg]
+        ),
+    ]
+
+
+@pytest.fixture
+def metrics():
+    faithfulness = MagicMock(spec=BaseMetric)
+    faithfulness.__name__ = "Faithfulness"
+    bias = MagicMock(spec=BaseMetric)
+    bias.__name__ = "Bias"
+    return [faithfulness, bias]
+
+
+class TestNeedsEscalation:
+    def test_clear_cut_scores_are_not_escalated(self):
+        assert not needs_escalation_of(outputs(1.0, 1.0))
+        assert not needs_escalation_of(outputs(0.0, 0.0))
+
+    def test_scores_near_the_threshold_are_escalated(self):
+        assert needs_escalation_of(outputs(0.55, 0.6))
+
+    def test_runs_that_disagree_are_escalated(self):
+        assert needs_escalation_of(outputs(1.0, 0.0, 1.0))
+        assert not needs_escalation_of(
+            outputs(1.0, 0.0, 1.0),
+            cascade.model_copy(update={"escalate_on_disagreement": False}),
+        )
+
+    def test_errored_runs_are_not_escalated(self):
+        assert not needs_escalation_of([])
+        assert not needs_escalation_of(
+            [RunMetricOutput(run=0, metric="Faithfulness", score=None, error="Timeout")]
+        )
+
+    def test_is_decided_for_each_test_case(self):
+        results = results_table(
+            evaluation_result("clear", 1.0, 1.0),
+            evaluation_result("uncertain", 0.6, 0.5),
+            evaluation_result("unjudged"),
+        )
+
+        assert needs_escalation(results, "Faithfulness", 0.5, cascade).tolist() == [
+            False,
+            True,
+            False,
+        ]
+
+
+def test_plan_escalations(metric_configs, metrics):
+    results = results_table(
+        evaluation_result("clear", 1.0, 1.0),
+        evaluation_result("uncertain", 0.6, 0.5),
+    )
+
+    assert plan_escalations(results, metric_configs, metrics) == {0: ["uncertain"]}
+
+
+def test_apply_escalations(metric_configs, metrics):
+    results = results_table(
+        evaluation_result("clear", 1.0, 1.0),
+        evaluation_result("uncertain", 0.6, 0.5),
+    )
+    escalated = evaluation_result("uncertain", 0.0, 0.0)
+    escalated.run_metric_outputs = outputs(0.0, 0.0)
+
+    table, report = apply_escalations(
+        results, results_table(escalated), metric_configs, metrics
+    )
+    results = table.evaluation_results
+
+    assert results[0].run_metric_outputs == outputs(1.0, 1.0) + [
+        RunMetricOutput(run=0, metric="Bias", score=0.0)
+    ]
+    assert results[1].run_metric_outputs == [
+        RunMetricOutput(run=0, metric="Bias", score=0.0)
+    ] + outputs(0.0, 0.0)
+    assert report.replace({np.nan: None}).to_dict("records") == [
+        {
+            "name": "clear",
+            "metric": "Faithfulness",
+            "model": "gpt-4o-mini",
+            "score": 1.0,
+            "escalated": False,
+            "escalation_model": "gpt-4o",
+            "escalation_score": None,
+        },
+        {
+            "name": "uncertain",
+            "metric": "Faithfulness",
+            "model": "gpt-4o-mini",
+            "score": 0.55,
+            "escalated": True,
+            "escalation_model": "gpt-4o",
+            "escalation_score": 0.0,
+        },
+    ]
+
+
+def test_apply_escalations_leaves_out_test_cases_that_were_not_judged(
+    metric_configs, metrics, caplog
+):
+    caplog.set_level("INFO")
+    results = results_table(
+        evaluation_result("clear", 1.0, 1.0),
+        evaluation_result("uncertain", 0.6, 0.5),
+        # pre-screened, so it only has outputs of the other metrics
+        evaluation_result("prescreened"),
+    )
+    escalated = evaluation_result("uncertain", 0.0, 0.0)
+    escalated.run_metric_outputs = outputs(0.0, 0.0)
+
+    table, report = apply_escalations(
+        results, results_table(escalated), metric_configs, metrics
+    )
+    results = table.evaluation_results
+
+    assert report["name"].tolist() == ["clear", "uncertain"]
+    assert "Judge cascade Faithfulness: 50.0% of test cases escalated" in caplog.text
+    assert results[2].run_metric_outputs == [
+        RunMetricOutput(run=0, metric="Bias", score=0.0)
+    ]
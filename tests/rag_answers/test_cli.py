@@ -73,3 +73,97 @@ def test_main_doesnt_generate_results(mock_config_file, mock_data_generation):
 
     assert result.exit_code == 0, result.output
     mock_data_generation.assert_not_called()
+
+
+def test_main_resumes_an_interrupted_evaluation(
+    mock_project_root, mock_config_file, mocker
+):
+    resume_dir = mock_project_root / "results" / "rag_answers" / "interrupted"
+    resume_dir.mkdir(parents=True)
+    mock_evaluate = mocker.patch(
+        "govuk_chat_evaluation.rag_answers.cli.evaluate_and_output_results"
+    )
+
+    runner = CliRunner()
+    result = runner.invoke(
+        main, [mock_config_file, "--no-generate", "--resume", str(resume_dir)]
+    )
+
+    assert result.exit_code == 0, result.output
+    assert mock_evaluate.call_args.args[0] == resume_dir
+    assert mock_evaluate.call_args.kwargs["resume"] is True
+    assert (resume_dir / "config.yaml").exists()
+    assert not (
+        mock_project_root / "results" / "rag_answers" / "2024-11-11T12:34:56"
+    ).exists()
+
+
+def test_main_writes_the_config_of_an_interrupted_evaluation(
+    mock_output_directory, mock_config_file, mocker
+):
+    mocker.patch(
+        "govuk_chat_evaluation.rag_answers.cli.evaluate_and_output_results",
+        side_effect=KeyboardInterrupt,
+    )
+
+    result = CliRunner().invoke(main, [mock_config_file, "--no-generate"])
+
+    assert result.exit_code != 0
+    assert (mock_output_directory / "config.yaml").exists()
+
+
+def test_main_resume_evaluates_previously_generated_answers(
+    mock_project_root, mock_config_file, mock_data_generation, mocker
+):
+    resume_dir = mock_project_root / "results" / "rag_answers" / "interrupted"
+    resume_dir.mkdir(parents=True)
+    (resume_dir / "generated.jsonl").touch()
+    mock_evaluate = mocker.patch(
+        "govuk_chat_evaluation.rag_answers.cli.evaluate_and_output_results"
+    )
+
+    runner = CliRunner()
+    result = runner.invoke(
+        main, [mock_config_file, "--generate", "--resume", str(resume_dir)]
+    )
+
+    assert result.exit_code == 0, result.output
+    mock_data_generation.assert_not_called()
+    assert mock_evaluate.call_args.args[1] == resume_dir / "generated.jsonl"
+
+
+def test_main_estimates_without_evaluating(
+    mock_config_file, mock_deepeval_evaluate, mock_project_root
+):
+    runner = CliRunner()
+    result = runner.invoke(main, [mock_config_file, "--no-generate", "--estimate"])
+
+    assert result.exit_code == 0, result.output
+    assert "faithfulness" in result.output
+    assert "API calls" in result.output
+    mock_deepeval_evaluate.assert_not_called()
+    assert not (mock_project_root / "results").exists()
+
+
+def test_main_estimate_requires_generated_answers(mock_config_file):
+    runner = CliRunner()
+    result = runner.invoke(main, [mock_config_file, "--generate", "--estimate"])
+
+    assert result.exit_code != 0
+    assert "--no-generate" in result.output
+
+
+def test_main_estimates_across_processes(mock_config_file, mocker):
+    mock_estimate = mocker.patch(
+        "govuk_chat_evaluation.rag_answers.cli.estimate_evaluation_table",
+        return_value="Estimate",
+    )
+
+    runner = CliRunner()
+    result = runner.invoke(
+        main,
+        [mock_config_file, "--no-generate", "--estimate", "--estimate-processes", "4"],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert mock_estimate.call_args.args[2] == 4
@@ -0,0 +1,78 @@
+import pytest
+
+from govuk_chat_evaluation.rag_answers.context_compaction import (
+    ContextCompactionStats,
+    ContextCompactor,
+    html_to_text,
+)
+
+
+class TestHtmlToText:
+    @pytest.mark.parametrize(
+        "html, expected",
+        [
+            (
+                "<p>Some   text\n about <a href='/vat'>VAT</a></p>",
+                "Some text about VAT",
+            ),
+            (
+                "<h2>Eligibility</h2><p>You must be over 18.</p>",
+                "Eligibility\n\nYou must be over 18.",
+            ),
+            (
+                "<p>You need:</p><ul><li>a passport</li><li>a <strong>photo</strong></li></ul>",
+                "You need:\n\n- a passport\n- a photo",
+            ),
+            (
+                "<table><tr><th>Band</th><th>Rate</th></tr><tr><td>Basic</td><td>20%</td></tr></table>",
+                "| Band | Rate\n| Basic | 20%",
+            ),
+            ("<p>Fish &amp; chips</p>", "Fish & chips"),
+            ("<style>p { color: red; }</style><script>x()</script><p>Text</p>", "Text"),
+            ("Plain text", "Plain text"),
+            ("<pre>line one\nline two</pre>", "line one\nline two"),
+        ],
+    )
+    def test_html_to_text(self, html, expected):
+        assert html_to_text(html) == expected
+
+
+class TestContextCompactor:
+    def test_compact_converts_html(self):
+        assert ContextCompactor().compact("<p>Some text</p>") == "Some text"
+
+    def test_compact_converts_each_unique_chunk_once(self, mocker):
+        html_to_text = mocker.patch(
+            "govuk_chat_evaluation.rag_answers.context_compaction.html_to_text",
+            side_effect=lambda html: html.upper(),
+        )
+        compactor = ContextCompactor()
+
+        results = [
+            compactor.compact(html) for html in ["<p>a</p>", "<p>b</p>", "<p>a</p>"]
+        ]
+
+        assert results == ["<P>A</P>", "<P>B</P>", "<P>A</P>"]
+        assert html_to_text.call_count == 2
+        assert compactor.stats.chunks == 3
+        assert compactor.stats.unique_chunks == 2
+
+    def test_stats_report_tokens_saved(self):
+        compactor = ContextCompactor()
+        html = "<div class='govuk-body'><p>" + "word " * 40 + "</p></div>"
+
+        compactor.compact(html)
+        compactor.compact(html)
+
+        assert compactor.stats.tokens_saved > 0
+        assert compactor.stats.tokens_saved == (
+            compactor.stats.html_tokens - compactor.stats.text_tokens
+        )
+
+
+def test_context_compaction_stats_str():
+    stats = ContextCompactionStats(
+        chunks=10, unique_chunks=4, html_tokens=1000, text_tokens=400
+    )
+
+    assert str(stats) == "10 chunks (4 unique), ~600 of ~1000 tokens saved per run"
@@ -1,3 +1,5 @@
+from typing import Any, cast
+
 import pytest
 from pydantic import ValidationError
 from deepeval.test_case import LLMTestCase
@@ -6,11 +8,26 @@ from deepeval.metrics import (
     BiasMetric,
 )
 
+from govuk_chat_evaluation.rag_answers.custom_deepeval.llm_judges import (
+    JudgeGPTModel,
+    JudgeRateLimiter,
+    JudgeResponseCache,
+)
+from govuk_chat_evaluation.rag_answers.custom_deepeval.metrics.factual_correctness import (
+    FactualCorrectnessMetric,
+)
+from govuk_chat_evaluation.rag_answers.context_compaction import ContextCompactor
 from govuk_chat_evaluation.rag_answers.data_models import (
+    DEFAULT_BATCH_MAX_WAIT_SECONDS,
     EvaluationTestCase,
+    JudgeCacheConfig,
+    JudgeRateLimitConfig,
+    LLMJudgeModel,
+    LLMJudgeModelConfig,
     MetricConfig,
     Config,
     StructuredContext,
+    case_content_hash,
 )
 
 
@@ -45,6 +62,84 @@ class TestConfig:
             n_runs=1,
         )
 
+    def test_config_validates_n_runs_max(self, mock_input_data):
+        config: dict[str, Any] = {
+            "what": "Test",
+            "generate": False,
+            "input_path": mock_input_data,
+            "metrics": [],
+        }
+
+        with pytest.raises(ValueError, match="n_runs must be at least 2"):
+            Config(**config, n_runs=1, n_runs_max=5)
+
+        with pytest.raises(ValueError, match="n_runs_max must not be less"):
+            Config(**config, n_runs=3, n_runs_max=2)
+
+        # These should not raise
+        Config(**config, n_runs=1)
+        Config(**config, n_runs=2, n_runs_max=5)
+
+    def test_config_ties_batch_max_wait_seconds_to_throttle_value(
+        self, mock_input_data
+    ):
+        config = Config(
+            what="Test",
+            generate=False,
+            provider=None,
+            input_path=mock_input_data,
+            metrics=[
+                MetricConfig(
+                    **{
+                        "name": "factual_correctness",
+                        "threshold": 0.5,
+                        "model": "gpt-4o",
+                        "batch_size": 8,
+                    }
+                )
+            ],
+            n_runs=2,
+            throttle_value=5,
+        )
+
+        [metric] = config.metric_instances()
+
+        # deepeval schedules a run copy of a test case every 2.5 seconds
+        assert metric.batcher.max_wait_seconds == 20
+        assert config.metrics[0].batch_max_wait_seconds is None
+
+    def test_config_validates_batch_max_wait_seconds(self, mock_input_data):
+        config: dict[str, Any] = {
+            "what": "Test",
+            "generate": False,
+            "input_path": mock_input_data,
+            "n_runs": 1,
+            "throttle_value": 5,
+        }
+
+        def metrics(batch_size: int, batch_max_wait_seconds: float):
+            return [
+                MetricConfig(
+                    **{
+                        "name": "factual_correctness",
+                        "threshold": 0.5,
+                        "model": "gpt-4o",
+                        "batch_size": batch_size,
+                        "batch_max_wait_seconds": batch_max_wait_seconds,
+                    }
+                )
+            ]
+
+        with pytest.raises(ValueError, match="must be more than throttle_value"):
+            Config(**config, metrics=metrics(8, 0.5))
+        with pytest.raises(ValueError, match="must be more than throttle_value"):
+            Config(**{**config, "n_runs": 2}, metrics=metrics(8, 2.5))
+
+        # These should not raise
+        Config(**config, metrics=metrics(8, 10))
+        Config(**config, metrics=metrics(1, 0.5))
+        Config(**{**config, "n_runs": 2}, metrics=metrics(8, 3))
+
     def test_get_metric_instances(self, mock_input_data):
         config_dict = {
             "what": "Test",
@@ -74,6 +169,180 @@ class TestConfig:
         assert isinstance(metrics[0], FaithfulnessMetric)
         assert isinstance(metrics[1], BiasMetric)
 
+    def test_metric_instances_share_rate_limiter_per_judge_model(self, mock_input_data):
+        metric = {"threshold": 0.5, "temperature": 0.0}
+        evaluation_config = Config(
+            what="Test",
+            generate=False,
+            provider=None,
+            input_path=mock_input_data,
+            metrics=[
+                {"name": "faithfulness", "model": "gpt-4o", **metric},
+                {"name": "bias", "model": "gpt-4o", **metric},
+                {"name": "relevance", "model": "gpt-4o-mini", **metric},
+            ],  # type: ignore[arg-type]
+            n_runs=1,
+            judge_rate_limits={
+                LLMJudgeModel.GPT_4O: {"requests_per_minute": 100},  # type: ignore[dict-item]
+            },
+        )
+
+        faithfulness, bias, relevance = [
+            cast(JudgeGPTModel, metric.model)
+            for metric in evaluation_config.metric_instances()
+        ]
+
+        assert isinstance(faithfulness.rate_limiter, JudgeRateLimiter)
+        assert faithfulness.rate_limiter is bias.rate_limiter
+        assert relevance.rate_limiter is None
+
+    def test_metric_instances_share_a_judge_per_judge_config(self, mock_input_data):
+        metric = {"threshold": 0.5, "model": "gpt-4o"}
+        evaluation_config = Config(
+            what="Test",
+            generate=False,
+            provider=None,
+            input_path=mock_input_data,
+            metrics=[
+                {"name": "faithfulness", "temperature": 0.0, **metric},
+                {"name": "bias", "temperature": 0.0, **metric},
+                {"name": "relevance", "temperature": 0.5, **metric},
+            ],  # type: ignore[arg-type]
+            n_runs=1,
+            judge_max_connections=20,
+        )
+
+        faithfulness, bias, relevance = [
+            cast(JudgeGPTModel, metric.model)
+            for metric in evaluation_config.metric_instances()
+        ]
+
+        assert faithfulness is bias
+        assert relevance is not faithfulness
+        assert faithfulness.max_connections == 20
+
+    def test_escalation_metric_instances(self, mock_input_data):
+        evaluation_config = Config(
+            what="Test",
+            generate=False,
+            provider=None,
+            input_path=mock_input_data,
+            metrics=[
+                {
+                    "name": "faithfulness",
+                    "threshold": 0.5,
+                    "model": "gpt-4o-mini",
+                    "cascade": {"model": "gpt-4o"},
+                },
+                {"name": "bias", "threshold": 0.5, "model": "gpt-4o-mini"},
+            ],  # type: ignore[arg-type]
+            n_runs=1,
+        )
+
+        faithfulness, bias = evaluation_config.escalation_metric_instances()
+
+        assert isinstance(faithfulness, FaithfulnessMetric)
+        assert faithfulness.model.get_model_name() == "gpt-4o"
+        assert bias is None
+
+    def test_worker_config_shares_limits_between_workers(self, mock_input_data):
+        evaluation_config = Config(
+            what="Test",
+            generate=False,
+            provider=None,
+            input_path=mock_input_data,
+            metrics=[],
+            n_runs=1,
+            n_workers=4,
+            max_concurrent=40,
+            judge_max_connections=10,
+            judge_rate_limits={
+                LLMJudgeModel.GPT_4O: JudgeRateLimitConfig(
+                    requests_per_minute=1000, max_concurrent=2
+                )
+            },
+        )
+
+        worker_config = evaluation_config.worker_config()
+
+        assert worker_config.max_concurrent == 10
+        assert worker_config.judge_max_connections == 2
+        assert worker_config.judge_rate_limits[
+            LLMJudgeModel.GPT_4O
+        ] == JudgeRateLimitConfig(
+            max_concurrent=1, requests_per_minute=250, tokens_per_minute=None
+        )
+
+
+class TestLLMJudgeModelConfig:
+    def test_instantiate_llm_judge_with_cache(self, tmp_path):
+        cache = JudgeResponseCache(tmp_path / "cache.sqlite3")
+        judge = LLMJudgeModelConfig(model="gpt-4o").instantiate_llm_judge(cache)  # type: ignore[arg-type]
+
+        assert isinstance(judge, JudgeGPTModel)
+        assert judge.cache is cache
+
+    def test_instantiate_llm_judge_with_rate_limiter(self):
+        rate_limiter = JudgeRateLimiter(requests_per_minute=10)
+        judge = LLMJudgeModelConfig(model="gpt-4o").instantiate_llm_judge(  # type: ignore[arg-type]
+            rate_limiter=rate_limiter
+        )
+
+        assert isinstance(judge, JudgeGPTModel)
+        assert judge.rate_limiter is rate_limiter
+
+    def test_instantiate_llm_judge_without_cache_or_rate_limiter(self):
+        judge = LLMJudgeModelConfig(model="gpt-4o").instantiate_llm_judge()  # type: ignore[arg-type]
+
+        assert isinstance(judge, JudgeGPTModel)
+        assert judge.cache is None
+        assert judge.rate_limiter is None
+
+    def test_instantiate_llm_judge_with_base_url(self):
+        judge = LLMJudgeModelConfig(
+            model="gpt-4o",  # type: ignore[arg-type]
+            base_url="http://127.0.0.1:8000/v1",
+        ).instantiate_llm_judge()
+
+        assert isinstance(judge, JudgeGPTModel)
+        assert str(judge.load_model(async_mode=True).base_url) == (
+            "http://127.0.0.1:8000/v1/"
+        )
+
+    def test_metric_config_accepts_base_url(self):
+        metric_config = MetricConfig(
+            **{
+                "name": "bias",
+                "threshold": 0.5,
+                "model": "gpt-4o",
+                "base_url": "http://127.0.0.1:8000/v1",
+            }
+        )
+
+        assert metric_config.llm_judge.base_url == "http://127.0.0.1:8000/v1"
+
+
+class TestJudgeCacheConfig:
+    def test_instantiate_cache_defaults_to_results_directory(self, mock_project_root):
+        cache = JudgeCacheConfig().instantiate_cache()
+
+        assert isinstance(cache, JudgeResponseCache)
+        assert cache.path == (
+            mock_project_root / "results" / "rag_answers" / "judge_cache.sqlite3"
+        )
+
+    def test_instantiate_cache_when_disabled(self):
+        assert JudgeCacheConfig(enabled=False).instantiate_cache() is None
+
+
+class TestJudgeRateLimitConfig:
+    def test_instantiate_rate_limiter_with_completion_tokens(self):
+        rate_limiter = JudgeRateLimitConfig(
+            tokens_per_minute=1000, completion_tokens=200
+        ).instantiate_rate_limiter()
+
+        assert rate_limiter.completion_tokens == 200
+
 
 class TestEvaluationTestCase:
     def test_to_llm_test_case(self):
@@ -99,14 +368,63 @@ class TestEvaluationTestCase:
         assert llm_test_case.input == evaluation_test_case.question
         assert llm_test_case.expected_output == evaluation_test_case.ideal_answer
         assert llm_test_case.actual_output == evaluation_test_case.llm_answer
-        assert llm_test_case.name is not None
-        assert isinstance(llm_test_case.name, str)
+        assert llm_test_case.name == case_content_hash(
+            llm_test_case.input,
+            evaluation_test_case.llm_answer,
+            evaluation_test_case.ideal_answer,
+            llm_test_case.retrieval_context or [],
+        )
 
         assert isinstance(llm_test_case.retrieval_context, list)
         assert all(isinstance(chunk, str) for chunk in llm_test_case.retrieval_context)
         assert "VAT" in llm_test_case.retrieval_context[0]
         assert "Some HTML about VAT" in llm_test_case.retrieval_context[0]
 
+    def test_name_is_the_hash_of_the_judged_content(self):
+        def evaluation_test_case(**kwargs):
+            return EvaluationTestCase(
+                **{
+                    "question": "How are you?",
+                    "ideal_answer": "Great",
+                    "llm_answer": "Fine",
+                    "retrieved_context": [],
+                }
+                | kwargs
+            )
+
+        name = evaluation_test_case().to_llm_test_case().name
+
+        assert name == case_content_hash("How are you?", "Fine", "Great", [])
+        assert evaluation_test_case().to_llm_test_case().name == name
+        assert evaluation_test_case(llm_answer="Good").to_llm_test_case().name != name
+
+    def test_name_is_the_same_for_html_that_compacts_to_the_same_text(self):
+        def evaluation_test_case(html_content: str):
+            return EvaluationTestCase(
+                question="How are you?",
+                ideal_answer="Great",
+                llm_answer="Fine",
+                retrieved_context=[
+                    StructuredContext(
+                        title="VAT",
+                        heading_hierarchy=["Tax"],
+                        description="VAT overview",
+                        html_content=html_content,
+                        exact_path="https://gov.uk/vat",
+                        base_path="/vat",
+                    )
+                ],
+            )
+
+        first = evaluation_test_case("<p>Pay VAT</p>")
+        second = evaluation_test_case("<div><p>Pay VAT</p></div>")
+
+        assert (
+            first.to_llm_test_case(ContextCompactor()).name
+            == second.to_llm_test_case(ContextCompactor()).name
+        )
+        assert first.to_llm_test_case().name != second.to_llm_test_case().name
+
 
 class TestStructuredContext:
     def test_to_flattened_string(self):
@@ -127,6 +445,20 @@ class TestStructuredContext:
         assert "VAT overview" in flattened_string
         assert "<p>Some HTML about VAT</p>" in flattened_string
 
+    def test_to_flattened_string_with_compactor(self):
+        structured_context = StructuredContext(
+            title="VAT",
+            heading_hierarchy=["Tax", "VAT"],
+            description="VAT overview",
+            html_content="<p>Some HTML about VAT</p>",
+            exact_path="https://gov.uk/vat",
+            base_path="https://gov.uk",
+        )
+
+        flattened_string = structured_context.to_flattened_string(ContextCompactor())
+
+        assert flattened_string.endswith("VAT overview\n\nSome HTML about VAT")
+
 
 class TestMetricConfig:
     @pytest.mark.parametrize(
@@ -169,3 +501,140 @@ class TestMetricConfig:
 
         assert "validation error for MetricConfig" in str(exception_info.value)
         assert "does_not_exist" in str(exception_info.value)
+
+    def test_to_metric_instance_with_batch_size(self):
+        metric_config = MetricConfig(
+            **{
+                "name": "factual_correctness",
+                "threshold": 0.5,
+                "model": "gpt-4o",
+                "batch_size": 8,
+            }
+        )
+
+        metric = metric_config.to_metric_instance()
+
+        assert isinstance(metric, FactualCorrectnessMetric)
+        assert metric.batcher is not None
+        assert metric.batcher.batch_size == 8
+        assert metric.batcher.max_wait_seconds == DEFAULT_BATCH_MAX_WAIT_SECONDS
+        assert metric.batcher.model is metric.model
+
+    def test_to_metric_instance_with_batch_max_wait_seconds(self):
+        metric_config = MetricConfig(
+            **{
+                "name": "factual_correctness",
+                "threshold": 0.5,
+                "model": "gpt-4o",
+                "batch_size": 8,
+                "batch_max_wait_seconds": 12.5,
+            }
+        )
+
+        metric = metric_config.to_metric_instance()
+
+        assert isinstance(metric, FactualCorrectnessMetric)
+        assert metric.batcher is not None
+        assert metric.batcher.max_wait_seconds == 12.5
+
+    def test_prescreen_is_only_supported_by_factual_correctness(self):
+        with pytest.raises(ValidationError, match="prescreen is not supported"):
+            MetricConfig(
+                **{
+                    "name": "bias",
+                    "threshold": 0.5,
+                    "model": "gpt-4o",
+                    "prescreen": {"pass_above": 0.95},
+                }
+            )
+
+    def test_escalation_metric_config(self):
+        config = MetricConfig(
+            **{
+                "name": "factual_correctness",
+                "threshold": 0.5,
+                "model": "gpt-4o-mini",
+                "temperature": 0.5,
+                "prescreen": {"pass_above": 0.95},
+                "cascade": {"model": "gpt-4o", "threshold_margin": 0.2},
+            }
+        )
+
+        escalation_config = config.escalation_metric_config()
+
+        assert escalation_config is not None
+        assert escalation_config.llm_judge.model == LLMJudgeModel.GPT_4O
+        assert escalation_config.llm_judge.temperature == 0.0
+        assert escalation_config.threshold == 0.5
+        assert escalation_config.cascade is None
+        assert escalation_config.prescreen is None
+
+    def test_escalation_metric_config_without_cascade(self):
+        config = MetricConfig(
+            **{"name": "bias", "threshold": 0.5, "model": "gpt-4o-mini"}
+        )
+
+        assert config.escalation_metric_config() is None
+
+    def test_batch_size_is_only_supported_by_factual_correctness(self):
+        with pytest.raises(ValidationError, match="batch_size is not supported"):
+            MetricConfig(
+                **{
+                    "name": "bias",
+                    "threshold": 0.5,
+                    "model": "gpt-4o",
+                    "batch_size": 8,
+                }
+            )
+
+    def test_config_hash_changes_with_batch_size(self):
+        config_dict = {
+            "name": "factual_correctness",
+            "threshold": 0.5,
+            "model": "gpt-4o",
+        }
+
+        assert MetricConfig(**config_dict).config_hash(1) != MetricConfig(
+            **config_dict, batch_size=8
+        ).config_hash(1)
+
+    def test_config_hash_changes_with_adaptive_runs(self):
+        config = MetricConfig(
+            **{"name": "factual_correctness", "threshold": 0.5, "model": "gpt-4o"}
+        )
+
+        hashes = {
+            config.config_hash(2),
+            config.config_hash(2, 4, 0.05),
+            config.config_hash(2, 5, 0.05),
+            config.config_hash(2, 4, 0.01),
+        }
+
+        assert len(hashes) == 4
+        assert config.config_hash(2, None, 0.05) == config.config_hash(2)
+
+    def test_config_hash_ignores_batch_max_wait_seconds(self):
+        config_dict = {
+            "name": "factual_correctness",
+            "threshold": 0.5,
+            "model": "gpt-4o",
+            "batch_size": 8,
+        }
+
+        assert MetricConfig(**config_dict).config_hash(1) == MetricConfig(
+            **config_dict, batch_max_wait_seconds=40
+        ).config_hash(1)
+
+    def test_judgement_hash_changes_with_the_judge_settings_only(self):
+        config_dict = {"name": "faithfulness", "threshold": 0.5, "model": "gpt-4o"}
+        metric_config = MetricConfig(**config_dict)
+
+        assert (
+            metric_config.judgement_hash()
+            == MetricConfig(**config_dict).judgement_hash()
+        )
+        assert (
+            metric_config.judgement_hash()
+            != MetricConfig(**{**config_dict, "threshold": 0.8}).judgement_hash()
+        )
+        assert metric_config.judgement_hash() != metric_config.config_hash(1)
@@ -1,8 +1,13 @@
+import asyncio
+import time
+
 import pytest
 from unittest.mock import MagicMock
 
 from deepeval import evaluate as deepeval_evaluate
 from deepeval.metrics import BaseMetric
+from pydantic import TypeAdapter
+from deepeval.test_case import LLMTestCase
 from deepeval.evaluate.configs import (
     AsyncConfig,
     DisplayConfig,
@@ -17,7 +22,10 @@ from govuk_chat_evaluation.rag_answers.data_models import (
 )
 from govuk_chat_evaluation.rag_answers.deepeval_evaluate import (
     run_deepeval_evaluation,
-    convert_deepeval_output_to_evaluation_results,
+    stream_row_from_test_result,
+    tag_name_with_run,
+    untag_name_with_run,
+    with_unique_names,
 )
 from tests.conftest import assert_mock_call_matches_signature
 
@@ -33,11 +41,13 @@ class TestRunDeepEvalEvaluation:
     def mock_metrics(self):
         metric1 = MagicMock(spec=BaseMetric)
         metric1.name = "faithfulness"
+        metric1.__name__ = "Faithfulness"
         metric1.threshold = 0.5
         metric1.async_mode = False
 
         metric2 = MagicMock(spec=BaseMetric)
         metric2.name = "bias"
+        metric2.__name__ = "Bias"
         metric2.threshold = 0.5
         metric2.async_mode = False
 
@@ -48,25 +58,59 @@ class TestRunDeepEvalEvaluation:
     ):
         run_deepeval_evaluation(mock_test_cases, mock_metrics)
         assert_mock_call_matches_signature(mock_deepeval_evaluate, deepeval_evaluate)
-        mock_deepeval_evaluate.assert_called_once_with(
-            test_cases=mock_test_cases, metrics=mock_metrics
-        )
+        mock_deepeval_evaluate.assert_called_once()
 
-    def test_runs_evaluate_n_times(
+        _, kwargs = mock_deepeval_evaluate.call_args
+        assert kwargs["metrics"] == mock_metrics
+        assert [case.name for case in kwargs["test_cases"]] == [
+            tag_name_with_run(case.name, 0) for case in mock_test_cases
+        ]
+
+    def test_runs_all_n_runs_in_a_single_evaluation(
         self, mock_test_cases, mock_metrics, mock_deepeval_evaluate
     ):
         run_deepeval_evaluation(mock_test_cases, mock_metrics, n_runs=2)
         assert_mock_call_matches_signature(mock_deepeval_evaluate, deepeval_evaluate)
-        mock_deepeval_evaluate.assert_called_with(
-            test_cases=mock_test_cases, metrics=mock_metrics
-        )
+        mock_deepeval_evaluate.assert_called_once()
 
-        assert mock_deepeval_evaluate.call_count == 2
+        _, kwargs = mock_deepeval_evaluate.call_args
+        assert [case.name for case in kwargs["test_cases"]] == [
+            tag_name_with_run(case.name, run_idx)
+            for run_idx in range(2)
+            for case in mock_test_cases
+        ]
 
     def test_returns_a_list_for_each_n_runs(self, mock_test_cases, mock_metrics):
         results = run_deepeval_evaluation(mock_test_cases, mock_metrics, n_runs=2)
         assert len(results) == 2
 
+    def test_tags_runs_from_first_run(
+        self, mock_test_cases, mock_metrics, mock_deepeval_evaluate
+    ):
+        results = run_deepeval_evaluation(
+            mock_test_cases, mock_metrics, n_runs=2, first_run=3
+        )
+
+        _, kwargs = mock_deepeval_evaluate.call_args
+        assert [case.name for case in kwargs["test_cases"]] == [
+            tag_name_with_run(case.name, run_idx)
+            for run_idx in (3, 4)
+            for case in mock_test_cases
+        ]
+        assert [len(run) for run in results] == [2, 2]
+
+    def test_results_have_untagged_names(self, mock_test_cases, mock_metrics):
+        results = run_deepeval_evaluation(mock_test_cases, mock_metrics, n_runs=2)
+        expected_names = sorted(case.name for case in mock_test_cases)
+
+        for run in results:
+            assert sorted(result.name for result in run) == expected_names
+
+    def test_does_not_modify_given_test_cases(self, mock_test_cases, mock_metrics):
+        names = [case.name for case in mock_test_cases]
+        run_deepeval_evaluation(mock_test_cases, mock_metrics, n_runs=2)
+        assert [case.name for case in mock_test_cases] == names
+
     def test_accepts_deepeval_options(
         self, mock_test_cases, mock_metrics, mock_deepeval_evaluate
     ):
@@ -81,39 +125,129 @@ class TestRunDeepEvalEvaluation:
 
         assert_mock_call_matches_signature(mock_deepeval_evaluate, deepeval_evaluate)
 
-        mock_deepeval_evaluate.assert_called_with(
-            test_cases=mock_test_cases,
-            metrics=mock_metrics,
-            display_config=DisplayConfig(print_results=True),
-            async_config=AsyncConfig(max_concurrent=10),
-            cache_config=CacheConfig(use_cache=True),
-            error_config=ErrorConfig(ignore_errors=False),
-        )
-
+        _, kwargs = mock_deepeval_evaluate.call_args
+        assert kwargs["display_config"] == DisplayConfig(print_results=True)
+        assert kwargs["async_config"] == AsyncConfig(max_concurrent=10)
+        assert kwargs["cache_config"] == CacheConfig(use_cache=True)
+        assert kwargs["error_config"] == ErrorConfig(ignore_errors=False)
 
-class TestConvertDeepEvalOutput:
-    def test_convert_empty_results(self):
-        results = convert_deepeval_output_to_evaluation_results([])
-        assert results == []
-
-    def test_converts_to_evaluation_results(self, mock_deepeval_results):
-        results = convert_deepeval_output_to_evaluation_results(mock_deepeval_results)
+    def test_divides_the_throttle_between_run_copies(
+        self, mock_test_cases, mock_metrics, mock_deepeval_evaluate
+    ):
+        run_deepeval_evaluation(
+            mock_test_cases,
+            mock_metrics,
+            n_runs=4,
+            async_config=AsyncConfig(max_concurrent=10, throttle_value=2),
+        )
 
-        assert all(isinstance(item, EvaluationResult) for item in results)
+        _, kwargs = mock_deepeval_evaluate.call_args
+        assert kwargs["async_config"] == AsyncConfig(
+            max_concurrent=10,
+            throttle_value=0.5,  # pyright: ignore[reportArgumentType]
+        )
 
-        # each item should have the number of metrics multiplied by runs
-        metrics_tested = len(mock_deepeval_results[0][0].metrics_data)
-        runs = len(mock_deepeval_results)
-        expected_metrics = metrics_tested * runs
 
-        assert all(len(item.run_metric_outputs) == expected_metrics for item in results)
+class PassingMetric(BaseMetric):
+    def __init__(self):
+        self.threshold = 0.5
+        self.async_mode = True
+
+    def measure(self, test_case, *args, **kwargs):
+        self.score, self.success = 1.0, True
+        return self.score
+
+    async def a_measure(self, test_case, *args, **kwargs):
+        return self.measure(test_case)
+
+    def is_successful(self):
+        return True
+
+    @property
+    def __name__(self):  # pyright: ignore[reportIncompatibleMethodOverride]
+        return "Passing"
+
+
+@pytest.mark.parametrize("n_runs", [1, 4])
+def test_scheduling_time_does_not_grow_with_n_runs(
+    n_runs, mocker, monkeypatch, tmp_path
+):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("DEEPEVAL_RESULTS_FOLDER", raising=False)
+    throttle_value = 0.02
+    cases = [
+        LLMTestCase(name=f"case_{i}", input="Question", actual_output="Answer")
+        for i in range(5)
+    ]
+    sleep = mocker.patch("asyncio.sleep", side_effect=asyncio.sleep)
+
+    start = time.perf_counter()
+    evaluation_runs = run_deepeval_evaluation(
+        cases,
+        [PassingMetric()],
+        n_runs=n_runs,
+        async_config=AsyncConfig(
+            throttle_value=throttle_value  # pyright: ignore[reportArgumentType]
+        ),
+        display_config=DisplayConfig(show_indicator=False, print_results=False),
+        cache_config=CacheConfig(use_cache=False, write_cache=False),
+    )
+    elapsed = time.perf_counter() - start
+
+    assert [len(run) for run in evaluation_runs] == [5] * n_runs
+    scheduling_seconds = sum(call.args[0] for call in sleep.call_args_list)
+    assert scheduling_seconds == pytest.approx(len(cases) * throttle_value)
+    assert elapsed >= scheduling_seconds
+
+
+class TestRunTags:
+    def test_round_trips_name_and_run(self):
+        assert untag_name_with_run(tag_name_with_run("a::name", 3)) == ("a::name", 3)
+
+
+def test_with_unique_names_numbers_repeated_names():
+    cases = [
+        LLMTestCase(input="a", actual_output="a", name=name)
+        for name in ["one", "two", "one", "one"]
+    ]
+
+    assert [case.name for case in with_unique_names(cases)] == [
+        "one",
+        "two",
+        "one::duplicate-2",
+        "one::duplicate-3",
+    ]
+    assert [case.name for case in cases] == ["one", "two", "one", "one"]
+
+
+class TestStreamRowFromTestResult:
+    def test_converts_the_outputs_of_the_run(self, mock_deepeval_results):
+        result = mock_deepeval_results[1][0]
+
+        row = stream_row_from_test_result(result, 3)
+
+        assert TypeAdapter(EvaluationResult).validate_python(row).name == result.name
+        assert [output["run"] for output in row["run_metric_outputs"]] == [3] * len(
+            result.metrics_data
+        )
 
     def test_with_none_retrieval_context(self, mock_deepeval_results):
         # modify test data to have None for retrieval_context
         mock_deepeval_results[0][0].retrieval_context = None
 
-        results = convert_deepeval_output_to_evaluation_results(
-            [mock_deepeval_results[0]]
+        row = stream_row_from_test_result(mock_deepeval_results[0][0], 0)
+
+        assert row["retrieval_context"] == []
+
+    def test_keeps_errored_metrics(self, mock_deepeval_results):
+        mock_deepeval_results[0][0].metrics_data[0] = (
+            mock_deepeval_results[0][0]
+            .metrics_data[0]
+            .model_copy(update={"score": None, "success": False, "error": "Timeout"})
         )
 
-        assert results[0].retrieval_context == []
+        row = stream_row_from_test_result(mock_deepeval_results[0][0], 0)
+
+        errored = row["run_metric_outputs"][0]
+        assert errored["score"] is None
+        assert errored["error"] == "Timeout"
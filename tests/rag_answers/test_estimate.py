@@ -0,0 +1,224 @@
+import os
+import time
+
+import pytest
+from deepeval.test_case import LLMTestCase
+
+from govuk_chat_evaluation.rag_answers.custom_deepeval.llm_judges.rate_limiter import (
+    estimate_prompt_tokens,
+)
+from govuk_chat_evaluation.rag_answers.custom_deepeval.metrics.factual_correctness.template import (
+    CLASSIFY_FACTS_BATCH_SYSTEM_PROMPT,
+    FactualCorrectnessTemplate,
+)
+from govuk_chat_evaluation.rag_answers.data_models import (
+    Config,
+    MetricConfig,
+    MetricName,
+)
+from govuk_chat_evaluation.rag_answers.estimate import (
+    RESPONSE_OVERHEAD_TOKENS,
+    MetricEstimate,
+    estimate_case,
+    estimate_evaluation,
+    estimate_evaluation_table,
+    judge_prompts,
+)
+
+
+@pytest.fixture
+def case():
+    return LLMTestCase(
+        name="case",
+        input="How do I renew my passport?",
+        actual_output="You can renew your passport online.",
+        expected_output="Renew your passport online or by post.",
+        retrieval_context=["<p>Renew online</p>", "<p>Renew by post</p>"],
+    )
+
+
+@pytest.mark.parametrize(
+    "metric_name, expected_calls",
+    [
+        (MetricName.FACTUAL_CORRECTNESS, 1),
+        (MetricName.FAITHFULNESS, 4),
+        (MetricName.RELEVANCE, 3),
+        (MetricName.BIAS, 3),
+    ],
+)
+def test_judge_prompts_returns_a_prompt_per_judge_call(
+    case, metric_name, expected_calls
+):
+    assert len(judge_prompts(metric_name, case)) == expected_calls
+
+
+def test_judge_prompts_uses_the_factual_correctness_prompt(case):
+    [(prompt, _)] = judge_prompts(MetricName.FACTUAL_CORRECTNESS, case)
+
+    assert prompt == FactualCorrectnessTemplate.classify_facts(
+        answer=case.actual_output, ground_truth=case.expected_output
+    )
+
+
+def test_judge_prompts_includes_retrieval_context_for_faithfulness(case):
+    prompts = judge_prompts(MetricName.FAITHFULNESS, case)
+
+    assert any("<p>Renew by post</p>" in prompt for prompt, _ in prompts)
+
+
+def test_judge_prompts_of_a_batched_test_case_leave_out_shared_instructions(case):
+    [(prompt, _)] = judge_prompts(MetricName.FACTUAL_CORRECTNESS, case, batched=True)
+
+    assert case.actual_output in prompt
+    assert CLASSIFY_FACTS_BATCH_SYSTEM_PROMPT not in prompt
+
+
+def test_estimate_case(case):
+    [(api_calls, input_tokens, output_tokens)] = estimate_case(
+        [MetricName.FACTUAL_CORRECTNESS], case
+    )
+    [(prompt, response)] = judge_prompts(MetricName.FACTUAL_CORRECTNESS, case)
+
+    assert api_calls == 1
+    assert input_tokens == estimate_prompt_tokens(prompt)
+    assert output_tokens == estimate_prompt_tokens(response) + RESPONSE_OVERHEAD_TOKENS
+
+
+class TestMetricEstimate:
+    def test_cost_uses_model_pricing(self):
+        estimate = MetricEstimate(
+            metric="faithfulness",
+            judge_model="gpt-4o",
+            input_tokens=1_000_000,
+            output_tokens=100_000,
+        )
+
+        assert estimate.cost == pytest.approx(2.5 + 1.0)
+
+    def test_cost_is_none_for_unpriced_models(self):
+        estimate = MetricEstimate(
+            metric="faithfulness",
+            judge_model="gemini-1.5-pro-002",
+            input_tokens=1_000,
+        )
+
+        assert estimate.cost is None
+
+
+class TestEstimateEvaluation:
+    @pytest.fixture
+    def metrics(self):
+        return [
+            MetricConfig(
+                name=MetricName.FACTUAL_CORRECTNESS,
+                threshold=0.5,
+                llm_judge={"model": "gpt-4o", "temperature": 0.0},  # type: ignore[arg-type]
+            ),
+            MetricConfig(
+                name=MetricName.BIAS,
+                threshold=0.5,
+                llm_judge={"model": "gpt-4o-mini", "temperature": 0.0},  # type: ignore[arg-type]
+            ),
+        ]
+
+    def test_estimates_each_metric_over_runs(self, case, metrics):
+        [factual_correctness, bias] = estimate_evaluation(
+            [case, case], metrics, n_runs=3, processes=1
+        )
+        [(_, fc_input, fc_output), (_, bias_input, _)] = estimate_case(
+            [metric.name for metric in metrics], case
+        )
+
+        assert factual_correctness.metric == "factual_correctness"
+        assert factual_correctness.judge_model == "gpt-4o"
+        assert factual_correctness.api_calls == 6
+        assert factual_correctness.input_tokens == fc_input * 6
+        assert factual_correctness.output_tokens == fc_output * 6
+        assert bias.judge_model == "gpt-4o-mini"
+        assert bias.api_calls == 18
+        assert bias.input_tokens == bias_input * 6
+
+    def test_process_pool_matches_single_process(self, case, metrics, mocker):
+        # runs the pool's map in this process, as spawning workers is slow
+        pool = mocker.patch(
+            "govuk_chat_evaluation.rag_answers.estimate.ProcessPoolExecutor"
+        )
+        executor = pool.return_value.__enter__.return_value
+        executor.map.side_effect = lambda fn, items, chunksize: map(fn, items)
+        mocker.patch("govuk_chat_evaluation.rag_answers.estimate.CHUNK_SIZE", 2)
+        cases = [case] * 10
+
+        assert estimate_evaluation(
+            cases, metrics, n_runs=2, processes=2
+        ) == estimate_evaluation(cases, metrics, n_runs=2, processes=1)
+        assert pool.call_args.kwargs["max_workers"] == 2
+        assert executor.map.call_args.kwargs["chunksize"] == 2
+
+    def test_estimates_a_call_per_batch(self, case):
+        metric = MetricConfig(
+            name=MetricName.FACTUAL_CORRECTNESS,
+            threshold=0.5,
+            llm_judge={"model": "gpt-4o", "temperature": 0.0},  # type: ignore[arg-type]
+            batch_size=4,
+        )
+        [(prompt, _)] = judge_prompts(metric.name, case, batched=True)
+
+        [estimate] = estimate_evaluation([case] * 5, [metric], n_runs=2)
+
+        # 10 test cases over both runs, in batches of 4
+        assert estimate.api_calls == 3
+        assert estimate.input_tokens == 10 * estimate_prompt_tokens(
+            prompt
+        ) + 3 * estimate_prompt_tokens(CLASSIFY_FACTS_BATCH_SYSTEM_PROMPT)
+
+    def test_estimates_in_this_process_by_default(self, case, metrics, mocker):
+        pool = mocker.patch(
+            "govuk_chat_evaluation.rag_answers.estimate.ProcessPoolExecutor"
+        )
+
+        estimate_evaluation([case] * 1_000, metrics, n_runs=1)
+
+        pool.assert_not_called()
+
+    @pytest.mark.benchmark
+    @pytest.mark.skipif(
+        (os.cpu_count() or 1) < 4, reason="a pool needs several CPUs to be quicker"
+    )
+    def test_process_pool_is_quicker_for_large_datasets(self, case, metrics):
+        """
+        Starting the pool takes seconds, which only a large dataset repays.
+
+        Run with:
+        uv run pytest -m 'benchmark'
+        """
+        cases = [case] * 500_000
+
+        def seconds_to_estimate(processes: int) -> float:
+            start = time.perf_counter()
+            estimate_evaluation(cases, metrics, n_runs=1, processes=processes)
+            return time.perf_counter() - start
+
+        assert seconds_to_estimate(os.cpu_count() or 1) < seconds_to_estimate(1)
+
+
+def test_estimate_evaluation_table(mock_input_data):
+    config = Config(
+        what="Estimating",
+        generate=False,
+        provider=None,
+        input_path=mock_input_data,
+        metrics=[
+            MetricConfig(
+                name=MetricName.FAITHFULNESS,
+                threshold=0.5,
+                llm_judge={"model": "gpt-4o", "temperature": 0.0},  # type: ignore[arg-type]
+            )
+        ],
+        n_runs=2,
+    )
+
+    table = estimate_evaluation_table(config.input_path, config)
+
+    assert "Estimate for 2 test case(s) over 2 run(s)" in table
+    assert "faithfulness" in table
+    assert "total" in table
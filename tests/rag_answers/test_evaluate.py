@@ -3,15 +3,39 @@ import pandas as pd
 import re
 import yaml
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
+from govuk_chat_evaluation.rag_answers.custom_deepeval.llm_judges import (
+    JudgeCall,
+    JudgeGPTModel,
+    JudgeTokenUsage,
+)
+from govuk_chat_evaluation.rag_answers.custom_deepeval.metrics.factual_correctness import (
+    FactualCorrectnessMetric,
+)
+from govuk_chat_evaluation.file_system import jsonl_to_models
 from govuk_chat_evaluation.rag_answers.data_models import (
     Config,
     EvaluationResult,
+    EvaluationTestCase,
+    MetricConfig,
     RunMetricOutput,
 )
 from govuk_chat_evaluation.rag_answers.evaluate import (
     AggregatedResults,
     evaluate_and_output_results,
+    evaluate_plan,
+    log_judge_telemetry,
+    log_judge_token_usage,
+    write_judges_telemetry,
+)
+from govuk_chat_evaluation.rag_answers.cascade import CASCADE_FILENAME
+from govuk_chat_evaluation.rag_answers.prescreen import PRESCREEN_FILENAME
+from govuk_chat_evaluation.rag_answers.incremental import llm_test_case_content_hash
+from govuk_chat_evaluation.rag_answers.results_table import ResultsTable
+from govuk_chat_evaluation.rag_answers.result_stream import (
+    RESULTS_STREAM_FILENAME,
+    read_streamed_evaluation_results,
 )
 from tests.conftest import assert_csv_exists_with_headers
 
@@ -33,40 +57,40 @@ def mock_run_deepeval_evaluation(mocker, mock_deepeval_results):
 
 class TestAggregateResults:
     @pytest.fixture
-    def mock_evaluation_results(self) -> list[EvaluationResult]:
-        return [
-            EvaluationResult(
-                name="Test1",
-                input="Is Vat a tax?",
-                actual_output="Yes",
-                expected_output="Yes, VAT is a tax.",
-                retrieval_context=[],
-                run_metric_outputs=[
-                    RunMetricOutput(run=0, metric="faithfulness", score=1.0),
-                    RunMetricOutput(run=1, metric="faithfulness", score=0.8),
-                    RunMetricOutput(run=0, metric="bias", score=0.1),
-                    RunMetricOutput(run=0, metric="bias", score=0.0),
-                ],
-            ),
-            EvaluationResult(
-                name="Test2",
-                input="What is capital of France?",
-                actual_output="Paris",
-                expected_output="Paris",
-                retrieval_context=[],
-                run_metric_outputs=[
-                    RunMetricOutput(run=0, metric="faithfulness", score=1.0),
-                    RunMetricOutput(run=1, metric="faithfulness", score=1.0),
-                    RunMetricOutput(run=0, metric="bias", score=0.0),
-                    RunMetricOutput(run=0, metric="bias", score=0.0),
-                ],
-            ),
-        ]
+    def mock_results(self) -> ResultsTable:
+        return ResultsTable.from_evaluation_results(
+            [
+                EvaluationResult(
+                    name="Test1",
+                    input="Is Vat a tax?",
+                    actual_output="Yes",
+                    expected_output="Yes, VAT is a tax.",
+                    retrieval_context=[],
+                    run_metric_outputs=[
+                        RunMetricOutput(run=0, metric="faithfulness", score=1.0),
+                        RunMetricOutput(run=1, metric="faithfulness", score=0.8),
+                        RunMetricOutput(run=0, metric="bias", score=0.1),
+                        RunMetricOutput(run=0, metric="bias", score=0.0),
+                    ],
+                ),
+                EvaluationResult(
+                    name="Test2",
+                    input="What is capital of France?",
+                    actual_output="Paris",
+                    expected_output="Paris",
+                    retrieval_context=[],
+                    run_metric_outputs=[
+                        RunMetricOutput(run=0, metric="faithfulness", score=1.0),
+                        RunMetricOutput(run=1, metric="faithfulness", score=1.0),
+                        RunMetricOutput(run=0, metric="bias", score=0.0),
+                        RunMetricOutput(run=0, metric="bias", score=0.0),
+                    ],
+                ),
+            ]
+        )
 
-    def test_per_input_metric_averages(self, mock_evaluation_results):
-        metric_averages = AggregatedResults(
-            mock_evaluation_results
-        ).per_input_metric_averages
+    def test_per_input_metric_averages(self, mock_results):
+        metric_averages = AggregatedResults(mock_results).per_input_metric_averages
         assert isinstance(metric_averages, pd.DataFrame)
         assert list(metric_averages.columns) == [
             ("name", ""),
@@ -82,14 +106,22 @@ class TestAggregateResults:
             "What is capital of France?",
         ]
 
-    def test_summary(self, mock_evaluation_results):
-        summary = AggregatedResults(mock_evaluation_results).summary
+    def test_summary(self, mock_results):
+        summary = AggregatedResults(mock_results).summary
         assert isinstance(summary, pd.DataFrame)
-        assert list(summary.columns) == ["median", "mean", "std"]
+        assert list(summary.columns) == [
+            "median",
+            "mean",
+            "std",
+            "mean_ci_lower",
+            "mean_ci_upper",
+        ]
         assert list(summary.index) == ["bias", "faithfulness"]
+        assert (summary["mean_ci_lower"] <= summary["mean"]).all()
+        assert (summary["mean"] <= summary["mean_ci_upper"]).all()
 
-    def test_export_to_csvs(self, mock_evaluation_results, tmp_path):
-        agg = AggregatedResults(mock_evaluation_results)
+    def test_export_to_csvs(self, mock_results, tmp_path):
+        agg = AggregatedResults(mock_results)
         agg.export_to_csvs(tmp_path)
 
         assert_csv_exists_with_headers(
@@ -137,6 +169,267 @@ def test_evaluate_and_output_results_prints_summary(
     assert re.search(r"median\s+mean\s+std", captured)
 
 
+@pytest.mark.usefixtures("mock_run_deepeval_evaluation")
+def test_evaluate_and_output_results_logs_context_compaction(
+    tmp_path, mock_input_data, mock_evaluation_config, caplog
+):
+    caplog.set_level(logging.INFO)
+    evaluate_and_output_results(tmp_path, mock_input_data, mock_evaluation_config)
+
+    assert "Retrieved context compaction: 0 chunks" in caplog.text
+
+
+@pytest.mark.usefixtures("mock_run_deepeval_evaluation")
+def test_evaluate_and_output_results_streams_results_to_disk(
+    tmp_path, mock_input_data, mock_evaluation_config
+):
+    evaluate_and_output_results(tmp_path, mock_input_data, mock_evaluation_config)
+
+    stream_path = tmp_path / RESULTS_STREAM_FILENAME
+    assert len(stream_path.read_text().splitlines()) == 4
+
+
+def test_evaluate_and_output_results_evaluates_in_chunks(
+    tmp_path, mock_input_data, mock_evaluation_config, mock_run_deepeval_evaluation
+):
+    mock_evaluation_config.evaluation_chunk_size = 1
+
+    evaluate_and_output_results(tmp_path, mock_input_data, mock_evaluation_config)
+
+    assert mock_run_deepeval_evaluation.call_count == 2
+    for call in mock_run_deepeval_evaluation.call_args_list:
+        assert len(call.kwargs["cases"]) == 1
+
+
+def test_evaluate_and_output_results_writes_judge_telemetry_after_each_chunk(
+    tmp_path, mock_input_data, mock_evaluation_config, fake_run_deepeval_evaluation
+):
+    def score(index, case, metric, run):
+        if case.actual_output == "Bye":
+            raise RuntimeError("Interrupted")
+        metric.model.telemetry.calls.append(
+            JudgeCall(metric=metric.__name__, model="gpt-4o-mini")
+        )
+        return 1.0
+
+    fake_run_deepeval_evaluation(score)
+    mock_evaluation_config.evaluation_chunk_size = 1
+
+    with pytest.raises(RuntimeError):
+        evaluate_and_output_results(tmp_path, mock_input_data, mock_evaluation_config)
+
+    assert len((tmp_path / "judge_telemetry.jsonl").read_text().splitlines()) == 1
+
+
+def test_evaluate_and_output_results_adds_runs_until_scores_converge(
+    tmp_path, mock_input_data, mock_evaluation_config, fake_run_deepeval_evaluation
+):
+    # the first case alternates between 0 and 1
+    mock_run = fake_run_deepeval_evaluation(
+        lambda index, case, metric, run: float(run % 2) if index == 0 else 1.0
+    )
+    mock_evaluation_config.n_runs = 2
+    mock_evaluation_config.n_runs_max = 4
+
+    evaluate_and_output_results(tmp_path, mock_input_data, mock_evaluation_config)
+
+    assert [call.kwargs["n_runs"] for call in mock_run.call_args_list] == [2, 1, 1]
+    assert [call.kwargs.get("first_run", 0) for call in mock_run.call_args_list] == [
+        0,
+        2,
+        3,
+    ]
+    assert all(len(call.kwargs["cases"]) == 1 for call in mock_run.call_args_list[1:])
+
+    results = read_streamed_evaluation_results(tmp_path / RESULTS_STREAM_FILENAME)
+    assert sorted(
+        len({output.run for output in result.run_metric_outputs}) for result in results
+    ) == [2, 4]
+
+
+def test_evaluate_and_output_results_names_test_cases_by_content(
+    tmp_path, mock_input_data, mock_evaluation_config, mock_run_deepeval_evaluation
+):
+    evaluate_and_output_results(tmp_path, mock_input_data, mock_evaluation_config)
+
+    cases = mock_run_deepeval_evaluation.call_args.kwargs["cases"]
+    compactor = mock_evaluation_config.instantiate_context_compactor()
+    assert [case.name for case in cases] == [
+        llm_test_case_content_hash(model.to_llm_test_case(compactor))
+        for model in jsonl_to_models(mock_input_data, EvaluationTestCase)
+    ]
+
+
+def test_evaluate_and_output_results_skips_the_judge_for_prescreened_cases(
+    tmp_path, mock_input_data, mock_evaluation_config, mock_run_deepeval_evaluation
+):
+    mock_evaluation_config.metrics = [
+        MetricConfig(
+            name="factual_correctness",  # type: ignore[arg-type]
+            threshold=0.5,
+            llm_judge={"model": "gpt-4o"},  # type: ignore[arg-type]
+            prescreen={"pass_above": 0.95},  # type: ignore[arg-type]
+        )
+    ]
+
+    evaluate_and_output_results(tmp_path, mock_input_data, mock_evaluation_config)
+
+    # only "Bye" matches its expected output
+    cases = mock_run_deepeval_evaluation.call_args.kwargs["cases"]
+    assert [case.actual_output for case in cases] == ["Hi"]
+    assert pd.read_csv(tmp_path / PRESCREEN_FILENAME)["score"].tolist() == [1.0]
+
+
+def test_evaluate_and_output_results_escalates_uncertain_cases(
+    tmp_path, mock_input_data, mock_evaluation_config, fake_run_deepeval_evaluation
+):
+    def score(index, case, metric, run):
+        if metric.model.get_model_name() == "gpt-4o":
+            return 0.0
+        # the first case is close to the threshold
+        return 0.55 if index == 0 else 1.0
+
+    mock_run = fake_run_deepeval_evaluation(score)
+    mock_evaluation_config.metrics = [
+        MetricConfig(
+            name="faithfulness",  # type: ignore[arg-type]
+            threshold=0.5,
+            llm_judge={"model": "gpt-4o-mini"},  # type: ignore[arg-type]
+            cascade={"model": "gpt-4o"},  # type: ignore[arg-type]
+        )
+    ]
+
+    evaluate_and_output_results(tmp_path, mock_input_data, mock_evaluation_config)
+
+    assert mock_run.call_count == 2
+    first_case = mock_run.call_args_list[0].kwargs["cases"][0]
+    assert mock_run.call_args_list[1].kwargs["cases"] == [first_case]
+
+    report = pd.read_csv(tmp_path / CASCADE_FILENAME)
+    assert report["escalated"].tolist() == [True, False]
+    assert report["escalation_score"].tolist()[0] == 0.0
+
+    per_input = pd.read_csv(tmp_path / "results_per_input.csv", header=[0, 1])
+    assert sorted(per_input[("mean", "Faithfulness")].tolist()) == [0.0, 1.0]
+
+
+def test_evaluate_and_output_results_resumes_errored_judgements(
+    tmp_path,
+    mock_input_data,
+    mock_evaluation_config,
+    fake_run_deepeval_evaluation,
+    caplog,
+):
+    caplog.set_level(logging.WARNING)
+    mock_run = fake_run_deepeval_evaluation(
+        lambda index, case, metric, run: None if index == 0 else 1.0
+    )
+    evaluate_and_output_results(tmp_path, mock_input_data, mock_evaluation_config)
+
+    assert "1 judgement(s) errored" in caplog.text
+    errored_case = mock_run.call_args.kwargs["cases"][0]
+
+    mock_run = fake_run_deepeval_evaluation(lambda index, case, metric, run: 1.0)
+    evaluate_and_output_results(
+        tmp_path, mock_input_data, mock_evaluation_config, resume=True
+    )
+
+    assert mock_run.call_args.kwargs["cases"] == [errored_case]
+    results = read_streamed_evaluation_results(tmp_path / RESULTS_STREAM_FILENAME)
+    assert [
+        [output.score for output in result.run_metric_outputs] for result in results
+    ] == [[1.0], [1.0]]
+
+
+def test_evaluate_and_output_results_judges_changed_metrics_again_when_resumed(
+    tmp_path, mock_input_data, mock_evaluation_config, fake_run_deepeval_evaluation
+):
+    fake_run_deepeval_evaluation(lambda index, case, metric, run: 1.0)
+    mock_evaluation_config.n_runs = 2
+    evaluate_and_output_results(tmp_path, mock_input_data, mock_evaluation_config)
+
+    mock_run = fake_run_deepeval_evaluation(lambda index, case, metric, run: 0.0)
+    mock_evaluation_config.n_runs = 1
+    mock_evaluation_config.metrics[0].threshold = 0.9
+    evaluate_and_output_results(
+        tmp_path, mock_input_data, mock_evaluation_config, resume=True
+    )
+
+    assert len(mock_run.call_args.kwargs["cases"]) == 2
+    results = read_streamed_evaluation_results(tmp_path / RESULTS_STREAM_FILENAME)
+    assert [
+        [(output.run, output.score) for output in result.run_metric_outputs]
+        for result in results
+    ] == [[(0, 0.0)], [(0, 0.0)]]
+
+
+def test_evaluate_and_output_results_in_worker_processes_matches_one_process(
+    mock_project_root,
+    mock_input_data,
+    mock_evaluation_config,
+    fake_run_deepeval_evaluation,
+    mocker,
+):
+    fake_run_deepeval_evaluation(
+        lambda index, case, metric, run: len(case.actual_output) / (run + 5)
+    )
+    # worker threads, as patches don't reach worker processes
+    mock_executor = mocker.patch(
+        "govuk_chat_evaluation.rag_answers.evaluate.ProcessPoolExecutor",
+        side_effect=lambda max_workers, **kwargs: ThreadPoolExecutor(max_workers),
+    )
+    mock_evaluation_config.n_runs = 3
+    mock_evaluation_config.judge_cache.enabled = False
+
+    outputs = {}
+    for n_workers in [1, 2]:
+        output_dir = mock_project_root / f"{n_workers}_workers"
+        output_dir.mkdir()
+        mock_evaluation_config.n_workers = n_workers
+        evaluate_and_output_results(output_dir, mock_input_data, mock_evaluation_config)
+        outputs[n_workers] = {
+            filename: (output_dir / filename).read_text()
+            for filename in ["judgements.jsonl", "tidy_results.csv"]
+        }
+
+    assert mock_executor.call_args.kwargs["max_workers"] == 2
+    assert outputs[1] == outputs[2]
+    assert not list((mock_project_root / "2_workers").glob("*.shard-*"))
+
+
+def test_evaluate_and_output_results_in_worker_processes_leaves_them_the_cache(
+    tmp_path,
+    mock_input_data,
+    mock_evaluation_config,
+    fake_run_deepeval_evaluation,
+    mocker,
+):
+    fake_run_deepeval_evaluation(lambda index, case, metric, run: 1.0)
+    instantiate_cache = mocker.patch.object(
+        type(mock_evaluation_config.judge_cache), "instantiate_cache", return_value=None
+    )
+    caches_during_workers = []
+
+    def evaluate_plan_in_workers(
+        results_stream_path, telemetry_path, plan, cases, config
+    ):
+        caches_during_workers.append(instantiate_cache.call_count)
+        evaluate_plan(
+            results_stream_path, telemetry_path, plan, config.metric_instances(), config
+        )
+
+    mocker.patch(
+        "govuk_chat_evaluation.rag_answers.evaluate.evaluate_plan_in_workers",
+        side_effect=evaluate_plan_in_workers,
+    )
+    mock_evaluation_config.n_workers = 2
+
+    evaluate_and_output_results(tmp_path, mock_input_data, mock_evaluation_config)
+
+    assert caches_during_workers == [0]
+    instantiate_cache.assert_called_once()
+
+
 def test_evaluate_and_output_results_copes_with_empty_data(
     mock_project_root, tmp_path, mock_evaluation_config, caplog
 ):
@@ -147,3 +440,164 @@ def test_evaluate_and_output_results_copes_with_empty_data(
     evaluate_and_output_results(mock_project_root, file_path, mock_evaluation_config)
 
     assert "There is no data to evaluate" in caplog.text
+
+
+@pytest.mark.usefixtures("mock_run_deepeval_evaluation")
+def test_evaluate_and_output_results_writes_judgements(
+    tmp_path, mock_input_data, mock_evaluation_config
+):
+    evaluate_and_output_results(tmp_path, mock_input_data, mock_evaluation_config)
+
+    assert (tmp_path / "judgements.jsonl").exists()
+
+
+def test_log_judge_token_usage(caplog):
+    caplog.set_level(logging.INFO)
+    judge = JudgeGPTModel(model="gpt-4o")
+    judge.token_usage = JudgeTokenUsage(
+        prompt_tokens=1000, cached_prompt_tokens=800, completion_tokens=100
+    )
+    unused_judge = JudgeGPTModel(model="gpt-4o-mini")
+    metrics = [
+        FactualCorrectnessMetric(model=judge),
+        FactualCorrectnessMetric(model=judge),
+        FactualCorrectnessMetric(model=unused_judge),
+    ]
+
+    log_judge_token_usage(metrics)  # type: ignore[arg-type]
+
+    assert caplog.text.count("token usage") == 1
+    assert (
+        "Judge gpt-4o token usage: 1000 prompt tokens, 800 from the prompt cache (80.0%)"
+        in caplog.text
+    )
+
+
+def test_write_and_log_judge_telemetry(tmp_path, caplog):
+    caplog.set_level(logging.INFO)
+    path = tmp_path / "judge_telemetry.jsonl"
+    judge = JudgeGPTModel(model="gpt-4o")
+    judge.telemetry.calls = [
+        JudgeCall(metric="Bias", model="gpt-4o", latency_seconds=1.5, retries=1)
+    ]
+    metrics = [
+        FactualCorrectnessMetric(model=judge),
+        FactualCorrectnessMetric(model=judge),
+        FactualCorrectnessMetric(model=JudgeGPTModel(model="gpt-4o-mini")),
+    ]
+
+    write_judges_telemetry(path, metrics)  # type: ignore[arg-type]
+    log_judge_telemetry(path)
+
+    assert len(path.read_text().splitlines()) == 1
+    assert judge.telemetry.calls == []
+    assert "Judge telemetry (latency in seconds):" in caplog.text
+    assert re.search(r"Bias\s+gpt-4o\s+1\s+1.50", caplog.text)
+
+
+class TestIncrementalEvaluation:
+    @pytest.fixture
+    def previous_results_dir(
+        self, mock_project_root, mock_input_data, mock_evaluation_config
+    ):
+        previous_dir = mock_project_root / "previous"
+        previous_dir.mkdir()
+        evaluate_and_output_results(
+            previous_dir, mock_input_data, mock_evaluation_config
+        )
+        return previous_dir
+
+    @pytest.fixture
+    def output_dir(self, mock_project_root):
+        output_dir = mock_project_root / "incremental"
+        output_dir.mkdir()
+        return output_dir
+
+    def test_reuses_every_unchanged_judgement(
+        self,
+        mock_deepeval_evaluate,
+        previous_results_dir,
+        output_dir,
+        mock_input_data,
+        mock_evaluation_config,
+    ):
+        mock_deepeval_evaluate.reset_mock()
+        config = mock_evaluation_config.model_copy(
+            update={"incremental_from": previous_results_dir}
+        )
+
+        evaluate_and_output_results(output_dir, mock_input_data, config)
+
+        mock_deepeval_evaluate.assert_not_called()
+        previous_summary = pd.read_csv(previous_results_dir / "results_summary.csv")
+        summary = pd.read_csv(output_dir / "results_summary.csv")
+        pd.testing.assert_frame_equal(previous_summary, summary)
+
+    def test_judges_only_new_metrics(
+        self,
+        mock_deepeval_evaluate,
+        previous_results_dir,
+        output_dir,
+        mock_input_data,
+        mock_evaluation_config,
+    ):
+        mock_deepeval_evaluate.reset_mock()
+        bias = MetricConfig(
+            name="bias",  # type: ignore[arg-type]
+            threshold=0.5,
+            llm_judge={"model": "gpt-4o-mini"},  # type: ignore[arg-type]
+        )
+        config = mock_evaluation_config.model_copy(
+            update={
+                "incremental_from": previous_results_dir,
+                "metrics": mock_evaluation_config.metrics + [bias],
+            }
+        )
+
+        evaluate_and_output_results(output_dir, mock_input_data, config)
+
+        mock_deepeval_evaluate.assert_called_once()
+        _, kwargs = mock_deepeval_evaluate.call_args
+        assert [metric.__name__ for metric in kwargs["metrics"]] == ["Bias"]
+
+    @pytest.mark.parametrize(
+        "previous_runs, runs, reused",
+        [
+            ({}, {}, True),
+            ({"n_runs_max": 4}, {"n_runs_max": 4}, True),
+            ({}, {"n_runs_max": 4}, False),
+            ({"n_runs_max": 4}, {}, False),
+            ({"n_runs_max": 4}, {"n_runs_max": 3}, False),
+            (
+                {"n_runs_max": 4},
+                {"n_runs_max": 4, "standard_error_threshold": 0.01},
+                False,
+            ),
+        ],
+    )
+    def test_reuses_judgements_only_with_the_same_adaptive_runs(
+        self,
+        mock_deepeval_evaluate,
+        mock_project_root,
+        output_dir,
+        mock_input_data,
+        mock_evaluation_config,
+        previous_runs,
+        runs,
+        reused,
+    ):
+        previous_dir = mock_project_root / "previous"
+        previous_dir.mkdir()
+        evaluate_and_output_results(
+            previous_dir,
+            mock_input_data,
+            mock_evaluation_config.model_copy(update={"n_runs": 2, **previous_runs}),
+        )
+        mock_deepeval_evaluate.reset_mock()
+        config = mock_evaluation_config.model_copy(
+            update={"n_runs": 2, "incremental_from": previous_dir, **runs}
+        )
+
+        evaluate_and_output_results(output_dir, mock_input_data, config)
+
+        assert mock_deepeval_evaluate.called is not reused
@@ -0,0 +1,227 @@
+import logging
+
+import pytest
+from deepeval.test_case import LLMTestCase
+
+from govuk_chat_evaluation.file_system import write_models_to_jsonl
+from govuk_chat_evaluation.rag_answers.data_models import (
+    EvaluationResult,
+    MetricJudgements,
+    RunMetricOutput,
+)
+from govuk_chat_evaluation.rag_answers.incremental import (
+    JUDGEMENTS_FILENAME,
+    evaluation_results_to_judgements,
+    llm_test_case_content_hash,
+    load_previous_judgements,
+    merge_previous_judgements,
+    plan_evaluation,
+)
+from govuk_chat_evaluation.rag_answers.results_table import ResultsTable
+
+
+@pytest.fixture
+def cases() -> list[LLMTestCase]:
+    return [
+        LLMTestCase(
+            name=f"case_{i}",
+            input=f"Question {i}",
+            actual_output=f"Answer {i}",
+            expected_output=f"Ideal answer {i}",
+            retrieval_context=[f"Context {i}"],
+        )
+        for i in range(2)
+    ]
+
+
+def evaluation_result_for(
+    case: LLMTestCase, run_metric_outputs: list[RunMetricOutput]
+) -> EvaluationResult:
+    return EvaluationResult(
+        name=str(case.name),
+        input=case.input,
+        actual_output=str(case.actual_output),
+        expected_output=str(case.expected_output),
+        retrieval_context=case.retrieval_context or [],
+        run_metric_outputs=run_metric_outputs,
+    )
+
+
+def test_llm_test_case_content_hash_matches_evaluation_result(cases):
+    result = evaluation_result_for(cases[0], [])
+    assert llm_test_case_content_hash(cases[0]) == result.content_hash()
+    assert llm_test_case_content_hash(cases[0]) != llm_test_case_content_hash(cases[1])
+
+
+class TestLoadPreviousJudgements:
+    def test_loads_complete_judgements(self, mock_project_root):
+        outputs = [
+            RunMetricOutput(run=run, metric="faithfulness", score=1.0)
+            for run in range(2)
+        ]
+        write_models_to_jsonl(
+            mock_project_root,
+            [
+                MetricJudgements(
+                    case_hash="case",
+                    metric_config_hash="metric",
+                    run_metric_outputs=outputs,
+                ),
+                MetricJudgements(
+                    case_hash="incomplete",
+                    metric_config_hash="metric",
+                    run_metric_outputs=outputs[:1],
+                ),
+            ],
+            filename=JUDGEMENTS_FILENAME,
+            data_label="judgements",
+        )
+
+        previous = load_previous_judgements(mock_project_root, n_runs=2)
+
+        assert previous == {("case", "metric"): outputs}
+
+    def test_loads_judgements_with_extra_adaptive_runs(self, mock_project_root):
+        outputs = [
+            RunMetricOutput(run=run, metric="faithfulness", score=1.0)
+            for run in range(3)
+        ]
+        write_models_to_jsonl(
+            mock_project_root,
+            [
+                MetricJudgements(
+                    case_hash="case",
+                    metric_config_hash="metric",
+                    run_metric_outputs=outputs,
+                )
+            ],
+            filename=JUDGEMENTS_FILENAME,
+            data_label="judgements",
+        )
+
+        previous = load_previous_judgements(mock_project_root, n_runs=2)
+
+        assert previous == {("case", "metric"): outputs}
+
+    def test_ignores_judgements_with_an_errored_run(self, mock_project_root):
+        write_models_to_jsonl(
+            mock_project_root,
+            [
+                MetricJudgements(
+                    case_hash="case",
+                    metric_config_hash="metric",
+                    run_metric_outputs=[
+                        RunMetricOutput(run=0, metric="faithfulness", score=1.0),
+                        RunMetricOutput(
+                            run=1, metric="faithfulness", score=None, error="Timeout"
+                        ),
+                    ],
+                )
+            ],
+            filename=JUDGEMENTS_FILENAME,
+            data_label="judgements",
+        )
+
+        assert load_previous_judgements(mock_project_root, n_runs=2) == {}
+
+    def test_warns_when_there_are_no_judgements(self, tmp_path, caplog):
+        caplog.set_level(logging.WARNING)
+        assert load_previous_judgements(tmp_path, n_runs=1) == {}
+        assert f"No {JUDGEMENTS_FILENAME} found" in caplog.text
+
+
+class TestPlanEvaluation:
+    def test_without_previous_judgements_plans_every_metric(self, cases):
+        assert plan_evaluation(cases, ["a", "b"], {}) == {(0, 1): cases}
+
+    def test_skips_previously_judged_pairs(self, cases):
+        first_hash = llm_test_case_content_hash(cases[0])
+        previous = {(first_hash, "a"): [], (first_hash, "b"): []}
+
+        assert plan_evaluation(cases, ["a", "b", "c"], previous) == {
+            (2,): [cases[0]],
+            (0, 1, 2): [cases[1]],
+        }
+
+
+class TestMergePreviousJudgements:
+    def test_adds_reused_outputs_to_fresh_results(self, cases):
+        fresh_output = RunMetricOutput(run=0, metric="bias", score=0.0)
+        reused_output = RunMetricOutput(run=0, metric="faithfulness", score=1.0)
+        fresh_result = evaluation_result_for(cases[0], [fresh_output])
+        previous = {(llm_test_case_content_hash(cases[0]), "a"): [reused_output]}
+
+        merged = merge_previous_judgements(
+            ResultsTable.from_evaluation_results([fresh_result]),
+            cases,
+            ["a", "b"],
+            previous,
+        ).evaluation_results
+
+        assert len(merged) == 1
+        assert merged[0].run_metric_outputs == [fresh_output, reused_output]
+
+    def test_creates_results_for_cases_not_judged_again(self, cases):
+        reused_output = RunMetricOutput(run=0, metric="faithfulness", score=1.0)
+        previous = {(llm_test_case_content_hash(cases[1]), "a"): [reused_output]}
+
+        merged = merge_previous_judgements(
+            ResultsTable.from_evaluation_results([]), cases, ["a"], previous
+        ).evaluation_results
+
+        assert merged == [evaluation_result_for(cases[1], [reused_output])]
+
+    def test_orders_results_as_the_cases(self, cases):
+        fresh_output = RunMetricOutput(run=0, metric="bias", score=0.0)
+        reused_output = RunMetricOutput(run=0, metric="faithfulness", score=1.0)
+        fresh_result = evaluation_result_for(cases[1], [fresh_output])
+        previous = {(llm_test_case_content_hash(cases[0]), "a"): [reused_output]}
+
+        merged = merge_previous_judgements(
+            ResultsTable.from_evaluation_results([fresh_result]),
+            cases,
+            ["a"],
+            previous,
+        ).evaluation_results
+
+        assert merged == [
+            evaluation_result_for(cases[0], [reused_output]),
+            fresh_result,
+        ]
+
+    def test_keeps_results_that_do_not_match_a_case(self, cases):
+        unmatched = EvaluationResult(
+            name="other",
+            input="other",
+            actual_output="other",
+            expected_output="other",
+            retrieval_context=[],
+            run_metric_outputs=[],
+        )
+
+        merged = merge_previous_judgements(
+            ResultsTable.from_evaluation_results([unmatched]), cases, ["a"], {}
+        ).evaluation_results
+
+        assert merged == [unmatched]
+
+
+def test_evaluation_results_to_judgements(cases):
+    outputs = [
+        RunMetricOutput(run=0, metric="faithfulness", score=1.0),
+        RunMetricOutput(run=1, metric="faithfulness", score=0.5),
+        RunMetricOutput(run=0, metric="unknown", score=0.5),
+    ]
+    result = evaluation_result_for(cases[0], outputs)
+
+    judgements = evaluation_results_to_judgements(
+        ResultsTable.from_evaluation_results([result]), {"faithfulness": "a"}
+    )
+
+    assert judgements == [
+        MetricJudgements(
+            case_hash=result.content_hash(),
+            metric_config_hash="a",
+            run_metric_outputs=outputs[:2],
+        )
+    ]
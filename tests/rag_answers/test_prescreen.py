@@ -0,0 +1,164 @@
+import random
+
+import pytest
+from deepeval.test_case import LLMTestCase
+
+from govuk_chat_evaluation.rag_answers.data_models import (
+    Config,
+    MetricConfig,
+    RunMetricOutput,
+)
+from govuk_chat_evaluation.rag_answers.incremental import llm_test_case_content_hash
+from govuk_chat_evaluation.rag_answers.prescreen import (
+    PRESCREEN_FILENAME,
+    lexical_similarities,
+    prescreen_cases,
+    rouge_l_f1,
+    write_prescreen_audit,
+)
+
+
+def longest_common_subsequence(a: list[str], b: list[str]) -> int:
+    table = [[0] * (len(b) + 1) for _ in range(len(a) + 1)]
+    for i, a_token in enumerate(a):
+        for j, b_token in enumerate(b):
+            table[i + 1][j + 1] = (
+                table[i][j] + 1
+                if a_token == b_token
+                else max(table[i][j + 1], table[i + 1][j])
+            )
+    return table[-1][-1]
+
+
+class TestRougeLF1:
+    def test_scores_the_longest_common_subsequence(self):
+        assert rouge_l_f1(["a", "b", "c", "d"], ["a", "c", "d", "e"]) == 0.75
+
+    def test_empty_sequences_score_0(self):
+        assert rouge_l_f1([], ["a"]) == 0.0
+        assert rouge_l_f1(["a"], []) == 0.0
+
+    def test_matches_the_dynamic_programming_definition(self):
+        rng = random.Random(0)
+        for _ in range(50):
+            a = rng.choices("abcde", k=rng.randint(1, 20))
+            b = rng.choices("abcde", k=rng.randint(1, 20))
+            expected = 2 * longest_common_subsequence(a, b) / (len(a) + len(b))
+            assert rouge_l_f1(a, b) == pytest.approx(expected)
+
+
+def test_lexical_similarities():
+    similarities = lexical_similarities(
+        ["You can claim VAT", "Apply online", "", "the cat sat", "Yes"],
+        ["You can claim VAT", "Renew by post", "Something", "the sat cat", "Yes"],
+    )
+
+    assert list(similarities.columns) == ["token_overlap", "bigram_overlap", "rouge_l"]
+    assert similarities.iloc[0].tolist() == [1.0, 1.0, 1.0]
+    assert similarities.iloc[1].tolist() == [0.0, 0.0, 0.0]
+    assert similarities.iloc[2].tolist() == [0.0, 0.0, 0.0]
+    assert similarities.iloc[3].tolist() == pytest.approx([1.0, 0.0, 2 / 3])
+    # too short for bigrams
+    assert similarities.iloc[4].tolist() == [1.0, 1.0, 1.0]
+
+
+class TestPrescreenCases:
+    @pytest.fixture
+    def cases(self):
+        return [
+            LLMTestCase(
+                name="identical",
+                input="Q1",
+                actual_output="You can claim VAT back",
+                expected_output="You can claim VAT back",
+            ),
+            LLMTestCase(
+                name="similar",
+                input="Q2",
+                actual_output="You can claim the VAT back",
+                expected_output="You can claim VAT back",
+            ),
+            LLMTestCase(
+                name="different",
+                input="Q3",
+                actual_output="Apply online",
+                expected_output="Renew by post",
+            ),
+        ]
+
+    def config(self, mock_input_data, **prescreen):
+        return Config(
+            what="Test",
+            generate=False,
+            input_path=mock_input_data,
+            n_runs=2,
+            metrics=[
+                MetricConfig(
+                    name="factual_correctness",  # type: ignore[arg-type]
+                    threshold=0.5,
+                    llm_judge={"model": "gpt-4o"},  # type: ignore[arg-type]
+                    prescreen=prescreen or None,  # type: ignore[arg-type]
+                ),
+            ],
+        )
+
+    def test_scores_cases_beyond_the_cut_offs(self, cases, mock_input_data):
+        config = self.config(mock_input_data, pass_above=0.95, fail_below=0.1)
+        metrics = config.metric_instances()
+
+        screened, audit = prescreen_cases(cases, config, metrics, ["hash"])
+
+        assert screened == {
+            (llm_test_case_content_hash(cases[0]), "hash"): [
+                RunMetricOutput(
+                    run=run,
+                    metric="FactualCorrectness",
+                    score=1.0,
+                    cost=0.0,
+                    reason="Lexical pre-screen: near identical to the expected output",
+                    success=True,
+                )
+                for run in range(2)
+            ],
+            (llm_test_case_content_hash(cases[2]), "hash"): [
+                RunMetricOutput(
+                    run=run,
+                    metric="FactualCorrectness",
+                    score=0.0,
+                    cost=0.0,
+                    reason="Lexical pre-screen: dissimilar to the expected output",
+                    success=False,
+                )
+                for run in range(2)
+            ],
+        }
+        assert audit["name"].tolist() == ["identical", "different"]
+        assert audit["score"].tolist() == [1.0, 0.0]
+        assert list(audit.columns) == [
+            "name",
+            "metric",
+            "score",
+            "token_overlap",
+            "bigram_overlap",
+            "rouge_l",
+        ]
+
+    def test_without_a_prescreen_nothing_is_screened(self, cases, mock_input_data):
+        config = self.config(mock_input_data)
+
+        screened, audit = prescreen_cases(
+            cases, config, config.metric_instances(), ["hash"]
+        )
+
+        assert screened == {}
+        assert audit.empty
+
+
+def test_write_prescreen_audit(tmp_path):
+    similarities = lexical_similarities(["a b"], ["a b"])
+
+    assert write_prescreen_audit(tmp_path, similarities.iloc[:0]) is None
+    assert (
+        write_prescreen_audit(tmp_path, similarities) == tmp_path / PRESCREEN_FILENAME
+    )
+    assert (tmp_path / PRESCREEN_FILENAME).exists()
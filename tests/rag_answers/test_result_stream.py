@@ -0,0 +1,119 @@
+import json
+
+from pydantic import TypeAdapter
+
+from govuk_chat_evaluation.rag_answers.data_models import (
+    EvaluationResult,
+    RunMetricOutput,
+)
+from govuk_chat_evaluation.rag_answers.deepeval_evaluate import (
+    stream_row_from_test_result,
+)
+from govuk_chat_evaluation.rag_answers.result_stream import (
+    ResultStream,
+    read_streamed_evaluation_results,
+    read_streamed_results_table,
+)
+from govuk_chat_evaluation.rag_answers.results_table import ResultsTable
+
+
+class TestResultStream:
+    def test_write_appends_a_line_per_test_case_and_run(
+        self, tmp_path, mock_deepeval_results
+    ):
+        path = tmp_path / "stream.jsonl"
+
+        with ResultStream(path) as stream:
+            stream.write(mock_deepeval_results)
+
+            # flushed, so readable before the stream is closed
+            lines = path.read_text().splitlines()
+
+        assert len(lines) == 4
+        first = json.loads(lines[0])
+        assert first["name"] == "test_case_0"
+        assert {output["run"] for output in first["run_metric_outputs"]} == {0}
+        assert [output["metric"] for output in first["run_metric_outputs"]] == [
+            "faithfulness",
+            "bias",
+        ]
+
+    def test_write_appends_lines_that_are_evaluation_results(
+        self, tmp_path, mock_deepeval_results
+    ):
+        path = tmp_path / "stream.jsonl"
+
+        with ResultStream(path) as stream:
+            stream.write(mock_deepeval_results, first_run=2)
+
+        adapter = TypeAdapter(EvaluationResult)
+        results = [
+            adapter.validate_json(line) for line in path.read_text().splitlines()
+        ]
+        assert results[0].name == "test_case_0"
+        assert results[0].retrieval_context == ["context 0"]
+        assert results[0].run_metric_outputs[0] == RunMetricOutput(
+            run=2, metric="faithfulness", score=0.5, reason="Good faith", success=True
+        )
+
+    def test_write_appends_to_an_existing_file(self, tmp_path, mock_deepeval_results):
+        path = tmp_path / "stream.jsonl"
+
+        with ResultStream(path) as stream:
+            stream.write(mock_deepeval_results[:1])
+        with ResultStream(path) as stream:
+            stream.write(mock_deepeval_results[:1])
+
+        assert len(path.read_text().splitlines()) == 4
+
+
+class TestReadStreamedEvaluationResults:
+    def test_matches_converting_the_results_in_memory(
+        self, tmp_path, mock_deepeval_results
+    ):
+        path = tmp_path / "stream.jsonl"
+        with ResultStream(path) as stream:
+            stream.write(mock_deepeval_results)
+
+        assert (
+            read_streamed_evaluation_results(path)
+            == ResultsTable.from_rows(
+                stream_row_from_test_result(result, run_idx)
+                for run_idx, run in enumerate(mock_deepeval_results)
+                for result in run
+            ).evaluation_results
+        )
+
+    def test_combines_test_cases_written_in_separate_chunks(
+        self, tmp_path, mock_deepeval_results
+    ):
+        path = tmp_path / "stream.jsonl"
+        with ResultStream(path) as stream:
+            for run in mock_deepeval_results:
+                for result in run:
+                    stream.write([[result]])
+
+        results = read_streamed_evaluation_results(path)
+
+        assert [result.name for result in results] == ["test_case_0", "test_case_1"]
+        assert results[0].run_metric_outputs[0] == RunMetricOutput(
+            run=0, metric="faithfulness", score=0.5, reason="Good faith", success=True
+        )
+
+    def test_reads_the_results_table(self, tmp_path, mock_deepeval_results):
+        path = tmp_path / "stream.jsonl"
+        with ResultStream(path) as stream:
+            stream.write(mock_deepeval_results)
+
+        table = read_streamed_results_table(path)
+
+        assert table.name.tolist() == ["test_case_0", "test_case_1"]
+        assert table.evaluation_results == read_streamed_evaluation_results(path)
+
+    def test_ignores_blank_lines(self, tmp_path, mock_deepeval_results):
+        path = tmp_path / "stream.jsonl"
+        with ResultStream(path) as stream:
+            stream.write(mock_deepeval_results)
+        path.write_text(path.read_text() + "\n")
+
+        assert len(read_streamed_evaluation_results(path)) == 2
@@ -0,0 +1,218 @@
+from dataclasses import replace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from govuk_chat_evaluation.rag_answers.data_models import (
+    EvaluationResult,
+    RunMetricOutput,
+)
+from govuk_chat_evaluation.rag_answers.deepeval_evaluate import (
+    stream_row_from_test_result,
+)
+from govuk_chat_evaluation.rag_answers.results_table import ResultsTable
+
+
+@pytest.fixture
+def evaluation_results() -> list[EvaluationResult]:
+    return [
+        EvaluationResult(
+            name="b",
+            input="Is VAT a tax?",
+            actual_output="Yes",
+            expected_output="Yes, VAT is a tax.",
+            retrieval_context=["VAT is a tax."],
+            run_metric_outputs=[
+                RunMetricOutput(run=0, metric="faithfulness", score=1.0, cost=0.1),
+                RunMetricOutput(run=1, metric="faithfulness", score=0.5, cost=0.1),
+                RunMetricOutput(run=2, metric="faithfulness", score=0.6, cost=0.1),
+                RunMetricOutput(run=0, metric="bias", score=0.0, success=True),
+                RunMetricOutput(
+                    run=1,
+                    metric="bias",
+                    score=None,
+                    success=False,
+                    error="Rate limited",
+                ),
+            ],
+        ),
+        EvaluationResult(
+            name="a",
+            input="What is the capital of France?",
+            actual_output="Paris",
+            expected_output="Paris",
+            retrieval_context=[],
+            run_metric_outputs=[
+                RunMetricOutput(run=0, metric="faithfulness", score=0.2),
+            ],
+        ),
+        EvaluationResult(
+            name="c",
+            input="Unjudged",
+            actual_output="",
+            expected_output="",
+            retrieval_context=[],
+            run_metric_outputs=[],
+        ),
+    ]
+
+
+def test_from_evaluation_results(evaluation_results):
+    table = ResultsTable.from_evaluation_results(evaluation_results)
+
+    assert table.name.tolist() == ["b", "a", "c"]
+    assert table.retrieval_context.tolist() == [["VAT is a tax."], [], []]
+    assert table.case_index.tolist() == [0, 0, 0, 0, 0, 1]
+    assert table.metric.tolist()[3:] == ["bias", "bias", "faithfulness"]
+    np.testing.assert_array_equal(table.score, [1.0, 0.5, 0.6, 0.0, np.nan, 0.2])
+    np.testing.assert_array_equal(table.cost, [0.1, 0.1, 0.1, np.nan, np.nan, np.nan])
+    assert table.error.tolist()[4] == "Rate limited"
+
+
+def test_per_input_metric_stats_matches_a_pandas_groupby(evaluation_results):
+    expected = (
+        pd.DataFrame(
+            [
+                {
+                    "name": result.name,
+                    "input": result.input,
+                    "metric": output.metric,
+                    "score": output.score,
+                }
+                for result in evaluation_results
+                for output in result.run_metric_outputs
+            ]
+        )
+        .groupby(["name", "input", "metric"])["score"]
+        .agg(["mean", "std"])
+        .unstack()
+        .reset_index()
+    )
+
+    stats = ResultsTable.from_evaluation_results(
+        evaluation_results
+    ).per_input_metric_stats()
+
+    pd.testing.assert_frame_equal(stats, expected)
+
+
+def test_per_input_metric_stats_aggregates_test_cases_with_the_same_name_and_input(
+    evaluation_results,
+):
+    stats = ResultsTable.from_evaluation_results(
+        evaluation_results + evaluation_results[:1]
+    ).per_input_metric_stats()
+
+    assert stats[("name", "")].tolist() == ["a", "b"]
+    assert stats[("mean", "faithfulness")].tolist() == pytest.approx([0.2, 0.7])
+
+
+def test_run_scores_by_metric(evaluation_results):
+    run_scores = ResultsTable.from_evaluation_results(
+        evaluation_results
+    ).run_scores_by_metric()
+
+    assert list(run_scores) == ["bias", "faithfulness"]
+    np.testing.assert_array_equal(run_scores["bias"], [[0.0]])
+    # inputs in the order of their names, with their scores first
+    np.testing.assert_array_equal(
+        run_scores["faithfulness"], [[0.2, np.nan, np.nan], [1.0, 0.5, 0.6]]
+    )
+
+
+def test_tidy_results_matches_the_evaluation_results(evaluation_results):
+    table = ResultsTable.from_evaluation_results(evaluation_results)
+
+    pd.testing.assert_frame_equal(
+        table.tidy_results(), pd.DataFrame(evaluation_results)
+    )
+
+
+def stream_rows(all_runs):
+    return [
+        stream_row_from_test_result(result, run_idx)
+        for run_idx, run in enumerate(all_runs)
+        for result in run
+    ]
+
+
+def test_from_rows_groups_the_runs_of_each_test_case(mock_deepeval_results):
+    table = ResultsTable.from_rows(stream_rows(mock_deepeval_results))
+
+    assert table.name.tolist() == ["test_case_0", "test_case_1"]
+    assert table.case_index.tolist() == [0, 0, 1, 1, 0, 0, 1, 1]
+    assert table.run.tolist() == [0, 0, 0, 0, 1, 1, 1, 1]
+    assert table.score.tolist() == pytest.approx(
+        [0.5, 0.8, 0.6, 0.8, 0.7, 0.8, 0.8, 0.8]
+    )
+
+
+def test_evaluation_results_orders_outputs_by_test_case(mock_deepeval_results):
+    results = ResultsTable.from_rows(
+        stream_rows(mock_deepeval_results)
+    ).evaluation_results
+
+    assert [result.name for result in results] == ["test_case_0", "test_case_1"]
+    assert [
+        (output.run, output.metric) for output in results[0].run_metric_outputs
+    ] == [(0, "faithfulness"), (0, "bias"), (1, "faithfulness"), (1, "bias")]
+    assert results[0].retrieval_context == ["context 0"]
+
+
+def test_evaluation_results_round_trips(evaluation_results):
+    table = ResultsTable.from_evaluation_results(evaluation_results)
+
+    assert table.evaluation_results == evaluation_results
+
+
+def test_concat_combines_test_cases_by_name(evaluation_results):
+    b, a, _ = evaluation_results
+    more_of_b = replace(
+        b,
+        run_metric_outputs=[RunMetricOutput(run=3, metric="faithfulness", score=0.7)],
+    )
+
+    table = ResultsTable.concat(
+        [
+            ResultsTable.from_evaluation_results([b, a]),
+            ResultsTable.from_evaluation_results([more_of_b]),
+        ]
+    )
+
+    assert table.evaluation_results == [
+        replace(
+            b,
+            run_metric_outputs=b.run_metric_outputs + more_of_b.run_metric_outputs,
+        ),
+        a,
+    ]
+
+
+def test_select_cases_reorders_test_cases_with_their_outputs(evaluation_results):
+    table = ResultsTable.from_evaluation_results(evaluation_results)
+
+    assert table.select_cases([2, 0]).evaluation_results == [
+        evaluation_results[2],
+        evaluation_results[0],
+    ]
+
+
+def test_select_outputs_keeps_every_test_case(evaluation_results):
+    table = ResultsTable.from_evaluation_results(evaluation_results)
+
+    selected = table.select_outputs(table.metric == "bias").evaluation_results
+
+    assert [result.name for result in selected] == ["b", "a", "c"]
+    assert (
+        selected[0].run_metric_outputs == evaluation_results[0].run_metric_outputs[3:]
+    )
+    assert selected[1].run_metric_outputs == []
+
+
+def test_content_hashes(evaluation_results):
+    table = ResultsTable.from_evaluation_results(evaluation_results)
+
+    assert table.content_hashes() == [
+        result.content_hash() for result in evaluation_results
+    ]
@@ -0,0 +1,140 @@
+from dataclasses import replace
+
+from deepeval.test_case import LLMTestCase
+
+from govuk_chat_evaluation.rag_answers.resume import (
+    plan_resumed_evaluation,
+    resumable_metric_names,
+    resume_result_stream,
+    write_metric_hashes,
+)
+from govuk_chat_evaluation.rag_answers.result_stream import (
+    ResultStream,
+    read_streamed_evaluation_results,
+)
+
+
+def errored(result, metric_name):
+    return replace(
+        result,
+        metrics_data=[
+            metric_data.model_copy(
+                update={"score": None, "success": False, "error": "Rate limited"}
+            )
+            if metric_data.name == metric_name
+            else metric_data
+            for metric_data in result.metrics_data
+        ],
+    )
+
+
+class TestResumeResultStream:
+    def test_returns_completed_judgements(self, tmp_path, mock_deepeval_results):
+        path = tmp_path / "stream.jsonl"
+        first_run, second_run = mock_deepeval_results
+        with ResultStream(path) as stream:
+            stream.write([first_run, [errored(second_run[0], "bias")]])
+
+        completed = resume_result_stream(
+            path, {"test_case_0", "test_case_1"}, {"faithfulness", "bias"}
+        )
+
+        assert completed == {
+            ("test_case_0", "faithfulness", 0),
+            ("test_case_0", "bias", 0),
+            ("test_case_1", "faithfulness", 0),
+            ("test_case_1", "bias", 0),
+            ("test_case_0", "faithfulness", 1),
+        }
+
+    def test_rewrites_the_stream_without_errored_judgements(
+        self, tmp_path, mock_deepeval_results
+    ):
+        path = tmp_path / "stream.jsonl"
+        first_run, _ = mock_deepeval_results
+        with ResultStream(path) as stream:
+            stream.write([[errored(first_run[0], "bias"), first_run[1]]])
+
+        resume_result_stream(
+            path, {"test_case_0", "test_case_1"}, {"faithfulness", "bias"}
+        )
+
+        results = read_streamed_evaluation_results(path)
+        assert [
+            [output.metric for output in result.run_metric_outputs]
+            for result in results
+        ] == [["faithfulness"], ["faithfulness", "bias"]]
+
+    def test_leaves_out_test_cases_and_metrics_no_longer_evaluated(
+        self, tmp_path, mock_deepeval_results
+    ):
+        path = tmp_path / "stream.jsonl"
+        with ResultStream(path) as stream:
+            stream.write(mock_deepeval_results)
+
+        completed = resume_result_stream(path, {"test_case_1"}, {"bias"})
+
+        assert completed == {("test_case_1", "bias", 0), ("test_case_1", "bias", 1)}
+        assert len(path.read_text().splitlines()) == 2
+
+    def test_leaves_out_runs_from_max_runs(self, tmp_path, mock_deepeval_results):
+        path = tmp_path / "stream.jsonl"
+        with ResultStream(path) as stream:
+            stream.write(mock_deepeval_results)
+
+        completed = resume_result_stream(path, {"test_case_1"}, {"bias"}, max_runs=1)
+
+        assert completed == {("test_case_1", "bias", 0)}
+        assert len(path.read_text().splitlines()) == 1
+
+    def test_without_a_stream_nothing_is_completed(self, tmp_path):
+        assert resume_result_stream(tmp_path / "stream.jsonl", {"a"}, {"bias"}) == set()
+
+
+class TestResumableMetricNames:
+    def test_returns_metrics_with_unchanged_configs(self, tmp_path):
+        write_metric_hashes(tmp_path, {"faithfulness": "a", "bias": "b"})
+
+        assert resumable_metric_names(
+            tmp_path, {"faithfulness": "a", "bias": "changed", "relevance": "c"}
+        ) == {"faithfulness"}
+
+    def test_without_recorded_configs_nothing_is_resumable(self, tmp_path):
+        assert resumable_metric_names(tmp_path, {"faithfulness": "a"}) == set()
+
+
+class TestPlanResumedEvaluation:
+    cases = [
+        LLMTestCase(name="case_0", input="Question 0", actual_output="Answer 0"),
+        LLMTestCase(name="case_1", input="Question 1", actual_output="Answer 1"),
+    ]
+
+    def test_without_completed_judgements_plans_every_run(self):
+        assert plan_resumed_evaluation(
+            {(0, 1): self.cases}, ["faithfulness", "bias"], 3, set()
+        ) == {((0, 1), range(0, 3)): self.cases}
+
+    def test_plans_only_missing_judgements(self):
+        completed = {("case_0", "faithfulness", run) for run in range(3)} | {
+            ("case_0", "bias", 0),
+            ("case_0", "bias", 2),
+            ("case_1", "faithfulness", 0),
+            ("case_1", "bias", 0),
+        }
+
+        assert plan_resumed_evaluation(
+            {(0, 1): self.cases}, ["faithfulness", "bias"], 3, completed
+        ) == {
+            ((1,), range(1, 2)): [self.cases[0]],
+            ((0, 1), range(1, 3)): [self.cases[1]],
+        }
+
+    def test_leaves_out_completed_test_cases(self):
+        completed = {
+            (str(case.name), "bias", run) for case in self.cases for run in range(2)
+        }
+
+        assert (
+            plan_resumed_evaluation({(1,): self.cases}, ["a", "bias"], 2, completed)
+            == {}
+        )
@@ -0,0 +1,109 @@
+from deepeval.test_case import LLMTestCase
+
+from govuk_chat_evaluation.rag_answers.result_stream import (
+    ResultStream,
+    read_streamed_evaluation_results,
+)
+from govuk_chat_evaluation.rag_answers.sharding import (
+    merge_shard_files,
+    merge_shard_streams,
+    shard_evaluation_plan,
+    shard_stream_path,
+)
+
+cases = [
+    LLMTestCase(name=f"case_{index}", input=f"Question {index}", actual_output="A")
+    for index in range(5)
+]
+
+
+def test_shard_stream_path(tmp_path):
+    assert (
+        shard_stream_path(tmp_path / "run_metric_outputs.jsonl", 2)
+        == tmp_path / "run_metric_outputs.shard-2.jsonl"
+    )
+
+
+class TestShardEvaluationPlan:
+    def test_deals_test_cases_to_shards_in_turn(self):
+        plan = {((0,), range(0, 2)): cases}
+
+        assert shard_evaluation_plan(plan, cases, 2) == [
+            {((0,), range(0, 2)): [cases[0], cases[2], cases[4]]},
+            {((0,), range(0, 2)): [cases[1], cases[3]]},
+        ]
+
+    def test_keeps_every_plan_entry_of_a_test_case_in_one_shard(self):
+        plan = {
+            ((0, 1), range(0, 1)): [cases[0], cases[1]],
+            ((1,), range(1, 2)): [cases[0], cases[3]],
+        }
+
+        assert shard_evaluation_plan(plan, cases, 3) == [
+            {
+                ((0, 1), range(0, 1)): [cases[0]],
+                ((1,), range(1, 2)): [cases[0], cases[3]],
+            },
+            {((0, 1), range(0, 1)): [cases[1]]},
+            {},
+        ]
+
+
+class TestMergeShardStreams:
+    def test_merges_results_in_the_order_of_the_test_cases(
+        self, tmp_path, mock_deepeval_results
+    ):
+        stream_path = tmp_path / "run_metric_outputs.jsonl"
+        first_run, second_run = mock_deepeval_results
+        with ResultStream(shard_stream_path(stream_path, 0)) as stream:
+            stream.write([[first_run[1]], [second_run[1]]])
+        with ResultStream(shard_stream_path(stream_path, 1)) as stream:
+            stream.write([[first_run[0]], [second_run[0]]])
+
+        merge_shard_streams(stream_path, ["test_case_0", "test_case_1"])
+
+        assert [
+            (result.name, output.run)
+            for result in read_streamed_evaluation_results(stream_path)
+            for output in result.run_metric_outputs
+            if output.metric == "bias"
+        ] == [
+            ("test_case_0", 0),
+            ("test_case_0", 1),
+            ("test_case_1", 0),
+            ("test_case_1", 1),
+        ]
+        assert list(tmp_path.iterdir()) == [stream_path]
+
+    def test_appends_to_the_results_stream(self, tmp_path, mock_deepeval_results):
+        stream_path = tmp_path / "run_metric_outputs.jsonl"
+        first_run, _ = mock_deepeval_results
+        with ResultStream(stream_path) as stream:
+            stream.write([[first_run[0]]])
+        with ResultStream(shard_stream_path(stream_path, 0)) as stream:
+            stream.write([[first_run[1]]])
+
+        merge_shard_streams(stream_path, ["test_case_0", "test_case_1"])
+
+        assert [
+            result.name for result in read_streamed_evaluation_results(stream_path)
+        ] == ["test_case_0", "test_case_1"]
+
+    def test_without_shard_streams_does_nothing(self, tmp_path):
+        stream_path = tmp_path / "run_metric_outputs.jsonl"
+
+        merge_shard_streams(stream_path, ["test_case_0"])
+
+        assert not stream_path.exists()
+
+
+def test_merge_shard_files_appends_them_in_shard_order(tmp_path):
+    path = tmp_path / "judge_telemetry.jsonl"
+    path.write_text("main\n")
+    for shard_index in [10, 2]:
+        shard_stream_path(path, shard_index).write_text(f"shard {shard_index}\n")
+
+    merge_shard_files(path)
+
+    assert path.read_text() == "main\nshard 2\nshard 10\n"
+    assert list(tmp_path.iterdir()) == [path]
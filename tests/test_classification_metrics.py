@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+from sklearn import metrics
+
+from govuk_chat_evaluation.classification_metrics import LabelCounts, confusion_matrix
+
+LABELS = np.array(["about_mps", "character_fun", "genuine_rag", "greetings"])
+
+
+@pytest.fixture(params=range(5))
+def expected_actual(request) -> tuple[list[str], list[str]]:
+    rng = np.random.default_rng(request.param)
+    n = int(rng.integers(1, 50))
+    # some labels are only expected or only predicted, so metrics are undefined
+    expected = LABELS[rng.integers(0, 3, n)]
+    actual = LABELS[rng.integers(1, 4, n)]
+    return expected.tolist(), actual.tolist()
+
+
+def test_confusion_matrix_matches_sklearn(expected_actual):
+    matrix, labels = confusion_matrix(*expected_actual)
+
+    assert labels == sorted(set(expected_actual[0] + expected_actual[1]))
+    np.testing.assert_array_equal(
+        matrix, metrics.confusion_matrix(*expected_actual, labels=labels)
+    )
+
+
+def test_confusion_matrix_of_nothing():
+    matrix, labels = confusion_matrix([], [])
+
+    assert matrix.shape == (0, 0)
+    assert labels == []
+
+
+@pytest.mark.parametrize(
+    "metric, sklearn_metric, kwargs",
+    [
+        (lambda counts: counts.precision(), metrics.precision_score, {}),
+        (lambda counts: counts.recall(), metrics.recall_score, {}),
+        (lambda counts: counts.fbeta(1), metrics.f1_score, {}),
+        (lambda counts: counts.fbeta(2), metrics.fbeta_score, {"beta": 2}),
+    ],
+)
+def test_weighted_metrics_match_sklearn(
+    expected_actual, metric, sklearn_metric, kwargs
+):
+    counts = LabelCounts.from_confusion_matrix(confusion_matrix(*expected_actual)[0])
+
+    assert counts.weighted_average(metric(counts)) == sklearn_metric(
+        *expected_actual, average="weighted", zero_division=np.nan, **kwargs
+    )
+    np.testing.assert_array_equal(
+        metric(counts),
+        sklearn_metric(*expected_actual, average=None, zero_division=np.nan, **kwargs),
+    )
+
+
+def test_weighted_average_ignores_undefined_scores():
+    counts = LabelCounts.from_confusion_matrix(np.array([[2, 1], [0, 0]]))
+
+    assert counts.weighted_average(np.array([0.5, np.nan])) == 0.5
+    assert np.isnan(counts.weighted_average(np.array([np.nan, np.nan])))
+
+
+def test_from_indicators_matches_sklearn_per_label():
+    rng = np.random.default_rng(0)
+    expected = rng.random((40, 5)) < 0.3
+    actual = rng.random((40, 5)) < 0.3
+    # a label that is never expected or predicted
+    expected[:, 4] = actual[:, 4] = False
+
+    counts = LabelCounts.from_indicators(expected, actual)
+
+    for metric, sklearn_metric in [
+        (counts.precision(), metrics.precision_score),
+        (counts.recall(), metrics.recall_score),
+        (counts.fbeta(1), metrics.f1_score),
+    ]:
+        np.testing.assert_array_equal(
+            metric,
+            sklearn_metric(
+                expected,
+                actual,
+                average=None,  # type: ignore
+                zero_division=np.nan,  # type: ignore
+            ),
+        )
+
+
+def test_from_indicators_counts_a_binary_classification():
+    expected = np.array([[True], [True], [False], [False], [False]])
+    actual = np.array([[True], [False], [True], [False], [False]])
+
+    counts = LabelCounts.from_indicators(expected, actual)
+
+    assert counts.true_positives.tolist() == [1]
+    assert counts.false_negatives.tolist() == [1]
+    assert counts.false_positives.tolist() == [1]
+    assert counts.true_negatives.tolist() == [2]
+    assert counts.precision()[0] == metrics.precision_score(
+        expected.ravel(),
+        actual.ravel(),
+        zero_division=np.nan,  # type: ignore
+    )
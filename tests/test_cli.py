@@ -0,0 +1,80 @@
+import subprocess
+import sys
+import time
+
+import click
+import pytest
+from click.testing import CliRunner
+from click.utils import make_default_short_help
+
+from govuk_chat_evaluation.cli import LazyGroup, LazySubcommand, main
+
+# listing the subcommands is budgeted to stay responsive, so it shouldn't
+# import the dependencies of any subcommand
+HELP_BUDGET_SECONDS = 0.3
+HEAVY_MODULES = ["deepeval", "matplotlib", "pandas", "scipy", "seaborn", "sklearn"]
+
+
+@pytest.mark.parametrize("name", main.lazy_subcommands)
+def test_lazy_subcommands_match_the_commands(name):
+    lazy = main.lazy_subcommands[name]
+
+    command = main.get_command(click.Context(main), name)
+
+    assert command is not None
+    assert command.name == name
+    assert make_default_short_help(lazy.help) == command.get_short_help_str()
+
+
+def test_lazy_group_lists_eager_and_lazy_subcommands():
+    @click.group(
+        cls=LazyGroup,
+        lazy_subcommands={
+            "compare": LazySubcommand(
+                "govuk_chat_evaluation.compare:main", "Compare runs"
+            )
+        },
+    )
+    def group():
+        pass
+
+    @group.command()
+    def hello():
+        """Say hello"""
+
+    result = CliRunner().invoke(group, ["--help"])
+
+    assert result.exit_code == 0, result.output
+    assert "compare  Compare runs" in result.output
+    assert "hello    Say hello" in result.output
+    assert group.get_command(click.Context(group), "missing") is None
+
+
+def test_help_does_not_import_heavy_modules():
+    script = (
+        "import sys\n"
+        "from click.testing import CliRunner\n"
+        "from govuk_chat_evaluation.cli import main\n"
+        "CliRunner().invoke(main, ['--help'])\n"
+        f"print([name for name in {HEAVY_MODULES} if name in sys.modules])\n"
+    )
+
+    output = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True
+    ).stdout
+
+    assert output.strip() == "[]"
+
+
+def test_help_is_within_its_time_budget():
+    def run_help() -> float:
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-m", "govuk_chat_evaluation", "--help"],
+            capture_output=True,
+            check=True,
+        )
+        return time.perf_counter() - start
+
+    # the fastest of a few runs, so a busy machine doesn't fail the budget
+    assert min(run_help() for _ in range(3)) < HELP_BUDGET_SECONDS
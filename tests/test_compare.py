@@ -0,0 +1,179 @@
+import numpy as np
+import pandas as pd
+import pytest
+from click.testing import CliRunner
+from scipy.stats import ttest_rel
+
+from govuk_chat_evaluation.compare import (
+    comparison_task,
+    compare_runs,
+    main,
+    question_router_rows,
+    rag_answers_rows,
+)
+from govuk_chat_evaluation.rag_answers.data_models import (
+    EvaluationResult,
+    RunMetricOutput,
+)
+from govuk_chat_evaluation.rag_answers.results_table import ResultsTable
+
+
+def write_question_router_results(results_dir, actual_outcomes, confidence_scores):
+    results_dir.mkdir(parents=True)
+    pd.DataFrame(
+        {
+            "question": ["Hello", "Tax?", "Hello", "Visa?", "Pension?"],
+            "expected_outcome": ["greetings", "genuine_rag"] * 2 + ["genuine_rag"],
+            "actual_outcome": actual_outcomes,
+            "confidence_score": confidence_scores,
+        }
+    ).to_csv(results_dir / "results.csv", index=False)
+    return results_dir
+
+
+@pytest.fixture
+def baseline_dir(tmp_path):
+    return write_question_router_results(
+        tmp_path / "results" / "question_router" / "2024-11-11T12:34:56",
+        ["greetings", "genuine_rag", "greetings", "about_mps", "genuine_rag"],
+        [0.9, 0.8, 0.7, 0.4, 0.8],
+    )
+
+
+@pytest.fixture
+def candidate_dir(tmp_path):
+    return write_question_router_results(
+        tmp_path / "results" / "question_router" / "2024-11-12T12:34:56",
+        ["greetings", "about_mps", "about_mps", "genuine_rag", "genuine_rag"],
+        [0.9, 0.2, 0.3, 0.95, np.nan],
+    )
+
+
+def test_question_router_rows_are_keyed_by_question_occurrence(baseline_dir):
+    run_rows = question_router_rows(baseline_dir)
+
+    assert run_rows.metrics == ["correct", "confidence_score"]
+    assert run_rows.rows.index.tolist() == [
+        ("Hello", 0),
+        ("Tax?", 0),
+        ("Hello", 1),
+        ("Visa?", 0),
+        ("Pension?", 0),
+    ]
+    assert run_rows.rows["correct"].tolist() == [True, True, True, False, True]
+
+
+def test_compare_runs_tests_and_flips_each_metric(baseline_dir, candidate_dir):
+    summary, flipped_rows = compare_runs(
+        question_router_rows(baseline_dir),
+        question_router_rows(candidate_dir),
+        min_score_change=0.5,
+    )
+
+    correct, confidence = summary
+    assert correct == {
+        "metric": "correct",
+        "paired_rows": 5,
+        "baseline_mean": 0.8,
+        "candidate_mean": 0.6,
+        "delta": pytest.approx(-0.2),
+        "test": "mcnemar",
+        "p_value": 1.0,
+        "improved": 1,
+        "regressed": 2,
+    }
+    assert confidence["paired_rows"] == 4
+    assert confidence["p_value"] == pytest.approx(
+        ttest_rel([0.9, 0.2, 0.3, 0.95], [0.9, 0.8, 0.7, 0.4]).pvalue
+    )
+    assert (confidence["improved"], confidence["regressed"]) == (1, 1)
+
+    newly_miscategorised = flipped_rows.loc[
+        (flipped_rows["metric"] == "correct") & (flipped_rows["change"] == "regressed")
+    ]
+    assert newly_miscategorised[["question", "occurrence"]].to_numpy().tolist() == [
+        ["Tax?", 0],
+        ["Hello", 1],
+    ]
+    assert newly_miscategorised["actual_outcome_candidate"].tolist() == [
+        "about_mps",
+        "about_mps",
+    ]
+    assert len(flipped_rows) == 5
+
+
+def test_compare_runs_ignores_questions_missing_from_a_run(tmp_path, baseline_dir):
+    candidate_dir = tmp_path / "candidate"
+    candidate_dir.mkdir()
+    pd.read_csv(baseline_dir / "results.csv").iloc[:2].to_csv(
+        candidate_dir / "results.csv", index=False
+    )
+
+    summary, flipped_rows = compare_runs(
+        question_router_rows(baseline_dir),
+        question_router_rows(candidate_dir),
+        min_score_change=0.5,
+    )
+
+    assert summary[0]["paired_rows"] == 2
+    assert summary[0]["p_value"] == 1.0
+    assert flipped_rows.empty
+
+
+def test_rag_answers_rows_reads_mean_scores_per_input(tmp_path):
+    ResultsTable.from_evaluation_results(
+        [
+            EvaluationResult(
+                name="a",
+                input="Is VAT a tax?",
+                actual_output="Yes",
+                expected_output="Yes",
+                retrieval_context=[],
+                run_metric_outputs=[
+                    RunMetricOutput(run=0, metric="faithfulness", score=1.0),
+                    RunMetricOutput(run=1, metric="faithfulness", score=0.5),
+                    RunMetricOutput(run=0, metric="bias", score=None, error="Oops"),
+                ],
+            )
+        ]
+    ).per_input_metric_stats().to_csv(tmp_path / "results_per_input.csv")
+
+    run_rows = rag_answers_rows(tmp_path)
+
+    assert run_rows.metrics == ["bias", "faithfulness"]
+    assert run_rows.rows.index.tolist() == [("Is VAT a tax?", 0)]
+    assert run_rows.rows["faithfulness"].tolist() == [0.75]
+    assert run_rows.rows["bias"].isna().tolist() == [True]
+
+
+def test_comparison_task(tmp_path, baseline_dir):
+    assert comparison_task([baseline_dir, baseline_dir]) == "question_router"
+
+    with pytest.raises(ValueError, match="different tasks"):
+        comparison_task([baseline_dir, tmp_path / "results" / "rag_answers" / "x"])
+
+    with pytest.raises(ValueError, match="expected results/<task>/<timestamp>"):
+        comparison_task([baseline_dir, tmp_path])
+
+
+@pytest.mark.usefixtures("mock_project_root")
+def test_main_writes_the_comparison(tmp_path, freezer, baseline_dir, candidate_dir):
+    freezer.move_to("2024-11-13 12:34:56")
+
+    result = CliRunner().invoke(main, [str(baseline_dir), str(candidate_dir)])
+
+    output_dir = tmp_path / "results" / "compare" / "2024-11-13T12:34:56"
+    assert result.exit_code == 0, result.output
+    summary = pd.read_csv(output_dir / "comparison_summary.csv")
+    assert summary[["run", "metric"]].values.tolist() == [
+        ["2024-11-12T12:34:56", "correct"],
+        ["2024-11-12T12:34:56", "confidence_score"],
+    ]
+    assert (output_dir / "flipped_rows.csv").exists()
+
+
+def test_main_needs_two_results_directories(baseline_dir):
+    result = CliRunner().invoke(main, [str(baseline_dir)])
+
+    assert result.exit_code == 2
+    assert "at least two results directories" in result.output
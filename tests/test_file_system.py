@@ -13,6 +13,7 @@ from govuk_chat_evaluation.file_system import (
     create_output_directory,
     jsonl_to_models,
     write_generated_to_output,
+    write_models_to_jsonl,
     write_config_file_for_reuse,
     write_csv_results,
 )
@@ -68,6 +69,15 @@ def test_write_generated_to_output(mock_project_root):
     assert len(lines) == 2
 
 
+def test_write_models_to_jsonl(mock_project_root):
+    models = [SampleModel(name="Alice", age=30), SampleModel(name="Bob", age=25)]
+    output_path = write_models_to_jsonl(
+        mock_project_root, models, filename="people.jsonl", data_label="people"
+    )
+    assert output_path == mock_project_root / "people.jsonl"
+    assert jsonl_to_models(output_path, SampleModel) == models
+
+
 def test_write_config_file_for_reuse(mock_project_root):
     config = SampleConfig(what="Testing config", path=Path("path/to/item"))
     config_path = write_config_file_for_reuse(mock_project_root, config)